@@ -5,6 +5,9 @@ Interactive terminal interface for LPBD agents.
 
 from time import time
 
+from dotenv import load_dotenv
+load_dotenv()
+
 from src.router import Router
 from src.schemas.message import Message
 
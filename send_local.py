@@ -2,6 +2,9 @@
 
 from time import time
 
+from dotenv import load_dotenv
+load_dotenv()
+
 from src.router import Router
 from src.schemas.message import Message
 
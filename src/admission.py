@@ -0,0 +1,149 @@
+"""
+Admission control: who gets in, and how many Claude calls run at once.
+
+Two layers, both in-process (per worker):
+
+- a token bucket per user in front of POST /message: a short burst is
+  fine, a sustained flood is turned away before anything is stored
+- one gate around every LLM call: at most LPBD_LLM_CONCURRENCY calls in
+  flight, at most LPBD_LLM_QUEUE more waiting for a slot (each no longer
+  than LPBD_LLM_WAIT seconds). A full queue rejects at once instead of
+  letting latency pile up for everyone.
+
+Rejections raise AdmissionRejected carrying a Retry-After hint; the API
+turns it into a 429. Agents and the router re-raise it rather than
+answering with an error line.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+USER_MESSAGES_PER_MINUTE = float(os.getenv("LPBD_USER_MESSAGES_PER_MINUTE", "12"))
+USER_BURST = int(os.getenv("LPBD_USER_BURST", "5"))
+LLM_CONCURRENCY = int(os.getenv("LPBD_LLM_CONCURRENCY", "8"))
+LLM_QUEUE = int(os.getenv("LPBD_LLM_QUEUE", "16"))
+LLM_WAIT_SECONDS = float(os.getenv("LPBD_LLM_WAIT", "10"))
+
+_MAX_TRACKED_USERS = 10_000
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Whole seconds, at least 1, for the Retry-After header"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: int, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = now
+
+    def take(self, now: float) -> float:
+        """Spend a token: 0.0 if there was one, else seconds until there will be"""
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class UserRateLimiter:
+    """One bucket per user; the least recently seen are forgotten past max_users"""
+
+    def __init__(self, per_minute: float = USER_MESSAGES_PER_MINUTE, burst: int = USER_BURST,
+                 max_users: int = _MAX_TRACKED_USERS, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_users = max_users
+        self.clock = clock
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def admit(self, user_id: str) -> None:
+        """Let the message in, or raise AdmissionRejected with when to come back"""
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = TokenBucket(self.rate, self.burst, now)
+                if len(self._buckets) > self.max_users:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(user_id)
+            wait = bucket.take(now)
+        if wait:
+            raise AdmissionRejected("user_rate", wait)
+
+
+class LLMGate:
+    """Counting semaphore with a bounded, time-limited wait queue"""
+
+    def __init__(self, concurrency: int = LLM_CONCURRENCY, queue: int = LLM_QUEUE,
+                 wait_seconds: float = LLM_WAIT_SECONDS) -> None:
+        self.concurrency = concurrency
+        self.queue = queue
+        self.wait_seconds = wait_seconds
+        self.in_flight = 0
+        self.waiting = 0
+        self._average_call = 2.0  # seconds, moving average; only feeds the Retry-After hint
+        self._cond = threading.Condition()
+
+    def check(self) -> None:
+        """Fast refusal up front: raise if a call made now would find the queue full"""
+        with self._cond:
+            if self.in_flight >= self.concurrency and self.waiting >= self.queue:
+                raise AdmissionRejected("llm_queue_full", self._retry_after())
+
+    def _retry_after(self) -> float:
+        # Roughly when a slot frees up for someone joining the back of the queue
+        return self._average_call * (self.waiting + 1) / self.concurrency
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        with self._cond:
+            if self.in_flight >= self.concurrency:
+                if self.waiting >= self.queue:
+                    raise AdmissionRejected("llm_queue_full", self._retry_after())
+                self.waiting += 1
+                try:
+                    deadline = time.monotonic() + self.wait_seconds
+                    while self.in_flight >= self.concurrency:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise AdmissionRejected("llm_wait_timeout", self._retry_after())
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.in_flight += 1
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            with self._cond:
+                self.in_flight -= 1
+                self._average_call = 0.8 * self._average_call + 0.2 * elapsed
+                self._cond.notify()
+
+
+user_limiter = UserRateLimiter()
+llm_gate = LLMGate()
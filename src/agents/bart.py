@@ -1,5 +1,6 @@
-import re
+from src.admission import AdmissionRejected
 from src.agents.llm_client import LLMClient
+from src.agents.sanitizer import sanitize
 
 
 class Bart:
@@ -9,7 +10,7 @@ class Bart:
         self.prompt = prompt or "You are Bart, the bartender."
         self.llm = LLMClient()
 
-    def respond(self, text: str) -> str:
+    def respond(self, text: str, max_tokens: int | None = None) -> str:
         if not text or not text.strip():
             return "Say something."
 
@@ -17,12 +18,11 @@ class Bart:
             response = self.llm.call(
                 system_prompt=self.prompt,
                 user_text=text,
-                max_tokens=150,
+                max_tokens=max_tokens or 150,
             )
-            # Remove asterisks around single words (emphasis), remove entire multi-word phrases (stage directions)
-            response = re.sub(r'\*(\w+)\*', r'\1', response)  # *word* -> word
-            response = re.sub(r'\*[^*]*\s+[^*]+\*', '', response)  # Remove multi-word stage directions
-            response = response.strip()
-            return response
+            # Emphasis kept, stage directions and speaker labels dropped
+            return sanitize(response, "bart")
+        except AdmissionRejected:
+            raise  # the API answers 429; don't dress it up as a reply
         except Exception as e:
             return "Bart: Something's off. Try again in a moment."
\ No newline at end of file
@@ -1,6 +1,7 @@
 
-import re
+from src.admission import AdmissionRejected
 from src.agents.llm_client import LLMClient
+from src.agents.sanitizer import sanitize
 
 
 class Bernie:
@@ -10,12 +11,13 @@ class Bernie:
         self.prompt = prompt or "You are Bernie, the friendly regular."
         self.llm = LLMClient()
 
-    def respond(self, text: str) -> str:
+    def respond(self, text: str, max_tokens: int | None = None) -> str:
         """
         Respond to user input using Claude API.
         
         Args:
             text: User message
+            max_tokens: Reply cap; the agent's own default if None
             
         Returns:
             Bernie's response
@@ -27,13 +29,12 @@ class Bernie:
             response = self.llm.call(
                 system_prompt=self.prompt,
                 user_text=text,
-                max_tokens=200,
+                max_tokens=max_tokens or 200,
             )
-            # Remove asterisks around single words (emphasis), remove entire multi-word phrases (stage directions)
-            response = re.sub(r'\*(\w+)\*', r'\1', response)  # *word* -> word
-            response = re.sub(r'\*[^*]*\s+[^*]+\*', '', response)  # Remove multi-word stage directions
-            response = response.strip()
-            return response
+            # Emphasis kept, stage directions and speaker labels dropped
+            return sanitize(response, "bernie")
+        except AdmissionRejected:
+            raise  # the API answers 429; don't dress it up as a reply
         except Exception as e:
             # Show actual error for debugging
             return f"Bernie error: {str(e)}"
\ No newline at end of file
@@ -7,6 +7,8 @@ Manages conversation flow, notices patterns, suggests moves without ego.
 """
 
 from src.agents.llm_client import LLMClient
+from src.agents.sanitizer import sanitize
+from src.moderation import ModerationResult, Moderator
 
 
 class Blanca:
@@ -20,42 +22,52 @@ class Blanca:
         self.llm = LLMClient()
         self.system_prompt = prompt
     
-    def respond(self, user_text: str) -> str:
+    def respond(self, user_text: str, max_tokens: int | None = None) -> str:
         """
         Generate Blanca's response to user input.
         
         Args:
             user_text: The user's message (with "blanca:" prefix removed)
+            max_tokens: Reply cap; the agent's own default if None
             
         Returns:
             Blanca's tactical observation or suggestion
         """
-        messages = [
-            {"role": "user", "content": user_text}
-        ]
-        
-        return self.llm.call(
+        response = self.llm.call(
             system_prompt=self.system_prompt,
             user_text=user_text,
-            max_tokens=50  # Blanca is tactical - brief observations only
+            max_tokens=max_tokens or 50  # Blanca is tactical - brief observations only
         )
+        return sanitize(response, "blanca")
     
-    def scan_for_violations(self, user_text: str) -> tuple[bool, str]:
+    def moderate(self, user_text: str, moderator: Moderator | None = None) -> ModerationResult:
         """
-        Check if user message violates conversation rules (CAPS, abuse, etc.).
+        Run the local moderation engine (no LLM call).
         
         Args:
             user_text: Raw user input to scan
+            moderator: Engine from the current config; loaded if not given
             
         Returns:
-            (has_violation, warning_message) - If no violation, warning is empty
+            Worst finding: severity, category and Blanca's canned warning
         """
-        # Check for excessive CAPS (>70% of message)
-        # Require at least 3 letters to avoid false positives on "OK" "YES" etc
-        caps_count = sum(1 for c in user_text if c.isupper())
-        total_letters = sum(1 for c in user_text if c.isalpha())
-        
-        if total_letters >= 3 and (caps_count / total_letters) > 0.7:
-            return (True, "Lower your voice. This is a bar, not a stadium.")
+        if moderator is None:
+            from src.config.loader import Config
+            moderator = Config().get_moderator()
+        return moderator.check(user_text)
+    
+    def scan_for_violations(self, user_text: str, moderator: Moderator | None = None) -> tuple[bool, str]:
+        """
+        Check if user message violates conversation rules (CAPS, abuse, slurs, threats, spam).
         
+        Args:
+            user_text: Raw user input to scan
+            moderator: Engine from the current config; loaded if not given
+            
+        Returns:
+            (has_violation, warning_message) - If no violation, warning is empty
+        """
+        result = self.moderate(user_text, moderator)
+        if result.blocked:
+            return (True, result.warning)
         return (False, "")
\ No newline at end of file
@@ -7,6 +7,7 @@ from typing import Literal, Sequence
 
 from src.history import MessageHistory, DialogueTurn
 from src.agents.bukowski_ledger import BukowskiLedger, LedgerEntry
+from src.summarizer import extractive_note
 
 
 BukowskiCommand = Literal["note", "show_last", "delete_last", "help", "unknown",]
@@ -37,34 +38,19 @@ def parse_bukowski_command(text: str) -> BukowskiCommand:
 
 
 def _summarise_history(turns: Sequence[DialogueTurn]) -> str:
-    if not turns:
+    """Extractive note over every turn given (src/summarizer.py), no LLM call"""
+    messages = []
+    for t in turns:
+        if t.user_text:
+            messages.append({"agent": "user", "content": t.user_text, "is_user": True})
+        if t.reply_text:
+            messages.append({"agent": t.agent, "content": t.reply_text, "is_user": False})
+
+    parts = extractive_note(messages)
+    if not parts:
         return "No recent conversation. Empty state logged."
 
-    tail = turns[-6:]
-
-    lines: list[str] = []
-    for t in tail:
-        user = (t.user_text or "").replace("\n", " ").strip()
-        reply = (t.reply_text or "").replace("\n", " ").strip()
-
-        snippet_parts = []
-        if user:
-            snippet_parts.append(f"U: {user}")
-        if reply:
-            snippet_parts.append(f"{t.agent}: {reply}")
-
-        if not snippet_parts:
-            continue
-
-        snippet = " ".join(snippet_parts)
-        if len(snippet) > 160:
-            snippet = snippet[:157].rstrip() + "..."
-        lines.append(snippet)
-
-    if not lines:
-        return "No recent conversation. Empty state logged."
-
-    return " | ".join(lines)
+    return " | ".join(parts)
 
 
 def handle_bukowski(
@@ -79,14 +65,13 @@ def handle_bukowski(
     if cmd == "help":
         return (
             "I log and retrieve.\n"
-            "- 'bukowski: note' — summarise recent conversation and store it.\n"
+            "- 'bukowski: note' — summarise your conversation and store it.\n"
             "- 'bukowski: show last' — show your latest entry.\n"
-            "- 'bukowski: delete last' — remove the latest entry."
+            "- 'bukowski: delete last' — remove your latest entry."
         )
 
     if cmd == "note":
-        recent_turns = history.get_recent(user_id=user_id, limit=10)
-        summary = _summarise_history(recent_turns)
+        summary = _summarise_history(history.get_recent(user_id=user_id))
 
         try:
             entry = LedgerEntry(
@@ -103,7 +88,7 @@ def handle_bukowski(
 
     if cmd == "show_last":
         try:
-            last_list = ledger.get_last(1)  # non-consuming single last entry
+            last_list = ledger.get_last(1, user_id=user_id)  # non-consuming, this user's only
         except Exception:
             return "Something jammed. Try again."
 
@@ -115,7 +100,7 @@ def handle_bukowski(
 
     if cmd == "delete_last":
         try:
-            deleted = ledger.delete_last()
+            deleted = ledger.delete_last(user_id)
         except Exception:
             return "Something jammed. Try again."
 
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Optional
+import uuid
+from dataclasses import dataclass, field
+from itertools import count
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from src.persistence import LedgerPersistence
 
 
 @dataclass
@@ -10,35 +15,87 @@ class LedgerEntry:
     agent: str
     text: str
     ts: float
+    entry_id: str = field(default_factory=lambda: uuid.uuid4().hex)  # tombstones name it
 
 
 class BukowskiLedger:
-    def __init__(self) -> None:
-        self._entries: List[LedgerEntry] = []
+    """
+    Entries keyed by user, newest last: a user's last entry is read or
+    removed in O(1). With a store attached every change is appended to
+    its journal as it happens (src/persistence.py).
+    """
+
+    def __init__(self, store: Optional[LedgerPersistence] = None) -> None:
+        self._by_user: Dict[str, List[LedgerEntry]] = {}
+        self._order: Dict[str, int] = {}  # entry_id -> log order, for the all-users view
+        self._seq = count()
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self._order)
 
     def log(self, entry: LedgerEntry | str) -> None:
-        if isinstance(entry, LedgerEntry):
-            self._entries.append(entry)
-        else:
-            self._entries.append(
-                LedgerEntry(
-                    user_id="",
-                    agent="manual",
-                    text=str(entry),
-                    ts=0.0))
-
-    def get_last(self, n: Optional[int] = None) -> List[LedgerEntry]:
+        if not isinstance(entry, LedgerEntry):
+            entry = LedgerEntry(
+                user_id="",
+                agent="manual",
+                text=str(entry),
+                ts=0.0)
+        self._add(entry)
+        if self.store is not None:
+            self.store.append(entry)
+
+    def _add(self, entry: LedgerEntry) -> None:
+        self._by_user.setdefault(entry.user_id, []).append(entry)
+        self._order[entry.entry_id] = next(self._seq)
+
+    def _detach(self, entries: List[LedgerEntry]) -> None:
+        # Called once the entries are out of _by_user, so the ledger is consistent
+        # before the store journals them (and maybe compacts)
+        for entry in entries:
+            del self._order[entry.entry_id]
+        if self.store is not None and entries:
+            self.store.tombstone(*entries)
+
+    def _entries(self, user_id: Optional[str]) -> List[LedgerEntry]:
+        if user_id is not None:
+            return self._by_user.get(user_id, [])
+        merged = [e for entries in self._by_user.values() for e in entries]
+        return sorted(merged, key=lambda e: self._order[e.entry_id])
+
+    def get_last(self, n: Optional[int] = None, user_id: Optional[str] = None) -> List[LedgerEntry]:
+        """
+        Last n entries, oldest first; one user's if user_id is given, else everyone's.
+        With n=None returns all of them and clears them from the ledger.
+        """
         if n is not None:
             if n <= 0:
                 return []
-            return self._entries[-n:]
+            if user_id is not None and n == 1:
+                entries = self._by_user.get(user_id)
+                return entries[-1:] if entries else []
+            return self._entries(user_id)[-n:]
 
-        result = list(self._entries)
-        self._entries.clear()
+        result = list(self._entries(user_id))
+        if user_id is None:
+            self._by_user.clear()
+        else:
+            self._by_user.pop(user_id, None)
+        self._detach(result)
         return result
 
-    def delete_last(self) -> bool:
-        if not self._entries:
+    def delete_last(self, user_id: Optional[str] = None) -> bool:
+        """Remove the user's newest entry (anyone's newest if user_id is None)"""
+        if user_id is None:
+            lasts = [entries[-1] for entries in self._by_user.values() if entries]
+            if not lasts:
+                return False
+            user_id = max(lasts, key=lambda e: self._order[e.entry_id]).user_id
+        entries = self._by_user.get(user_id)
+        if not entries:
             return False
-        self._entries.pop()
+        entry = entries.pop()
+        if not entries:
+            del self._by_user[user_id]
+        self._detach([entry])
         return True
@@ -1,5 +1,6 @@
-import re
+from src.admission import AdmissionRejected
 from src.agents.llm_client import LLMClient
+from src.agents.sanitizer import sanitize
 
 
 class Hermes:
@@ -9,12 +10,13 @@ class Hermes:
         self.prompt = prompt or "You are Hermes, an ethical guide."
         self.llm = LLMClient()
 
-    def respond(self, text: str) -> str:
+    def respond(self, text: str, max_tokens: int | None = None) -> str:
         """
         Provide ethical perspective or crisis intervention.
         
         Args:
             text: User message (or "hermes" trigger)
+            max_tokens: Reply cap; the agent's own default if None
             
         Returns:
             Hermes's response
@@ -30,13 +32,12 @@ class Hermes:
             response = self.llm.call(
                 system_prompt=self.prompt,
                 user_text=text,
-                max_tokens=300,
+                max_tokens=max_tokens or 300,
             )
-            # Remove asterisks around single words (emphasis), remove entire multi-word phrases (stage directions)
-            response = re.sub(r'\*(\w+)\*', r'\1', response)  # *word* -> word
-            response = re.sub(r'\*[^*]*\s+[^*]+\*', '', response)  # Remove multi-word stage directions
-            response = response.strip()
-            return response
+            # Emphasis kept, stage directions and speaker labels dropped
+            return sanitize(response, "hermes")
         
+        except AdmissionRejected:
+            raise  # the API answers 429; don't dress it up as a reply
         except Exception as e:
             return f"Hermes error: {str(e)}"
\ No newline at end of file
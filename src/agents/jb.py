@@ -1,5 +1,6 @@
-import re
+from src.admission import AdmissionRejected
 from src.agents.llm_client import LLMClient
+from src.agents.sanitizer import sanitize
 
 
 class JB:
@@ -9,12 +10,13 @@ class JB:
         self.prompt = prompt or "You are JB, a language critic."
         self.llm = LLMClient()
 
-    def respond(self, text: str) -> str:
+    def respond(self, text: str, max_tokens: int | None = None) -> str:
         """
         Critique user's language using Claude API.
         
         Args:
             text: User message (or "jb" trigger)
+            max_tokens: Reply cap; the agent's own default if None
             
         Returns:
             JB's critique
@@ -30,12 +32,12 @@ class JB:
             response = self.llm.call(
                 system_prompt=self.prompt,
                 user_text=text,
-                max_tokens=200,
+                max_tokens=max_tokens or 200,
             )
             # Remove ALL asterisks - JB should never use them
-            response = response.replace('*', '')
-            response = response.strip()
-            return response.strip()
+            return sanitize(response, "jb")
         
+        except AdmissionRejected:
+            raise  # the API answers 429; don't dress it up as a reply
         except Exception as e:
             return f"JB error: {str(e)}"
\ No newline at end of file
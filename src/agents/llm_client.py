@@ -1,6 +1,12 @@
 
+import logging
 import os
-import anthropic
+
+from src import context_packer
+from src.admission import llm_gate
+from src.prompt_registry import prompt_id
+
+logger = logging.getLogger("lpbd.llm")
 
 
 class LLMClient:
@@ -11,6 +17,8 @@ class LLMClient:
         if not api_key:
             raise RuntimeError("ANTHROPIC_API_KEY is not set in this process")
         
+        import anthropic  # deferred: the SDK is slow to import and not every process calls it
+
         self.client = anthropic.Anthropic()  # Uses ANTHROPIC_API_KEY env var
         self.model = model
 
@@ -30,7 +38,10 @@ class LLMClient:
             
         Raises:
             RuntimeError: If API call fails
+            AdmissionRejected: If too many calls are already running and queued
         """
+        import anthropic
+
         try:
             # Build system parameter with optional caching
             if use_cache:
@@ -44,19 +55,31 @@ class LLMClient:
             else:
                 system = system_prompt
             
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                system=system,
-                messages=[
-                    {"role": "user", "content": user_text}
-                ],
-            )
+            with llm_gate.slot():
+                message = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=max_tokens,
+                    system=system,
+                    messages=[
+                        {"role": "user", "content": user_text}
+                    ],
+                )
             
-            # Log cache performance
+            # Usage record names the prompt by id only (src/prompt_registry.py rebuilds it)
             usage = message.usage
-            if usage.cache_read_input_tokens > 0:
-                print(f"Cache hit: {usage.cache_read_input_tokens} tokens read from cache")
+            cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+            cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+            logger.info("LLM usage", extra={
+                "model": self.model,
+                "prompt_id": prompt_id(system_prompt),
+                "input_tokens": usage.input_tokens,
+                "output_tokens": usage.output_tokens,
+                "cache_read_tokens": cache_read,
+                "cache_write_tokens": cache_write
+            })
+            # Cached prompt tokens aren't in input_tokens; the packer's estimate covers the whole prompt
+            context_packer.shared_estimator.observe(f"{system_prompt}\n{user_text}",
+                                                    usage.input_tokens + cache_read + cache_write)
             
             return message.content[0].text
         except anthropic.APIError as e:
@@ -0,0 +1,166 @@
+"""
+One-pass reply sanitizer shared by all agents.
+
+Replaces the per-agent regex passes and the router's extra label pass with
+a small state machine over the reply text. It reads chunk by chunk, so it
+works the same on a whole reply and on a streamed one: only text that
+can't change any more is handed back, and feeding a reply in any split
+gives exactly the output of feeding it whole.
+
+Asterisk spans (`*...*`, `**...**`):
+- a single word is emphasis: the word is kept, the asterisks dropped
+- anything with a space in it is a stage direction and is dropped entirely
+- `**Name**:` speaker labels are dropped with the spaces after them
+- anything else (unclosed, `*-*`) is left as written
+JB never uses asterisks at all, so his rules just delete them. Leading and
+trailing whitespace of the whole reply is trimmed.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List
+
+_WORD = re.compile(r"\w+")
+_NAME = re.compile(r"[A-Z][a-z]+")
+
+# States
+_TEXT, _OPEN, _SPAN, _CLOSE, _LABEL, _AFTER_LABEL = range(6)
+
+
+@dataclass(frozen=True)
+class SanitizerRules:
+    strip_all_asterisks: bool = False  # JB: remove every "*", no span handling
+
+
+DEFAULT_RULES = SanitizerRules()
+AGENT_RULES: Dict[str, SanitizerRules] = {
+    "jb": SanitizerRules(strip_all_asterisks=True),
+}
+
+
+class Sanitizer:
+    """Incremental sanitizer for one reply: feed() chunks, then finish()"""
+
+    def __init__(self, rules: SanitizerRules = DEFAULT_RULES) -> None:
+        self.rules = rules
+        self._state = _TEXT
+        self._opener = 0
+        self._closer = 0
+        self._span: List[str] = []
+        self._label = ""
+        self._started = False  # anything non-blank emitted yet (leading trim)
+        self._pending_ws = ""  # trailing whitespace held back until more text follows
+        self._out: List[str] = []
+
+    # Output with the reply-level trim applied
+    def _emit(self, text: str) -> None:
+        if not text:
+            return
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return
+            self._started = True
+        body = text.rstrip()
+        if not body:
+            self._pending_ws += text
+            return
+        self._out.append(self._pending_ws + body)
+        self._pending_ws = text[len(body):]
+
+    def _resolve_span(self) -> None:
+        """Closing asterisks read in full: decide what the span becomes"""
+        content = "".join(self._span)
+        self._span = []
+        self._state = _TEXT
+        if self._opener == 2 and self._closer == 2 and _NAME.fullmatch(content):
+            self._label = content  # speaker label if a ":" follows
+            self._state = _LABEL
+        elif _WORD.fullmatch(content):
+            self._emit(content)
+        elif content.strip() and any(ch.isspace() for ch in content):
+            pass  # stage direction
+        else:
+            self._emit("*" * self._opener + content + "*" * self._closer)
+
+    def feed(self, chunk: str) -> str:
+        """Consume the next chunk; returns the text that is now final"""
+        if self.rules.strip_all_asterisks:
+            self._emit(chunk.replace("*", ""))
+            return self._drain()
+
+        i, n = 0, len(chunk)
+        while i < n:
+            state = self._state
+            if state == _TEXT:
+                j = chunk.find("*", i)
+                if j < 0:
+                    self._emit(chunk[i:])
+                    break
+                self._emit(chunk[i:j])
+                self._state, self._opener, i = _OPEN, 1, j + 1
+            elif state == _OPEN:
+                if chunk[i] == "*":
+                    self._opener += 1
+                    i += 1
+                else:
+                    self._state = _SPAN
+            elif state == _SPAN:
+                j = chunk.find("*", i)
+                if j < 0:
+                    self._span.append(chunk[i:])
+                    break
+                self._span.append(chunk[i:j])
+                self._state, self._closer, i = _CLOSE, 1, j + 1
+            elif state == _CLOSE:
+                if chunk[i] == "*":
+                    self._closer += 1
+                    i += 1
+                else:
+                    self._resolve_span()
+            elif state == _LABEL:
+                if chunk[i] == ":":
+                    self._state = _AFTER_LABEL
+                    i += 1
+                else:
+                    self._state = _TEXT
+                    self._emit(self._label)
+            else:  # _AFTER_LABEL
+                if chunk[i].isspace():
+                    i += 1
+                else:
+                    self._state = _TEXT
+        return self._drain()
+
+    def finish(self) -> str:
+        """End of reply: flush whatever is still held"""
+        if self._state == _OPEN:
+            self._emit("*" * self._opener)
+        elif self._state == _SPAN:
+            self._emit("*" * self._opener + "".join(self._span))  # never closed: as written
+        elif self._state == _CLOSE:
+            self._resolve_span()
+        if self._state == _LABEL:
+            self._emit(self._label)
+        self._state = _TEXT
+        self._span = []
+        self._pending_ws = ""  # trailing trim
+        return self._drain()
+
+    def _drain(self) -> str:
+        text = "".join(self._out)
+        self._out = []
+        return text
+
+
+def sanitizer_for(agent: str) -> Sanitizer:
+    """Fresh sanitizer with the agent's rules (one per reply or stream)"""
+    return Sanitizer(AGENT_RULES.get(agent, DEFAULT_RULES))
+
+
+def sanitize(text: str, agent: str) -> str:
+    """Whole-reply convenience: same result as streaming it through sanitizer_for(agent)"""
+    sanitizer = sanitizer_for(agent)
+    return sanitizer.feed(text) + sanitizer.finish()
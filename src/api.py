@@ -1,25 +1,34 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from dotenv import load_dotenv
+load_dotenv()  # Entry point: load .env before anything reads the environment
+
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Header, Response, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session as DBSession
 from typing import Optional, List
 from datetime import datetime, timezone
 from src.router import Router
+from src import bar_round
 from src.calais_weather import get_calais_environment
-from src.database.models import get_db, User, Session, Message as DBMessage
+from src.database.models import get_db, SessionLocal, User, Session, Message as DBMessage, utc_now
+from src.database.memory_manager import MemoryManager, ROLLING_SUMMARY_AFTER
+from src.database.lifecycle import SessionReaper, ReaperThread
+from src.logging_setup import setup_logger, stop_logging
 from src.config.loader import Config
 from src.schemas.message import Message
+from src.persistence import LedgerPersistence
+from src.admission import AdmissionRejected, llm_gate, user_limiter
 from src.calais_weather import get_environment_for_agent
 
+import json
 import uuid
 import time
 import secrets
 import os
-import anthropic
 
 security = HTTPBasic()
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
 app = FastAPI(title="Le Pale Blue Dot API")
 app.add_middleware(
@@ -30,6 +39,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request, exc: AdmissionRejected):
+    """Rate limited or LLM queue full: 429 with a Retry-After hint"""
+    setup_logger().warning("Admission rejected", extra={"reason": exc.reason, "retry_after": exc.retry_after})
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "The bar's full. Try again shortly.", "reason": exc.reason,
+                 "retry_after": exc.retry_after_header},
+        headers={"Retry-After": exc.retry_after_header}
+    )
+
+# --- Session lifecycle (idle warnings, kicks, archiving) ---
+
+reaper_thread: Optional[ReaperThread] = None
+
+@app.on_event("startup")
+def start_session_reaper():
+    """Sweep idle sessions in the background, off the request path"""
+    global reaper_thread
+    if os.getenv("LPBD_DISABLE_REAPER"):
+        return
+    logger = setup_logger()
+    reaper_thread = ReaperThread(
+        SessionReaper(SessionLocal),
+        on_error=lambda e: logger.error("Session reaper failed", extra={"error": str(e)})
+    )
+    reaper_thread.start()
+
+@app.on_event("shutdown")
+def stop_session_reaper():
+    if reaper_thread:
+        reaper_thread.stop()
+    stop_logging()  # flush queued log records
+
+def fold_session_summary(session_id: str):
+    """Background task: fold older messages of a long session into its running summary"""
+    db = SessionLocal()
+    try:
+        MemoryManager(db).update_running_summary(session_id)
+    except Exception as e:
+        setup_logger().error("Running summary failed", extra={"session_id": session_id, "error": str(e)})
+    finally:
+        db.close()
+
+def stream_round(session_id: str, replies: bar_round.Round, user_message_id: str,
+                 warning: Optional[str] = None):
+    """NDJSON body for a streamed "ask the bar" round; each reply is stored as it arrives"""
+    db = SessionLocal()  # own session: the request's may be closed once streaming starts
+    try:
+        if warning:
+            yield json.dumps({"agent": "system", "message": warning}) + "\n"
+        answered = 0
+        for agent, reply in replies:
+            now = utc_now()
+            db.add(DBMessage(session_id=session_id, agent=agent, content=reply, timestamp=now, is_user_message=0))
+            if replies.screened:
+                db.get(Session, session_id).current_agent = agent
+            db.commit()
+            answered += 1
+            yield json.dumps({"agent": agent, "message": reply,
+                              "timestamp": now.replace(tzinfo=timezone.utc).isoformat()}) + "\n"
+        if not answered:
+            yield json.dumps({"agent": "bar", "message": bar_round.NO_REPLIES}) + "\n"
+    except AdmissionRejected as e:
+        # Turned away before any reply: unstore the message so a retry doesn't double it
+        db.query(DBMessage).filter(DBMessage.id == user_message_id).delete()
+        db.get(Session, session_id).message_count -= 1
+        db.commit()
+        # Headers are already sent: say it in-band
+        yield json.dumps({"agent": "system", "message": "The bar's full. Try again shortly.",
+                          "retry_after": e.retry_after_header}) + "\n"
+    finally:
+        db.close()
+
 def verify_credentials(credentials: HTTPBasicCredentials = Depends(security)):
     """Verify HTTP Basic Auth credentials"""
     correct_username = secrets.compare_digest(
@@ -62,6 +145,12 @@ class MessageRequest(BaseModel):
     session_id: str
     content: str = Field(..., min_length=1, max_length=500)
     selected_agent: Optional[str] = None
+    ask_bar: bool = False  # same as a "bar:" prefix: every regular answers
+    stream: bool = False  # ask_bar only: NDJSON, one line per reply as it finishes
+
+class AgentReply(BaseModel):
+    agent: str
+    message: str
 
 class MessageResponse(BaseModel):
     agent: str
@@ -72,6 +161,7 @@ class MessageResponse(BaseModel):
     session_status: str
     message_count: int
     message_limit: int
+    replies: List[AgentReply] = []  # "ask the bar" rounds: each agent's reply, in the order they finished
 
 class OnboardRequest(BaseModel):
     anonymous_id: str
@@ -106,9 +196,11 @@ async def start_session(
     weather = get_environment_for_agent()
     
     # Create session WITH weather
+    now = utc_now()
     session = Session(
         user_id=user.id,
-        started_at=datetime.now(timezone.utc),
+        started_at=now,
+        last_activity_at=now,
         status="active",
         weather=weather,  # Store in session for entire session
         message_count=0
@@ -120,16 +212,21 @@ async def start_session(
     return {"session_id": session.id, "status": "active"}
 
 @app.post("/message", response_model=MessageResponse)
-async def send_message(
+def send_message(
     request: MessageRequest,
+    background_tasks: BackgroundTasks,
     username: str = Depends(verify_credentials),
     db: DBSession = Depends(get_db)):
+    # Plain def: FastAPI runs it on the threadpool, so waiting on the database,
+    # the LLM gate or Claude blocks a worker thread, never the event loop.
+    # The pool (40 threads) is larger than LLM_CONCURRENCY + LLM_QUEUE.
 
-    # Get session from database
-    session = db.query(Session).filter(Session.id == request.session_id).first()
+    # Load session, user and conversation history in one round trip
+    turn = MemoryManager(db).load_turn_context(request.session_id)
     
-    if not session:
+    if not turn:
         raise HTTPException(status_code=404, detail="Session not found")
+    session = turn.session
     
     # Check session status
     if session.status in ["kicked", "ended"]:
@@ -140,9 +237,14 @@ async def send_message(
     # Check message limit
     if session.message_count >= 30:
         session.status = "ended"
+        session.ended_at = utc_now()  # Reaper archives it on its next sweep
         db.commit()
         raise HTTPException(status_code=429, detail="Message limit reached.")
     
+    # Admission: per-user rate, then a fast refusal if the LLM queue is already full
+    user_limiter.admit(session.user_id)
+    llm_gate.check()
+    
     # === HANDLE ENTRANCE GREETING ===
     if request.content == "::USER_ENTERED_BAR::":
         # Initialize Router WITH WEATHER
@@ -156,14 +258,14 @@ async def send_message(
         )
         
         # Get Bart's greeting with full context
-        agent_response = router.execute_agent('bart', msg, db_session=db)
+        agent_response = router.execute_agent('bart', msg, db_session=db, turn_context=turn)
         
         # Store only Bart's greeting (not the system message)
         agent_message = DBMessage(
             session_id=session.id,
             agent='bart',
             content=agent_response,
-            timestamp=datetime.now(timezone.utc),
+            timestamp=utc_now(),
             is_user_message=0
         )
         db.add(agent_message)
@@ -186,58 +288,126 @@ async def send_message(
         warning = "Last call! Five messages remaining."
     
     # Store user message in database
+    user_timestamp = utc_now()
     user_message = DBMessage(
         session_id=session.id,
         agent="user",
         content=request.content,
-        timestamp=datetime.now(timezone.utc),
+        timestamp=user_timestamp,
         is_user_message=1
     )
     db.add(user_message)
     session.message_count += 1
+    session.last_activity_at = user_timestamp
+    if session.status == "warning_15min":
+        session.status = "active"  # User is back, reset the inactivity timer
     db.commit()
+    # Keep the loaded history current without re-querying
+    turn.append_hot("user", request.content, user_timestamp, is_user=True)
     
-    # Initialize Router WITH WEATHER
-    router = Router(weather_context=session.weather)
+    try:
+        # Initialize Router WITH WEATHER
+        router = Router(weather_context=session.weather)
     
-    # Build Message for Router
-    msg = Message(
-        user_id=session.user_id,
-        text=request.content,
-        session_id=request.session_id
-    )
+        # Build Message for Router
+        msg = Message(
+            user_id=session.user_id,
+            text=request.content,
+            session_id=request.session_id
+        )
 
-    # ROUTING LOGIC (with handoff support)
-    # Priority: 1. Pending handoff, 2. Manual selection, 3. Auto-routing
-    if session.pending_handoff and not request.selected_agent:
-        # Handoff takes priority
-        agent_name = session.pending_handoff
-        agent_response = router.execute_agent(session.pending_handoff, msg, db_session=db)
-        # Clear the handoff
-        session.pending_handoff = None
+        # "Ask the bar": one message to every regular, answered concurrently
+        if request.ask_bar or bar_round.is_round(request.content):
+            replies = router.ask_the_bar(msg, db_session=db, turn_context=turn)
+            if request.stream:
+                if session.message_count * 2 >= ROLLING_SUMMARY_AFTER:
+                    background_tasks.add_task(fold_session_summary, session.id)
+                return StreamingResponse(stream_round(session.id, replies, user_message.id, warning),
+                                         media_type="application/x-ndjson")
+        
+            screened = replies.screened
+            replies = list(replies)
+            for agent, reply in replies:
+                db.add(DBMessage(
+                    session_id=session.id,
+                    agent=agent,
+                    content=reply,
+                    timestamp=utc_now(),
+                    is_user_message=0
+                ))
+            if screened:
+                # Hermes (crisis) or Blanca (moderation) answered alone
+                agent_name, agent_response = replies[0]
+                session.current_agent = agent_name
+            else:
+                agent_name, agent_response = "bar", bar_round.format_round(replies)
+            db.commit()
+        
+            if warning:
+                agent_response = f"{warning}\n\n{agent_response}"
+            if session.message_count * 2 >= ROLLING_SUMMARY_AFTER:
+                background_tasks.add_task(fold_session_summary, session.id)
+        
+            return MessageResponse(
+                agent=agent_name,
+                message=agent_response,
+                timestamp=datetime.now(timezone.utc).isoformat(),
+                agents_available=["bart", "bernie", "jb", "blanca", "hermes"],
+                agents_muted=list(router.muted_agents),
+                session_status=session.status,
+                message_count=session.message_count,
+                message_limit=30,
+                replies=[AgentReply(agent=agent, message=reply) for agent, reply in replies]
+            )
+    
+        # ROUTING LOGIC (with handoff support)
+        # Priority: 0. Local crisis screen + moderation, 1. Pending handoff, 2. Manual selection, 3. Auto-routing
+        # (router.handle runs both checks itself on the auto-routed path)
+        crisis = None
+        blanca_warning = None
+        if session.pending_handoff or request.selected_agent:
+            crisis = router.assess_crisis(msg)
+            if not crisis.urgent:
+                blanca_warning = router.screen(msg, turn)
+        if crisis is not None and crisis.urgent:
+            # Crisis outranks any handoff or selection: straight to Hermes
+            agent_name = "hermes"
+            agent_response = router.execute_agent("hermes", msg, db_session=db, turn_context=turn)
+            session.pending_handoff = None
+            db.commit()
+        elif blanca_warning:
+            agent_name, agent_response = "blanca", blanca_warning
+        elif session.pending_handoff and not request.selected_agent:
+            # Handoff takes priority
+            agent_name = session.pending_handoff
+            agent_response = router.execute_agent(session.pending_handoff, msg, db_session=db, turn_context=turn)
+            # Clear the handoff
+            session.pending_handoff = None
+            db.commit()
+        elif request.selected_agent:
+            # Manual agent selection
+            agent_name = request.selected_agent
+            agent_response = router.execute_agent(request.selected_agent, msg, db_session=db, turn_context=turn)
+        else:
+            # Auto-routing - pass current agent for stickiness
+            router.last_agent = session.current_agent  # Tell router who user is talking to
+            agent_name, agent_response = router.handle(msg, db_session=db, turn_context=turn)
+    except AdmissionRejected:
+        # Turned away before any reply: unstore the message so a retry doesn't double it
+        db.delete(user_message)
+        session.message_count -= 1
         db.commit()
-    elif request.selected_agent:
-        # Manual agent selection
-        agent_name = request.selected_agent
-        agent_response = router.execute_agent(request.selected_agent, msg, db_session=db)
-    else:
-        # Auto-routing - pass current agent for stickiness
-        router.last_agent = session.current_agent  # Tell router who user is talking to
-        agent_name, agent_response = router.handle(msg, db_session=db)
+        raise
     
     # Update current agent in session (after all routing paths)
     session.current_agent = agent_name
     db.commit()
     
-    # Check if agent said "Let me get [Agent]" for handoff
-    if "let me get" in agent_response.lower():
-        import re
-        match = re.search(r'let me get (\w+)', agent_response.lower())
-        if match:
-            target_agent = match.group(1)
-            if target_agent in ['bernie', 'jb', 'hermes', 'blanca']:
-                session.pending_handoff = target_agent
-                db.commit()
+    # Did the agent hand off ("Let me get JB", "Bernie's territory", ...)? Next message goes there
+    target_agent = router._should_handoff(request.content, agent_name, agent_response)
+    if target_agent:
+        session.pending_handoff = target_agent
+        db.commit()
     
     # Add warning if needed
     if warning:
@@ -248,12 +418,16 @@ async def send_message(
         session_id=session.id,
         agent=agent_name,
         content=agent_response,
-        timestamp=datetime.now(timezone.utc),
+        timestamp=utc_now(),
         is_user_message=0
     )
     db.add(agent_message)
     db.commit()
     
+    # Long session: fold older messages into the running summary after responding
+    if session.message_count * 2 >= ROLLING_SUMMARY_AFTER:
+        background_tasks.add_task(fold_session_summary, session.id)
+    
     return MessageResponse(
         agent=agent_name,
         message=agent_response,
@@ -265,6 +439,51 @@ async def send_message(
         message_limit=30
     )
 
+@app.get("/bukowski/sync")
+def bukowski_sync(
+    anonymous_id: str,
+    response: Response,
+    since: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    username: str = Depends(verify_credentials),
+    db: DBSession = Depends(get_db)):
+    """
+    Ledger changes for the Bukowski desktop app since its last cursor.
+    The ETag is per user (journal generation + where their last record
+    ends): if none of their entries changed, If-None-Match gets a 304
+    without reading their ledger, whatever other patrons wrote meanwhile.
+    """
+    user = db.query(User).filter(User.anonymous_id == anonymous_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    store = LedgerPersistence()
+    # Tag before the delta: a record landing in between costs one extra 200, never a missed change
+    etag = f'"{store.user_tag(user.id)}"'
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    delta = store.changes(user.id, since)
+    response.headers["ETag"] = etag
+    return delta
+
+@app.get("/session/{session_id}/status")
+async def session_status(
+    session_id: str,
+    username: str = Depends(verify_credentials),
+    db: DBSession = Depends(get_db)):
+    """Check timeout status without sending a message"""
+    session = db.query(Session).filter(Session.id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    return {
+        "session_id": session.id,
+        "session_status": session.status,
+        "message_count": session.message_count,
+        "message_limit": 30
+    }
+
 @app.post("/api/onboard")
 async def onboard(request: OnboardRequest, db: Session = Depends(get_db)):
     """
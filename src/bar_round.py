@@ -0,0 +1,107 @@
+"""
+"Ask the bar": one message, several agents, answered concurrently.
+
+A patron who types `bar: ...` (or sends ask_bar) gets every non-muted
+regular's take in one go instead of five routed messages. The Router
+builds each agent's prompt on the calling thread (database, context packer
+and prompt registry stay single-threaded); only the LLM calls fan out, on
+one bounded pool shared by all requests. Replies come back in the order
+they finish, so the wait is the slowest agent, not the sum of them.
+
+Round replies are shorter than solo ones: several land at once.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.admission import AdmissionRejected
+
+PREFIX = "bar:"
+ROUND_AGENTS = ("bart", "bernie", "jb", "hermes")  # Blanca referees, she doesn't opine
+ROUND_MAX_TOKENS: Dict[str, int] = {"bart": 120, "bernie": 120, "jb": 100, "hermes": 150}
+MAX_WORKERS = int(os.getenv("LPBD_BAR_WORKERS", "4"))
+NO_REPLIES = "Nobody at the bar has an answer for that one. Ask again in a minute."
+
+logger = logging.getLogger("lpbd.bar_round")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="bar-round")
+    return _executor
+
+
+def is_round(text: str) -> bool:
+    return text.strip().lower().startswith(PREFIX)
+
+
+def strip_prefix(text: str) -> str:
+    """The question without `bar:`; unchanged if it has none"""
+    stripped = text.strip()
+    return stripped[len(PREFIX):].strip() if is_round(stripped) else text
+
+
+def round_agents(muted: Iterable[str] = ()) -> List[str]:
+    muted = set(muted)
+    return [agent for agent in ROUND_AGENTS if agent not in muted]
+
+
+class Round:
+    """
+    (agent, reply) pairs for one "ask the bar" message, iterated as they come in.
+    `screened` names the agent who answered alone instead of the bar (Hermes
+    for a crisis, Blanca for a moderation stop); None for a real round.
+    """
+
+    def __init__(self, replies: Iterable[Tuple[str, str]], screened: Optional[str] = None) -> None:
+        self._replies = iter(replies)
+        self.screened = screened
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return self._replies
+
+
+def fan_out(calls: Dict[str, Callable[[], str]]) -> Iterator[Tuple[str, str]]:
+    """
+    Run each agent's call on the shared pool; yield (agent, reply) as each finishes.
+    An agent whose call raises is logged and left out of the round; if
+    admission control turned every one of them away, that rejection is raised.
+    """
+    futures: Dict[Future, str] = {_pool().submit(call): agent for agent, call in calls.items()}
+    answered = 0
+    rejected: Optional[AdmissionRejected] = None
+    for future in as_completed(futures):
+        agent = futures[future]
+        try:
+            reply = future.result()
+        except AdmissionRejected as e:
+            rejected = e
+            logger.warning("Bar round agent rejected", extra={"agent": agent, "reason": e.reason})
+            continue
+        except Exception as e:
+            logger.warning("Bar round agent failed", extra={"agent": agent, "error": str(e)})
+            continue
+        answered += 1
+        yield agent, reply
+    if rejected is not None and not answered:
+        raise rejected
+
+
+def format_round(replies: Iterable[Tuple[str, str]]) -> str:
+    """One message for the whole round, agents in bar order whatever order they finished in"""
+    order = {agent: i for i, agent in enumerate(ROUND_AGENTS)}
+    ranked = sorted(replies, key=lambda pair: order.get(pair[0], len(order)))
+    if not ranked:
+        return NO_REPLIES  # every agent failed
+    return "\n\n".join(f"{agent.title() if agent != 'jb' else 'JB'}: {reply}" for agent, reply in ranked)
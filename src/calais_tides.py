@@ -4,7 +4,6 @@ Fetches daily high/low tide times from StormGlass API
 """
 
 import os
-import requests
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional
 import json
@@ -17,7 +16,6 @@ CALAIS_LON = 1.8587
 
 # Cache file location
 CACHE_FILE = Path("data/tide_cache.json")
-CACHE_FILE.parent.mkdir(exist_ok=True)
 
 # StormGlass API
 STORMGLASS_API_KEY = os.getenv("STORMGLASS_API_KEY", "4df2b95c-d4e7-11f0-9b8c-0242ac130003-4df2b9c0-d4e7-11f0-9b8c-0242ac130003")
@@ -39,9 +37,11 @@ def _fetch_from_api() -> Dict:
     }
     
     headers = {
-        'Authorization': STORMGLASS_API_KEY
+        'Authorization': os.getenv('STORMGLASS_API_KEY', STORMGLASS_API_KEY)
     }
     
+    import requests  # deferred: only needed when actually fetching
+    
     try:
         response = requests.get(
             STORMGLASS_ENDPOINT,
@@ -123,6 +123,7 @@ def _save_to_cache(data: Dict) -> None:
     """Save tide data to cache file."""
     
     try:
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
         with open(CACHE_FILE, 'w') as f:
             json.dump(data, f, indent=2)
     except IOError as e:
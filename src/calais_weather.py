@@ -4,13 +4,9 @@ Fetches real weather and calculates lighting conditions.
 Agents reference this to ground the bar in actual time/place.
 """
 
-from dotenv import load_dotenv
-load_dotenv()  # This loads .env file
-
 import os
 from datetime import datetime
 from zoneinfo import ZoneInfo
-import requests
 from functools import lru_cache
 from typing import Dict, Optional
 
@@ -19,7 +15,6 @@ CALAIS_LAT = 50.9513
 CALAIS_LON = 1.8587
 CALAIS_TZ = ZoneInfo("Europe/Paris")
 
-OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "")
 
 
 @lru_cache(maxsize=1)
@@ -29,14 +24,17 @@ def _fetch_weather_cached(cache_key: str) -> Optional[Dict]:
     Cached for 30 minutes (cache_key is timestamp rounded to 30min).
     Returns None if API key missing or request fails.
     """
-    if not OPENWEATHER_API_KEY:
+    api_key = os.getenv("OPENWEATHER_API_KEY", "")  # read at call time, after .env is loaded
+    if not api_key:
         return None
     
+    import requests  # deferred: only needed when actually fetching
+    
     url = "https://api.openweathermap.org/data/2.5/weather"
     params = {
         "lat": CALAIS_LAT,
         "lon": CALAIS_LON,
-        "appid": OPENWEATHER_API_KEY,
+        "appid": api_key,
         "units": "metric"  # Celsius
     }
     
@@ -48,16 +46,24 @@ def _fetch_weather_cached(cache_key: str) -> Optional[Dict]:
         return None
 
 
+def weather_bucket(now: Optional[datetime] = None) -> str:
+    """Current 30-minute bucket, e.g. "2025-01-10-22-30". Weather (and prompts) change per bucket."""
+    now = now or datetime.now(CALAIS_TZ)
+    return now.strftime("%Y-%m-%d-%H") + ("-00" if now.minute < 30 else "-30")
+
+
+def bucket_start(bucket: str) -> datetime:
+    """First minute of a weather_bucket key, in Calais time"""
+    return datetime.strptime(bucket, "%Y-%m-%d-%H-%M").replace(tzinfo=CALAIS_TZ)
+
+
 def get_current_weather() -> Optional[Dict]:
     """
     Get current Calais weather with 30-minute caching.
     Returns dict with: temp, feels_like, conditions, description, wind_speed
     """
     # Round current time to nearest 30 minutes for cache key
-    now = datetime.now(CALAIS_TZ)
-    cache_key = now.strftime("%Y-%m-%d-%H") + ("-00" if now.minute < 30 else "-30")
-    
-    data = _fetch_weather_cached(cache_key)
+    data = _fetch_weather_cached(weather_bucket())
     if not data:
         return None
     
@@ -114,12 +120,12 @@ def get_sun_times() -> Dict[str, datetime]:
     }
 
 
-def get_time_of_day() -> str:
+def get_time_of_day(now: Optional[datetime] = None) -> str:
     """
-    Determine current lighting period in Calais.
+    Determine current lighting period in Calais (or at `now`).
     Returns: "night", "dawn", "day", "dusk"
     """
-    now = datetime.now(CALAIS_TZ)
+    now = now or datetime.now(CALAIS_TZ)
     sun = get_sun_times()
     
     sunrise = sun["sunrise"]
@@ -207,22 +213,29 @@ def get_calais_environment() -> str:
     return ", ".join(parts) + "."
 
 
-def get_environment_for_agent() -> str:
+def get_environment_for_agent(bucket: Optional[str] = None) -> str:
     """
     Shorter version for agent system prompts.
     Just the essentials without being too verbose.
+    With a weather_bucket key, describes that half hour ("around 22:30")
+    so the text stays the same for the whole bucket.
     """
-    now = datetime.now(CALAIS_TZ)
+    if bucket:
+        now = bucket_start(bucket)
+        clock = f"around {now.strftime('%H:%M')}"
+    else:
+        now = datetime.now(CALAIS_TZ)
+        clock = now.strftime('%H:%M')
     weather = get_current_weather()
-    time_period = get_time_of_day()
+    time_period = get_time_of_day(now)
     
     if not weather:
-        return f"It's {time_period}, {now.strftime('%H:%M')}."
+        return f"It's {time_period}, {clock}."
     
     temp = weather["temp"]
     conditions = weather["description"]
     
-    return f"It's {time_period}, {now.strftime('%H:%M')}, {temp}°C, {conditions} outside the window."
+    return f"It's {time_period}, {clock}, {temp}°C, {conditions} outside the window."
 
 
 # For testing/debugging
@@ -0,0 +1,144 @@
+"""
+Bar lore split into sections, picked per message.
+
+bar_context.yaml's common_knowledge is one long block of titled sections
+("LOCATION & GEOGRAPHY:", "FOOD:", ...). A few core sections go into every
+prompt; the rest are scored against the incoming message with BM25 and only
+the ones it touches are added.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+# Sections every agent gets regardless of the message (overridable in bar_context.yaml)
+DEFAULT_CORE_SECTIONS = ("LOCATION & GEOGRAPHY", "CURRENT OPERATIONS", "IN THE BAR RIGHT NOW")
+MAX_MATCHED_SECTIONS = 3
+MIN_MATCH_SCORE = 1.0
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_HEADER = re.compile(r"^([A-Z][A-Z0-9 &'()/,.\-]+):\s*$")
+_WORD = re.compile(r"[a-z0-9]+")
+_IGNORED = frozenset("""
+a about all an and are as at be but by do does for from get got has have he her here his how
+i in is it its just know like me my no not of on or she so tell that the their them there they
+this to was we were what when where which who why with you your
+""".split())
+
+
+def _terms(text: str) -> List[str]:
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if word in _IGNORED:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]  # tides -> tide, sailors -> sailor
+        terms.append(word)
+    return terms
+
+
+@dataclass
+class BarSection:
+    title: str
+    text: str  # title line included
+
+    @property
+    def key(self) -> str:
+        return self.title.upper()
+
+
+def parse_sections(common_knowledge: str) -> List[BarSection]:
+    """Split common_knowledge on its "TITLE:" lines; text before the first title is dropped"""
+    sections: List[BarSection] = []
+    for line in common_knowledge.splitlines():
+        match = _HEADER.match(line.strip())
+        if match:
+            sections.append(BarSection(title=match.group(1), text=line.strip()))
+        elif sections:
+            sections[-1].text += f"\n{line.rstrip()}"
+    for section in sections:
+        section.text = section.text.strip()
+    return sections
+
+
+class BarKnowledge:
+    """Core sections + a BM25 index over the rest, built once per load"""
+
+    def __init__(self, sections: Sequence[BarSection],
+                 core_titles: Sequence[str] = DEFAULT_CORE_SECTIONS,
+                 keywords: Dict[str, str] | None = None) -> None:
+        """
+        Args:
+            sections: Parsed sections, in file order
+            core_titles: Sections included in every prompt
+            keywords: Extra search words per section title (indexed, never shown)
+        """
+        self.sections = list(sections)
+        core = {title.upper() for title in core_titles}
+        self.core = [s for s in self.sections if s.key in core]
+        self.optional = [s for s in self.sections if s.key not in core]
+
+        keywords = {title.upper(): words for title, words in (keywords or {}).items()}
+        self._doc_terms: List[Counter] = [
+            Counter(_terms(f"{s.text} {keywords.get(s.key, '')}")) for s in self.optional
+        ]
+        self._doc_len = [sum(terms.values()) for terms in self._doc_terms]
+        self._avg_len = (sum(self._doc_len) / len(self._doc_len)) if self._doc_len else 0.0
+        doc_freq: Counter = Counter(term for terms in self._doc_terms for term in terms)
+        n = len(self._doc_terms)
+        self._idf: Dict[str, float] = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()
+        }
+
+    @classmethod
+    def from_config(cls, context_data: dict) -> "BarKnowledge":
+        """Build from the parsed bar_context.yaml"""
+        return cls(
+            parse_sections(context_data.get("common_knowledge", "") or ""),
+            context_data.get("core_sections") or DEFAULT_CORE_SECTIONS,
+            context_data.get("section_keywords")
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.sections)
+
+    def scores(self, query: str) -> List[float]:
+        """BM25 score of each optional section for the query"""
+        query_terms = set(_terms(query))
+        scores = []
+        for terms, length in zip(self._doc_terms, self._doc_len):
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if not tf:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self._avg_len)
+                score += self._idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def match(self, query: str, k: int = MAX_MATCHED_SECTIONS,
+              min_score: float = MIN_MATCH_SCORE) -> List[BarSection]:
+        """Optional sections the message touches, in file order"""
+        if not query or not self.optional:
+            return []
+        ranked = sorted(
+            ((score, i) for i, score in enumerate(self.scores(query)) if score >= min_score),
+            reverse=True
+        )[:k]
+        return [self.optional[i] for i in sorted(i for _, i in ranked)]
+
+    def core_text(self) -> str:
+        return "\n\n".join(s.text for s in self.core)
+
+    def matched_text(self, query: str) -> str:
+        return "\n\n".join(s.text for s in self.match(query))
+
+    def full_text(self) -> str:
+        return "\n\n".join(s.text for s in self.sections)
@@ -0,0 +1,120 @@
+"""
+Per-agent prompt templates.
+
+Each agent's system prompt is compiled once into static text plus two
+slots: the environment line (changes per 30-minute weather bucket) and the
+tide block (changes per day, Bart/Bernie/JB only). Slot values and rendered
+prompts (with their hashes) are memoized process-wide, so building a prompt
+is a dict lookup except the first time in each bucket.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from src.calais_weather import get_environment_for_agent, weather_bucket
+from src.calais_tides import get_tide_context_for_agent
+
+TIDE_AGENTS = frozenset({"bart", "bernie", "jb"})
+
+ENVIRONMENT_FRAME = (
+    "CURRENT ENVIRONMENT: {environment}\n"
+    "Visible through the window. Mention only if genuinely relevant—don't force weather into every response.\n\n"
+)
+
+_MAX_RENDERS = 256
+
+# Process-wide memo tables
+_environment_by_bucket: Dict[str, str] = {}
+_tides_by_date: Dict[str, str] = {}
+# (agent, bucket, tide date, template hash) -> (prompt, prompt hash)
+_renders: Dict[Tuple[str, str, Optional[str], str], Tuple[str, str]] = {}
+
+
+def content_hash(text: str) -> str:
+    """Short stable hash, for telling prompt versions apart in logs"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    agent: str
+    system_prompt: str
+    uses_tides: bool
+    hash: str = field(default="", compare=False)  # computed once, when the template is compiled
+
+    def __post_init__(self) -> None:
+        if not self.hash:
+            object.__setattr__(self, "hash", content_hash(f"{self.agent}\0{self.uses_tides}\0{self.system_prompt}"))
+
+    def render(self, environment: str, tide_context: Optional[str]) -> str:
+        prompt = ENVIRONMENT_FRAME.format(environment=environment) + self.system_prompt
+        if self.uses_tides:
+            prompt = f"{tide_context}\n\n{prompt}"
+        return prompt
+
+
+def compile_templates(prompts: Dict[str, dict], tide_agents: Iterable[str] = TIDE_AGENTS) -> Dict[str, PromptTemplate]:
+    """One template per agent section that has a system_prompt"""
+    tide_agents = set(tide_agents)
+    return {
+        agent: PromptTemplate(
+            agent=agent,
+            system_prompt=section.get("system_prompt", "") if isinstance(section, dict) else "",
+            uses_tides=agent in tide_agents
+        )
+        for agent, section in prompts.items()
+    }
+
+
+def _tide_date(now: Optional[datetime] = None) -> str:
+    # Same day boundary as the tide cache file
+    return (now or datetime.now()).strftime("%Y-%m-%d")
+
+
+def environment_slot(bucket: str, fetch: Optional[Callable[[str], str]] = None) -> str:
+    text = _environment_by_bucket.get(bucket)
+    if text is None:
+        _environment_by_bucket.clear()  # only the current bucket is ever asked for again
+        text = _environment_by_bucket[bucket] = (fetch or get_environment_for_agent)(bucket)
+    return text
+
+
+def tide_slot(tide_date: str, bucket: str, fetch: Optional[Callable[[], str]] = None) -> str:
+    # A failed fetch is kept for one bucket only, so it's retried every 30 minutes, not all day
+    retry_key = f"{tide_date}/{bucket}"
+    text = _tides_by_date.get(tide_date) or _tides_by_date.get(retry_key)
+    if text is None:
+        text = (fetch or get_tide_context_for_agent)()
+        _tides_by_date.clear()
+        _tides_by_date[retry_key if "unavailable" in text else tide_date] = text
+    return text
+
+
+def _rendered(template: PromptTemplate, now: Optional[datetime] = None) -> Tuple[str, str]:
+    bucket = weather_bucket(now)
+    tide_date = _tide_date(now) if template.uses_tides else None
+    key = (template.agent, bucket, tide_date, template.hash)
+
+    rendered = _renders.get(key)
+    if rendered is None:
+        environment = environment_slot(bucket)
+        tide_context = tide_slot(tide_date, bucket) if template.uses_tides else None
+        prompt = template.render(environment, tide_context)
+        if len(_renders) >= _MAX_RENDERS:
+            _renders.clear()
+        rendered = _renders[key] = (prompt, content_hash(prompt))
+    return rendered
+
+
+def render(template: PromptTemplate, now: Optional[datetime] = None) -> str:
+    """Prompt for the current (agent, environment bucket, tide date), memoized"""
+    return _rendered(template, now)[0]
+
+
+def render_hash(template: PromptTemplate, now: Optional[datetime] = None) -> str:
+    """content_hash of what render returns, memoized with it"""
+    return _rendered(template, now)[1]
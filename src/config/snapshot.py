@@ -0,0 +1,223 @@
+"""
+Immutable config snapshot with hot reload.
+
+All YAML (agent prompts, router descriptions, bar context, onboarding,
+moderation, handoff phrases, crisis signals) is
+parsed once into a frozen ConfigSnapshot. A ConfigStore hands out the
+current snapshot and, at most every LPBD_CONFIG_POLL seconds, compares the
+files' mtimes; when something changed it builds and validates a new
+snapshot off to the side and swaps it in with one assignment. A broken edit
+is logged and ignored, the old snapshot keeps serving.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+import yaml
+
+from src.config.bar_knowledge import BarKnowledge
+from src.config import prompt_templates
+from src.crisis import CrisisScreen
+from src.flood import FloodDetector
+from src.handoff import HandoffDetector
+from src.moderation import Moderator
+
+REQUIRED_AGENTS = ("bart", "bernie", "jb", "blanca", "hermes")
+POLL_INTERVAL_SECONDS = float(os.getenv("LPBD_CONFIG_POLL", "2"))
+
+BAR_CONTEXT_PATH = Path("src/config/bar_context.yaml")
+ONBOARDING_PATH = Path("src/config/onboarding_context.yaml")
+MODERATION_PATH = Path("src/config/moderation.yaml")
+HANDOFF_PATH = Path("src/config/handoff.yaml")
+CRISIS_PATH = Path("src/config/crisis.yaml")
+
+logger = logging.getLogger("lpbd.config")
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    prompts: Mapping[str, dict]
+    templates: Mapping[str, prompt_templates.PromptTemplate]
+    router_descriptions: Mapping[str, dict]
+    bar_knowledge: BarKnowledge
+    bar_context: str
+    onboarding: Mapping[str, object]
+    moderator: Moderator
+    flood_detector: FloodDetector
+    handoff_detector: HandoffDetector
+    crisis_screen: CrisisScreen
+    mtimes: Tuple[Tuple[str, int], ...]
+
+
+def _read_yaml(path: Path) -> dict:
+    with path.open("r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _mtimes(paths) -> Tuple[Tuple[str, int], ...]:
+    stamps = []
+    for path in sorted(paths, key=str):
+        try:
+            stamps.append((str(path), path.stat().st_mtime_ns))
+        except FileNotFoundError:
+            stamps.append((str(path), 0))
+    return tuple(stamps)
+
+
+def _watched(prompts_dir: Path, *paths: Path):
+    return list(prompts_dir.glob("*.yaml")) + [prompts_dir, *paths]
+
+
+def load_snapshot(prompts_dir: Path, bar_context_path: Path = BAR_CONTEXT_PATH,
+                  onboarding_path: Path = ONBOARDING_PATH,
+                  moderation_path: Path = MODERATION_PATH,
+                  handoff_path: Path = HANDOFF_PATH,
+                  crisis_path: Path = CRISIS_PATH) -> ConfigSnapshot:
+    """Parse and validate every config file. Raises ValueError if the result isn't usable."""
+    # Stamp first: an edit landing mid-load is picked up on the next poll
+    mtimes = _mtimes(_watched(prompts_dir, bar_context_path, onboarding_path, moderation_path,
+                              handoff_path, crisis_path))
+
+    prompts: Dict[str, dict] = {}
+    for prompt_file in prompts_dir.glob("*.yaml"):
+        agent_name = prompt_file.stem
+        agent_config = _read_yaml(prompt_file)
+        # YAML has agent_name as top-level key, extract it
+        prompts[agent_name] = agent_config.get(agent_name, agent_config)
+
+    missing = [a for a in REQUIRED_AGENTS if not (prompts.get(a) or {}).get("system_prompt")]
+    if missing:
+        raise ValueError(f"Missing system_prompt for: {', '.join(missing)}")
+
+    router_descriptions = prompts.get("router_descriptions") or {}
+    if not isinstance(router_descriptions, dict) or not router_descriptions:
+        raise ValueError("router_descriptions.yaml is empty or not a mapping")
+
+    bar_knowledge = BarKnowledge([])
+    if bar_context_path.exists():
+        bar_knowledge = BarKnowledge.from_config(_read_yaml(bar_context_path))
+        if not bar_knowledge:
+            raise ValueError(f"{bar_context_path} has no sections")
+
+    onboarding = _read_yaml(onboarding_path) if onboarding_path.exists() else {}
+
+    moderator = Moderator()
+    flood_detector = FloodDetector()
+    if moderation_path.exists():
+        try:
+            moderation = _read_yaml(moderation_path)
+            moderator = Moderator.from_config(moderation)
+            flood_detector = FloodDetector.from_config(moderation)
+        except (KeyError, AttributeError, TypeError, ValueError) as e:
+            raise ValueError(f"{moderation_path} is malformed: {e}") from e
+
+    handoff_detector = HandoffDetector()
+    if handoff_path.exists():
+        try:
+            handoff_detector = HandoffDetector.from_config(_read_yaml(handoff_path))
+        except (AttributeError, TypeError, re.error) as e:
+            raise ValueError(f"{handoff_path} is malformed: {e}") from e
+
+    crisis_screen = CrisisScreen()
+    if crisis_path.exists():
+        try:
+            crisis_screen = CrisisScreen.from_config(_read_yaml(crisis_path))
+        except (AttributeError, TypeError, ValueError, re.error) as e:
+            raise ValueError(f"{crisis_path} is malformed: {e}") from e
+
+    return ConfigSnapshot(
+        prompts=MappingProxyType(prompts),
+        templates=MappingProxyType(prompt_templates.compile_templates(prompts)),
+        router_descriptions=MappingProxyType(router_descriptions),
+        bar_knowledge=bar_knowledge,
+        bar_context=bar_knowledge.full_text(),
+        onboarding=MappingProxyType(onboarding),
+        moderator=moderator,
+        flood_detector=flood_detector,
+        handoff_detector=handoff_detector,
+        crisis_screen=crisis_screen,
+        mtimes=mtimes
+    )
+
+
+class ConfigStore:
+    """Current snapshot for one prompts directory, reloaded when its files change"""
+
+    def __init__(self, prompts_dir: Path, bar_context_path: Path = BAR_CONTEXT_PATH,
+                 onboarding_path: Path = ONBOARDING_PATH,
+                 poll_interval: float = POLL_INTERVAL_SECONDS,
+                 moderation_path: Path = MODERATION_PATH,
+                 handoff_path: Path = HANDOFF_PATH,
+                 crisis_path: Path = CRISIS_PATH) -> None:
+        self.prompts_dir = Path(prompts_dir)
+        self.bar_context_path = Path(bar_context_path)
+        self.onboarding_path = Path(onboarding_path)
+        self.moderation_path = Path(moderation_path)
+        self.handoff_path = Path(handoff_path)
+        self.crisis_path = Path(crisis_path)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._snapshot = self._load()
+        self._rejected: Optional[Tuple[Tuple[str, int], ...]] = None
+        self._next_poll = time.monotonic() + poll_interval
+
+    def _watched(self):
+        return _watched(self.prompts_dir, self.bar_context_path, self.onboarding_path,
+                        self.moderation_path, self.handoff_path, self.crisis_path)
+
+    def _load(self) -> ConfigSnapshot:
+        return load_snapshot(self.prompts_dir, self.bar_context_path, self.onboarding_path,
+                             self.moderation_path, self.handoff_path, self.crisis_path)
+
+    def current(self) -> ConfigSnapshot:
+        """The live snapshot; checks mtimes at most once per poll interval"""
+        if time.monotonic() >= self._next_poll:
+            self.reload_if_changed()
+        return self._snapshot
+
+    def reload_if_changed(self) -> bool:
+        """Swap in a fresh snapshot if any file changed and it validates. Returns True on swap."""
+        if not self._lock.acquire(blocking=False):
+            return False  # another thread is already reloading
+        try:
+            self._next_poll = time.monotonic() + self.poll_interval
+            stamps = _mtimes(self._watched())
+            if stamps == self._snapshot.mtimes or stamps == self._rejected:
+                return False
+            try:
+                snapshot = self._load()
+            except Exception as e:
+                self._rejected = stamps
+                logger.error("Config reload rejected, keeping previous snapshot", extra={"error": str(e)})
+                return False
+            self._snapshot = snapshot
+            self._rejected = None
+            logger.info("Config reloaded", extra={"prompts_dir": str(self.prompts_dir)})
+            return True
+        finally:
+            self._lock.release()
+
+
+_stores: Dict[str, ConfigStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(prompts_dir: str | Path) -> ConfigStore:
+    """Process-wide store per prompts directory"""
+    key = str(Path(prompts_dir).resolve())
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = _stores[key] = ConfigStore(Path(prompts_dir))
+    return store
@@ -0,0 +1,214 @@
+"""
+Token-budgeted context packing for agent system prompts.
+
+Reserved sections (persona, environment, newest turns) always go in.
+Everything else fills the remaining budget in priority order, and
+line-based sections (conversation turns) drop their oldest lines first.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Sequence, Tuple
+
+DEFAULT_BUDGET_TOKENS = int(os.getenv("LPBD_CONTEXT_BUDGET", "8000"))
+LATEST_TURNS = 4  # newest hot messages that are never dropped
+
+TRUNCATION_MARKER = "(earlier messages truncated...)"
+
+
+class TokenEstimator:
+    """
+    Local token count estimate, no tokenizer download or API call.
+
+    Splits text into words, digit runs, punctuation and newlines, and charges
+    long words one extra token per WORD_CHARS characters. `scale` corrects the
+    raw count against real usage numbers (see calibrate / observe).
+    """
+
+    PIECES = re.compile(r"[^\W\d_]+|\d+|\n|[^\w\s]")
+    WORD_CHARS = 6
+    DIGIT_CHARS = 3
+
+    def __init__(self, scale: float = 1.0) -> None:
+        self.scale = scale
+
+    def raw_count(self, text: str) -> int:
+        count = 0
+        for piece in self.PIECES.findall(text):
+            if piece[0].isdigit():
+                count += math.ceil(len(piece) / self.DIGIT_CHARS)
+            elif piece[0].isalpha():
+                count += math.ceil(len(piece) / self.WORD_CHARS)
+            else:
+                count += 1
+        return count
+
+    def estimate(self, text: str) -> int:
+        if not text:
+            return 0
+        return math.ceil(self.raw_count(text) * self.scale)
+
+    def calibrate(self, samples: Iterable[Tuple[str, int]]) -> float:
+        """Fit scale to (text, actual_tokens) pairs, e.g. from API usage.input_tokens."""
+        raw_total = 0
+        actual_total = 0
+        for text, actual in samples:
+            raw_total += self.raw_count(text)
+            actual_total += actual
+        if raw_total:
+            self.scale = actual_total / raw_total
+        return self.scale
+
+    def observe(self, text: str, actual_tokens: int, weight: float = 0.1) -> float:
+        """Nudge scale toward one more real measurement (exponential moving average)."""
+        raw = self.raw_count(text)
+        if raw and actual_tokens > 0:
+            self.scale += weight * (actual_tokens / raw - self.scale)
+        return self.scale
+
+
+# One per process, so every packer learns from every call's real usage (fed by LLMClient.call)
+shared_estimator = TokenEstimator()
+
+
+@dataclass
+class ContextSection:
+    """
+    One block of the prompt.
+
+    order: position in the assembled prompt (ascending)
+    priority: fill order for the remaining budget; 0 = reserved, always included
+    text: whole-block content (included entirely or not at all)
+    lines: line-by-line content, oldest first; newest lines are kept first
+    reserve_last: newest lines that count as reserved
+    """
+    name: str
+    order: int
+    priority: int
+    text: str = ""
+    lines: Sequence[str] = ()
+    header: str = ""
+    reserve_last: int = 0
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens_used: int
+    budget: int
+    included: List[str] = field(default_factory=list)
+    blocks: List[str] = field(default_factory=list)  # text of each included section, same order
+    dropped: List[str] = field(default_factory=list)
+    lines_dropped: int = 0
+
+
+class ContextPacker:
+    def __init__(self, budget_tokens: int = DEFAULT_BUDGET_TOKENS,
+                 estimator: TokenEstimator | None = None) -> None:
+        self.budget = budget_tokens
+        self.estimator = estimator or shared_estimator
+
+    def pack(self, sections: Sequence[ContextSection], separator: str = "\n\n") -> PackedContext:
+        count = self.estimator.estimate
+        separator_cost = count(separator)
+        marker_cost = count(TRUNCATION_MARKER) + 1
+
+        def line_cost(line: str) -> int:
+            return count(line) + 1  # trailing newline
+
+        def block_cost(text: str) -> int:
+            return count(text) + separator_cost
+
+        chosen_text: dict[str, str] = {}
+        chosen_lines: dict[str, List[str]] = {}
+        dropped: List[str] = []
+        lines_dropped = 0
+        used = 0
+
+        # 1. Reserved: whole reserved sections, headers + newest lines of line sections
+        for section in sections:
+            if section.lines:
+                keep = list(section.lines[-section.reserve_last:]) if section.reserve_last else []
+                if section.priority == 0:
+                    keep = list(section.lines)
+                chosen_lines[section.name] = keep
+                if keep:
+                    used += block_cost(section.header) + sum(line_cost(line) for line in keep)
+                    if len(keep) < len(section.lines):
+                        used += marker_cost  # assume truncation until proven otherwise
+            elif section.priority == 0 and section.text:
+                chosen_text[section.name] = section.text
+                used += block_cost(section.text)
+
+        # 2. Remaining budget in priority order
+        for section in sorted(sections, key=lambda s: s.priority):
+            if section.priority == 0:
+                continue
+
+            if section.lines:
+                keep = chosen_lines[section.name]
+                remaining = list(section.lines[:len(section.lines) - len(keep)])
+                if not remaining:
+                    continue
+                if not keep:
+                    opening_cost = block_cost(section.header) + marker_cost
+                    if used + opening_cost > self.budget:
+                        dropped.append(section.name)
+                        lines_dropped += len(remaining)
+                        continue
+                    used += opening_cost
+                while remaining:
+                    cost = line_cost(remaining[-1])
+                    # The last line in frees the truncation marker's budget
+                    refund = marker_cost if len(remaining) == 1 else 0
+                    if used + cost - refund > self.budget:
+                        break
+                    keep.insert(0, remaining.pop())
+                    used += cost - refund
+                if remaining:
+                    lines_dropped += len(remaining)
+                    if not keep:
+                        dropped.append(section.name)
+                continue
+
+            if not section.text:
+                continue
+            cost = block_cost(section.text)
+            if used + cost <= self.budget:
+                chosen_text[section.name] = section.text
+                used += cost
+            else:
+                dropped.append(section.name)
+
+        # 3. Assemble in layout order
+        blocks = []
+        included = []
+        for section in sorted(sections, key=lambda s: s.order):
+            if section.lines:
+                keep = chosen_lines.get(section.name)
+                if not keep:
+                    continue
+                body = keep
+                if len(keep) < len(section.lines):
+                    body = [TRUNCATION_MARKER] + keep
+                blocks.append("\n".join(([section.header] if section.header else []) + body))
+            elif section.name in chosen_text:
+                blocks.append(section.text)
+            else:
+                continue
+            included.append(section.name)
+
+        text = separator.join(blocks)
+        return PackedContext(
+            text=text,
+            tokens_used=count(text),
+            budget=self.budget,
+            included=included,
+            blocks=blocks,
+            dropped=dropped,
+            lines_dropped=lines_dropped
+        )
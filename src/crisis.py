@@ -0,0 +1,103 @@
+"""
+Local crisis pre-screen.
+
+Runs before moderation and routing, so a patron in crisis reaches Hermes
+without waiting on (or depending on) the LLM router. Signals, idioms and
+thresholds live in src/config/crisis.yaml and are compiled once per config
+snapshot. The scorer is deliberately simple and auditable: a weighted sum
+of phrase hits, with idioms blanked out and negated hits halved.
+
+- urgent: straight to Hermes
+- borderline: the LLM router decides, with Hermes as its fallback
+- none: carry on
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+URGENT = "urgent"
+BORDERLINE = "borderline"
+NONE = "none"
+
+
+@dataclass(frozen=True)
+class CrisisAssessment:
+    score: float = 0.0
+    level: str = NONE
+    matched: Tuple[str, ...] = ()  # the phrases that scored, for the audit log
+
+    @property
+    def urgent(self) -> bool:
+        return self.level == URGENT
+
+    @property
+    def borderline(self) -> bool:
+        return self.level == BORDERLINE
+
+
+class CrisisScreen:
+    """Compiled signals + idioms, immutable once built"""
+
+    def __init__(self, signals: Dict[str, float] | None = None, idioms: Sequence[str] = (),
+                 intent: Optional[str] = None, negation: Optional[str] = None,
+                 urgent: float = 1.0, borderline: float = 0.5, intent_boost: float = 0.5) -> None:
+        self._signals: List[Tuple[re.Pattern, float]] = [
+            (re.compile(pattern), float(weight)) for pattern, weight in (signals or {}).items()
+        ]
+        self._idioms = re.compile("|".join(f"(?:{p})" for p in idioms)) if idioms else None
+        self._intent = re.compile(intent) if intent else None
+        self._negation = re.compile(negation) if negation else None
+        self.urgent = urgent
+        self.borderline = borderline
+        self.intent_boost = intent_boost
+
+    @classmethod
+    def from_config(cls, crisis_data: dict) -> "CrisisScreen":
+        """Build from the parsed crisis.yaml"""
+        thresholds = crisis_data.get("thresholds") or {}
+        return cls(
+            signals=crisis_data.get("signals"),
+            idioms=crisis_data.get("idioms") or (),
+            intent=crisis_data.get("intent"),
+            negation=crisis_data.get("negation"),
+            urgent=float(thresholds.get("urgent", 1.0)),
+            borderline=float(thresholds.get("borderline", 0.5)),
+            intent_boost=float(crisis_data.get("intent_boost", 0.5))
+        )
+
+    def assess(self, text: str) -> CrisisAssessment:
+        if not text or not self._signals:
+            return CrisisAssessment()
+        lowered = text.lower().replace("’", "'")
+        if self._idioms is not None:
+            # Same length, so match positions (and the negation lookback) stay put
+            lowered = self._idioms.sub(lambda m: " " * len(m.group()), lowered)
+
+        score = 0.0
+        matched = []
+        affirmed = False
+        for pattern, weight in self._signals:
+            match = pattern.search(lowered)
+            if not match:
+                continue
+            before = lowered[max(0, match.start() - 32):match.start()]
+            if self._negation is not None and self._negation.search(before):
+                weight /= 2
+            else:
+                affirmed = True
+            score += weight
+            matched.append(match.group())
+
+        if affirmed and self._intent is not None and self._intent.search(lowered):
+            score += self.intent_boost
+
+        if score >= self.urgent:
+            level = URGENT
+        elif score >= self.borderline:
+            level = BORDERLINE
+        else:
+            level = NONE
+        return CrisisAssessment(round(score, 2), level, tuple(matched))
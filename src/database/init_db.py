@@ -1,6 +1,6 @@
 from src.database.models import init_db
 
 if __name__ == "__main__":
-    print("Creating database tables...")
+    print("Creating and migrating database tables...")
     init_db()
     print("Done! Tables created in lpbd_dev")
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Session lifecycle reaper.
+
+Enforces the inactivity timeouts from docs/architecture.md off the request path:
+- 15 min without a user message -> status = warning_15min
+- 20 min without a user message -> status = kicked, ended_at set
+- Ended sessions not yet archived -> moved to cold storage in batches
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import select, update
+
+from src.database.memory_manager import MemoryManager, ENDED_STATUSES
+from src.database.models import Session as SessionModel, utc_now
+
+WARNING_AFTER = timedelta(minutes=15)
+KICK_AFTER = timedelta(minutes=20)
+ARCHIVE_BATCH_SIZE = 100
+REAPER_INTERVAL_SECONDS = float(os.getenv("LPBD_REAPER_INTERVAL", "60"))
+
+LIVE_STATUSES = ["active", "warning_15min"]
+
+
+class SessionReaper:
+    """Bulk-transitions idle sessions and archives ended ones."""
+
+    def __init__(self, session_factory: Callable, clock: Callable[[], datetime] = utc_now,
+                 batch_size: int = ARCHIVE_BATCH_SIZE,
+                 summarize: Optional[Callable[[List[Dict]], str]] = None) -> None:
+        """
+        Args:
+            session_factory: Returns a new SQLAlchemy session (e.g. SessionLocal)
+            clock: Returns "now"; tests pass a virtual clock
+            batch_size: Sessions archived per transaction
+            summarize: Digest function for archived sessions (default: MemoryManager's)
+        """
+        self.session_factory = session_factory
+        self.clock = clock
+        self.batch_size = batch_size
+        self.summarize = summarize
+
+    def run_once(self) -> Dict[str, int]:
+        """One sweep: kick, warn, then archive. Returns counts per transition."""
+        now = self.clock()
+        db = self.session_factory()
+        try:
+            kicked = self._kick_idle(db, now)
+            warned = self._warn_idle(db, now)
+            db.commit()
+            archived = self._archive_ended(db)
+        finally:
+            db.close()
+
+        return {"kicked": kicked, "warned": warned, "archived": archived}
+
+    def _kick_idle(self, db, now: datetime) -> int:
+        result = db.execute(
+            update(SessionModel)
+            .where(SessionModel.status.in_(LIVE_STATUSES))
+            .where(SessionModel.last_activity_at < now - KICK_AFTER)
+            .values(status="kicked", ended_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def _warn_idle(self, db, now: datetime) -> int:
+        result = db.execute(
+            update(SessionModel)
+            .where(SessionModel.status == "active")
+            .where(SessionModel.last_activity_at < now - WARNING_AFTER)
+            .values(status="warning_15min")
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def _archive_ended(self, db) -> int:
+        memory = MemoryManager(db, summarize=self.summarize)
+        archived = 0
+
+        while True:
+            batch = db.execute(
+                select(SessionModel.id)
+                .where(SessionModel.status.in_(ENDED_STATUSES))
+                .where(SessionModel.archived_at.is_(None))
+                .order_by(SessionModel.ended_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)  # several workers may sweep at once
+            ).scalars().all()
+
+            if not batch:
+                break
+
+            archived += memory.archive_sessions(batch)
+            if len(batch) < self.batch_size:
+                break
+
+        return archived
+
+
+class ReaperThread(threading.Thread):
+    """Runs SessionReaper.run_once every interval until stopped."""
+
+    def __init__(self, reaper: SessionReaper, interval: float = REAPER_INTERVAL_SECONDS,
+                 on_error: Optional[Callable[[Exception], None]] = None) -> None:
+        super().__init__(name="lpbd-session-reaper", daemon=True)
+        self.reaper = reaper
+        self.interval = interval
+        self.on_error = on_error
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.reaper.run_once()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+
+    def stop(self) -> None:
+        self._stop_event.set()
@@ -1,62 +1,157 @@
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from src.database.models import Message, MessageArchive, Session as SessionModel
+from sqlalchemy import desc, select, insert, update, literal, case, true, or_, func, union_all, bindparam, DateTime
+from src.database.models import Message, MessageArchive, ColdContext, Session as SessionModel, User, as_utc_naive
+from src.context_packer import ContextPacker, ContextSection
+from src.summarizer import summarize_session, extractive_digest, fold_summary
+from src import retrieval
 from datetime import datetime
 
+# Hot storage window: first N + last M messages of the current session
+HOT_STORAGE_HEAD = 3
+HOT_STORAGE_TAIL = 10
+
+# Archive shape: first N + last M messages of a finished session
+ARCHIVE_OPENING = 3
+ARCHIVE_CLOSING = 10
+
+# Rolling summary: once a session has ROLLING_SUMMARY_AFTER messages, everything but the
+# newest ROLLING_KEEP_RECENT is folded into sessions.running_summary, ROLLING_SUMMARY_STEP at a time
+ROLLING_SUMMARY_AFTER = 16
+ROLLING_KEEP_RECENT = 6
+ROLLING_SUMMARY_STEP = 4
+
+# Statuses whose sessions count as finished for cold storage
+ENDED_STATUSES = ["completed", "ended", "kicked"]
+
+# In-process copy of cold_context rows: user_id -> (version, content)
+_COLD_CACHE_SIZE = 1024
+_cold_cache: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+
+
+@dataclass
+class TurnContext:
+    """Everything a single /message turn needs from the database, loaded in one round trip."""
+    session: SessionModel
+    user: Optional[User]
+    onboarding: Optional[Dict] = None
+    cold_text: str = ""
+    cold_version: int = 0
+    running_summary: str = ""
+    hot: List[Dict] = field(default_factory=list)
+
+    def append_hot(self, agent: str, content: str, timestamp: datetime, is_user: bool) -> None:
+        """Record a message stored during this turn without re-querying"""
+        self.hot.append({
+            "agent": agent,
+            "content": content,
+            "timestamp": as_utc_naive(timestamp),  # same as the rows loaded from the database
+            "is_user": is_user
+        })
+
+
 class MemoryManager:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, summarize: Optional[Callable[[List[Dict]], str]] = None,
+                 fold: Optional[Callable[[str, List[Dict]], str]] = None):
+        """
+        Args:
+            db: SQLAlchemy session
+            summarize: Turns an archived transcript into a digest (default: summarize_session)
+            fold: Folds messages into a running summary (default: fold_summary)
+        """
         self.db = db
+        self.summarize = summarize or summarize_session
+        self.fold = fold or fold_summary
     
     # HOT STORAGE: Current session
-    def get_hot_storage(self, session_id: str, limit: Optional[int] = None) -> List[Dict]:
-        """Get messages from current active session"""
-        query = self.db.query(Message)\
-            .filter(Message.session_id == session_id)\
-            .order_by(Message.timestamp.asc())
-        
+    def _windowed_messages(self, session_id: str, head: Optional[int], tail: Optional[int]):
+        """
+        Subquery of the session's messages numbered from both ends (row_number windows).
+        Filtered to first `head` + last `tail` rows; None on both returns every row.
+        """
+        order = (Message.timestamp.asc(), Message.id.asc())
+        numbered = select(
+            Message.session_id,
+            Message.agent,
+            Message.content,
+            Message.timestamp,
+            Message.is_user_message,
+            func.row_number().over(order_by=order).label("rn_head"),
+            func.row_number().over(order_by=(Message.timestamp.desc(), Message.id.desc())).label("rn_tail"),
+        ).where(Message.session_id == session_id).subquery("numbered_messages")
+
+        windowed = select(numbered)
+        if head is not None or tail is not None:
+            windowed = windowed.where(or_(
+                numbered.c.rn_head <= (head or 0),
+                numbered.c.rn_tail <= (tail or 0)
+            ))
+        return windowed.subquery("windowed_messages")
+
+    @staticmethod
+    def _mark_gaps(entries: List[Dict], positions: List[int], start: int = 0) -> List[Dict]:
+        """
+        Flag the first message after a skipped stretch with how many were omitted.
+        `start` is the last position already accounted for (e.g. by a running summary).
+        """
+        previous = start
+        for entry, position in zip(entries, positions):
+            if position - previous > 1:
+                entry["omitted_before"] = position - previous - 1
+            previous = position
+        return entries
+
+    def get_hot_storage(self, session_id: str, limit: Optional[int] = None,
+                        head: Optional[int] = HOT_STORAGE_HEAD,
+                        tail: Optional[int] = HOT_STORAGE_TAIL) -> List[Dict]:
+        """
+        Get messages from current active session: first `head` + last `tail`,
+        windowed in SQL so transfer stays constant however long the session runs.
+        Pass head=None, tail=None for every message; `limit` returns the first N.
+        """
         if limit:
-            query = query.limit(limit)
-        
-        messages = query.all()
-        
-        return [
+            head, tail = limit, None
+
+        windowed = self._windowed_messages(session_id, head, tail)
+        rows = self.db.execute(
+            select(windowed).order_by(windowed.c.rn_head.asc())
+        ).all()
+
+        entries = [
             {
-                "agent": msg.agent,
-                "content": msg.content,
-                "timestamp": msg.timestamp,
-                "is_user": bool(msg.is_user_message)
+                "agent": row.agent,
+                "content": row.content,
+                "timestamp": row.timestamp,
+                "is_user": bool(row.is_user_message)
             }
-            for msg in messages
+            for row in rows
         ]
+        return self._mark_gaps(entries, [row.rn_head for row in rows])
     
     # COLD STORAGE: Last N sessions
     def get_cold_storage(self, user_id: str, max_sessions: int = 4) -> List[Dict]:
         """
         Get last N completed sessions from archive (3 first + 10 last messages per session)
+        Oldest session first; opening messages before closing ones.
         """
-        # Get last N completed session_ids for this user
-        recent_sessions = self.db.query(SessionModel.id)\
-            .filter(SessionModel.user_id == user_id)\
-            .filter(SessionModel.status.in_(["completed", "ended"]))\
+        recent_sessions = select(SessionModel.id.label("session_id"), SessionModel.ended_at)\
+            .where(SessionModel.user_id == user_id)\
+            .where(SessionModel.status.in_(ENDED_STATUSES))\
             .order_by(desc(SessionModel.ended_at))\
             .limit(max_sessions)\
-            .all()
-        
-        if not recent_sessions:
-            return []
+            .subquery("recent_sessions")
         
-        session_ids = [s.id for s in recent_sessions]
-        
-        # Get archived messages from these sessions
-        archives = self.db.query(MessageArchive)\
-            .filter(MessageArchive.session_id.in_(session_ids))\
+        archives = self.db.execute(
+            select(MessageArchive, recent_sessions.c.ended_at)
+            .join(recent_sessions, MessageArchive.session_id == recent_sessions.c.session_id)
             .order_by(
-                desc(MessageArchive.session_id),
-                MessageArchive.message_position.asc(),
+                recent_sessions.c.ended_at.asc(),
+                desc(MessageArchive.message_position),  # 'opening' before 'closing'
                 MessageArchive.position_index.asc()
-            )\
-            .all()
+            )
+        ).all()
         
         return [
             {
@@ -64,66 +159,418 @@ class MemoryManager:
                 "content": arc.content,
                 "timestamp": arc.timestamp,
                 "is_user": bool(arc.is_user_message),
-                "session_id": arc.session_id
+                "session_id": arc.session_id,
+                "session_ended_at": ended_at
             }
-            for arc in archives
+            for arc, ended_at in archives
         ]
     
+    def _archived_transcripts(self, *criteria) -> Dict[str, List[Dict]]:
+        """
+        Archived rows matching `criteria`, per session in conversation order.
+        Short sessions are stored as both opening and closing rows; each
+        message appears once here.
+        """
+        rows = self.db.execute(
+            select(MessageArchive)
+            .where(*criteria)
+            .order_by(MessageArchive.session_id, MessageArchive.timestamp, MessageArchive.position_index)
+        ).scalars().all()
+        
+        transcripts: Dict[str, List[Dict]] = {}
+        seen = set()
+        for arc in rows:
+            key = (arc.session_id, arc.timestamp, arc.agent, arc.content)
+            if key in seen:
+                continue
+            seen.add(key)
+            transcripts.setdefault(arc.session_id, []).append({
+                "agent": arc.agent,
+                "content": arc.content,
+                "timestamp": arc.timestamp,
+                "is_user": bool(arc.is_user_message),
+                "session_id": arc.session_id
+            })
+        return transcripts
+    
+    def get_cold_digests(self, user_id: str, max_sessions: int = 4) -> List[Dict]:
+        """
+        Digests of the user's last N archived sessions, oldest first.
+        Sessions archived before digests existed get an extractive one here,
+        written back so it's only computed once.
+        """
+        recent = self.db.execute(
+            select(SessionModel.id, SessionModel.ended_at, SessionModel.digest)
+            .where(SessionModel.user_id == user_id)
+            .where(SessionModel.status.in_(ENDED_STATUSES))
+            .order_by(desc(SessionModel.ended_at))
+            .limit(max_sessions)
+        ).all()
+        
+        missing = [row.id for row in recent if not row.digest]
+        backfilled: Dict[str, str] = {}
+        if missing:
+            transcripts = self._archived_transcripts(MessageArchive.session_id.in_(missing))
+            for session_id, messages in transcripts.items():
+                digest = extractive_digest(messages)
+                if digest:
+                    backfilled[session_id] = digest
+            self._store_digests(backfilled)
+        
+        visits = []
+        for row in reversed(recent):
+            digest = row.digest or backfilled.get(row.id)
+            if digest:
+                visits.append({"session_id": row.id, "ended_at": row.ended_at, "digest": digest})
+        return visits
+    
+    def _store_digests(self, digests: Dict[str, str], archived_at: Optional[datetime] = None) -> None:
+        """One executemany UPDATE for all sessions; optionally stamps archived_at too"""
+        if not digests:
+            return
+        values = {"digest": bindparam("b_digest")}
+        if archived_at is not None:
+            values["archived_at"] = archived_at
+        self.db.connection().execute(
+            update(SessionModel.__table__)
+            .where(SessionModel.__table__.c.id == bindparam("b_id"))
+            .values(**values),
+            [{"b_id": session_id, "b_digest": digest} for session_id, digest in digests.items()]
+        )
+    
+    # COLD SNAPSHOT: Formatted cold storage, rebuilt only when a session is archived
+    def format_cold_block(self, visits: List[Dict], max_tokens: int = 4000) -> str:
+        """
+        Format one digest per visit. Same rough token limit as
+        format_for_agent_context (~4 chars = 1 token), dropping the oldest visits first.
+        """
+        if not visits:
+            return ""
+        
+        blocks: List[List[str]] = []
+        for visit in visits:
+            ended = visit.get("ended_at")
+            header = f"--- Earlier visit ({ended:%A %d %B}) ---" if ended else "--- Earlier visit ---"
+            blocks.append([header, visit["digest"]])
+        
+        max_chars = max_tokens * 4
+        kept: List[List[str]] = []
+        total_chars = 0
+        for block in reversed(blocks):
+            block_chars = sum(len(line) for line in block)
+            if kept and total_chars + block_chars > max_chars:
+                break
+            kept.insert(0, block)
+            total_chars += block_chars
+        
+        lines = ["=== Previous Visits ==="]
+        for block in kept:
+            lines.extend(block)
+        lines.append("=== End Previous Visits ===")
+        return "\n".join(lines)
+    
+    def refresh_cold_context(self, user_id: str, max_sessions: int = 4) -> ColdContext:
+        """
+        Rebuild the user's cold snapshot and bump its version.
+        Does not commit; archive_session commits it together with the archive rows,
+        and only then copies it into the in-process cache.
+        """
+        content = self.format_cold_block(self.get_cold_digests(user_id, max_sessions))
+        
+        snapshot = self.db.get(ColdContext, user_id)
+        if snapshot is None:
+            snapshot = ColdContext(user_id=user_id, content=content, version=1)
+            self.db.add(snapshot)
+        else:
+            snapshot.content = content
+            snapshot.version = (snapshot.version or 0) + 1
+        snapshot.built_at = datetime.utcnow()
+        self.db.flush()
+        return snapshot
+    
+    def get_cold_context(self, user_id: str, version: Optional[int] = None) -> str:
+        """
+        Formatted cold memory for a user. Served from the in-process copy when it
+        matches `version` (as read alongside the turn); otherwise reads the row.
+        """
+        if version is not None:
+            cached = _cold_cache.get(user_id)
+            if cached and cached[0] == version:
+                _cold_cache.move_to_end(user_id)
+                return cached[1]
+            if version == 0:
+                return ""
+        
+        snapshot = self.db.get(ColdContext, user_id)
+        if snapshot is None:
+            return ""
+        
+        _remember_cold(user_id, snapshot.version, snapshot.content)
+        return snapshot.content
+    
     # ARCHIVING: Move session to cold storage
+    def _archive_rows(self, session_ids: List[str]):
+        """
+        SELECT producing message_archive rows for many sessions at once:
+        first ARCHIVE_OPENING + last ARCHIVE_CLOSING messages per session,
+        picked with row_number windows partitioned by session.
+        """
+        per_session = dict(partition_by=Message.session_id)
+        numbered = select(
+            Message.id,
+            Message.session_id,
+            SessionModel.user_id,
+            Message.agent,
+            Message.content,
+            Message.timestamp,
+            Message.is_user_message,
+            func.row_number().over(order_by=(Message.timestamp.asc(), Message.id.asc()), **per_session).label("rn_head"),
+            func.row_number().over(order_by=(Message.timestamp.desc(), Message.id.desc()), **per_session).label("rn_tail"),
+            func.count().over(**per_session).label("total"),
+        ).join(SessionModel, SessionModel.id == Message.session_id)\
+         .where(Message.session_id.in_(session_ids))\
+         .cte("numbered_messages")
+        
+        archived_at = literal(datetime.utcnow(), DateTime)
+        shared = (
+            numbered.c.session_id,
+            numbered.c.user_id,
+            numbered.c.agent,
+            numbered.c.content,
+            numbered.c.timestamp,
+            numbered.c.is_user_message,
+        )
+        
+        opening = select(
+            (numbered.c.id + literal(":opening")).label("id"),
+            *shared,
+            literal("opening").label("message_position"),
+            numbered.c.rn_head.label("position_index"),  # 1,2,3
+            archived_at.label("archived_at"),
+        ).where(numbered.c.rn_head <= ARCHIVE_OPENING)
+        
+        closing = select(
+            (numbered.c.id + literal(":closing")).label("id"),
+            *shared,
+            literal("closing").label("message_position"),
+            case(  # 1..10 in chronological order
+                (numbered.c.total > ARCHIVE_CLOSING, numbered.c.rn_head - numbered.c.total + ARCHIVE_CLOSING),
+                else_=numbered.c.rn_head
+            ).label("position_index"),
+            archived_at.label("archived_at"),
+        ).where(numbered.c.rn_tail <= ARCHIVE_CLOSING)
+        
+        return union_all(opening, closing)
+    
     def archive_session(self, session_id: str):
         """
         Archive session: first 3 + last 10 messages
         Call when session ends
         """
-        # Get all messages from session
-        all_messages = self.db.query(Message)\
-            .filter(Message.session_id == session_id)\
-            .order_by(Message.timestamp.asc())\
-            .all()
+        self.archive_sessions([session_id])
+    
+    def archive_sessions(self, session_ids: List[str]) -> int:
+        """
+        Archive many ended sessions with a single INSERT ... SELECT, so the
+        cost doesn't depend on how many messages each session has.
+        Each session gets an extractive digest, each affected user's cold
+        snapshot is rebuilt once, and the sessions are stamped with
+        archived_at, all in one transaction. The callers hold the session
+        rows FOR UPDATE, so the slow summarize (LLM) pass only runs after
+        commit (_upgrade_digests), as does the top-up of cached retrieval indexes.
+        Returns the number of sessions archived.
+        """
+        if not session_ids:
+            return 0
         
-        if len(all_messages) == 0:
-            return
+        columns = ["id", "session_id", "user_id", "agent", "content", "timestamp",
+                   "is_user_message", "message_position", "position_index", "archived_at"]
+        self.db.execute(
+            insert(MessageArchive).from_select(columns, self._archive_rows(session_ids), include_defaults=False)
+        )
         
-        # Get session for user_id
-        session = self.db.query(SessionModel)\
-            .filter(SessionModel.id == session_id)\
-            .first()
+        transcripts = self._archived_transcripts(MessageArchive.session_id.in_(session_ids))
+        digests = {
+            session_id: extractive_digest(transcripts.get(session_id, [])) or None
+            for session_id in session_ids
+        }
+        self._store_digests(digests, archived_at=datetime.utcnow())
         
-        if not session:
-            return
+        sessions_by_user: Dict[str, List[str]] = {}
+        for session_id, user_id in self.db.execute(
+            select(SessionModel.id, SessionModel.user_id).where(SessionModel.id.in_(session_ids))
+        ).all():
+            sessions_by_user.setdefault(user_id, []).append(session_id)
+        cold = {}
+        for user_id in sessions_by_user:
+            snapshot = self.refresh_cold_context(user_id)
+            cold[user_id] = (snapshot.version, snapshot.content)
+        self.db.commit()
         
-        # Archive first 3 messages
-        opening_messages = all_messages[:3]
-        for idx, msg in enumerate(opening_messages, 1):
-            archive = MessageArchive(
-                session_id=session_id,
-                user_id=session.user_id,
-                agent=msg.agent,
-                content=msg.content,
-                timestamp=msg.timestamp,
-                is_user_message=msg.is_user_message,
-                message_position='opening',
-                position_index=idx
-            )
-            self.db.add(archive)
-        
-        # Archive last 10 messages (or 5 for space savings)
-        closing_messages = all_messages[-10:]
-        for idx, msg in enumerate(closing_messages, 1):
-            archive = MessageArchive(
-                session_id=session_id,
-                user_id=session.user_id,
-                agent=msg.agent,
-                content=msg.content,
-                timestamp=msg.timestamp,
-                is_user_message=msg.is_user_message,
-                message_position='closing',
-                position_index=idx
-            )
-            self.db.add(archive)
+        # Only once committed: a rolled-back archive must not leave memories behind
+        for user_id, (version, content) in cold.items():
+            _remember_cold(user_id, version, content)
+        for user_id, user_sessions in sessions_by_user.items():
+            index = retrieval.cached_index(user_id)
+            if index is not None:
+                index.add(retrieval.exchanges(
+                    msg for session_id in user_sessions for msg in transcripts.get(session_id, [])
+                ))
+        self._upgrade_digests(transcripts, digests, sessions_by_user)
+        return len(session_ids)
+    
+    def _upgrade_digests(self, transcripts: Dict[str, List[Dict]], digests: Dict[str, Optional[str]],
+                         sessions_by_user: Dict[str, List[str]]) -> None:
+        """
+        Replace freshly archived extractive digests with self.summarize's, outside
+        the archive transaction, and rebuild the cold snapshots that changed.
+        Sessions stay archived with their extractive digest if this fails.
+        """
+        if self.summarize is extractive_digest:
+            return
+        upgraded = {}
+        for session_id, extractive in digests.items():
+            digest = self.summarize(transcripts.get(session_id, []))
+            if digest and digest != extractive:
+                upgraded[session_id] = digest
+        if not upgraded:
+            return
         
+        self._store_digests(upgraded)
+        cold = {}
+        for user_id, user_sessions in sessions_by_user.items():
+            if any(session_id in upgraded for session_id in user_sessions):
+                snapshot = self.refresh_cold_context(user_id)
+                cold[user_id] = (snapshot.version, snapshot.content)
         self.db.commit()
+        for user_id, (version, content) in cold.items():
+            _remember_cold(user_id, version, content)
+    
+    # RETRIEVAL: Past exchanges relevant to the incoming message
+    def get_memory_index(self, user_id: str, version: int) -> retrieval.MemoryIndex:
+        """
+        The user's in-process retrieval index, caught up to cold snapshot `version`.
+        A stale index only fetches the sessions it hasn't seen yet.
+        """
+        index = retrieval.cached_index(user_id)
+        if index is not None and index.version == version:
+            return index
+        if index is None:
+            index = retrieval.MemoryIndex()
+        
+        criteria = [MessageArchive.user_id == user_id]
+        if index.session_ids:
+            criteria.append(MessageArchive.session_id.not_in(index.session_ids))
+        transcripts = self._archived_transcripts(*criteria)
+        index.add(retrieval.exchanges(msg for messages in transcripts.values() for msg in messages))
+        index.version = version
+        return retrieval.remember_index(user_id, index)
+    
+    def retrieve_memories(self, user_id: str, query: str, version: int,
+                          k: int = retrieval.RETRIEVAL_TOP_K) -> List[retrieval.Memory]:
+        """Top-k archived exchanges for `query` (cosine over hashed n-grams)"""
+        if not version or not query.strip():
+            return []  # Nothing archived yet / nothing to match on
+        return self.get_memory_index(user_id, version).search(query, k)
     
+    # TURN CONTEXT: Session + user + cold snapshot version + hot window in a single statement
+    def load_turn_context(self, session_id: str,
+                          hot_head: Optional[int] = HOT_STORAGE_HEAD,
+                          hot_tail: Optional[int] = HOT_STORAGE_TAIL) -> Optional[TurnContext]:
+        """
+        Load session, user and conversation history for one turn.
+        One SELECT: session joined to user and the user's cold snapshot version,
+        outer-joined to the windowed current session rows (first hot_head + last hot_tail).
+        Cold text comes from the in-process copy unless the version moved on.
+        Returns None if the session doesn't exist.
+        """
+        hot_window = self._windowed_messages(session_id, hot_head, hot_tail)
+
+        stmt = select(SessionModel, User, ColdContext.version.label("cold_version"), hot_window)\
+            .outerjoin(User, User.id == SessionModel.user_id)\
+            .outerjoin(ColdContext, ColdContext.user_id == SessionModel.user_id)\
+            .outerjoin(hot_window, true())\
+            .where(SessionModel.id == session_id)\
+            .order_by(hot_window.c.rn_head.asc())
+
+        rows = self.db.execute(stmt).all()
+        if not rows:
+            return None
+
+        first = rows[0]
+        session, user = first[0], first[1]
+        context = TurnContext(
+            session=session,
+            user=user,
+            onboarding=dict(user.onboarding_context) if user and user.onboarding_context else None,
+            cold_version=first.cold_version or 0
+        )
+        context.cold_text = self.get_cold_context(session.user_id, context.cold_version)
+        summary_upto = session.summary_upto or 0
+        if summary_upto:
+            context.running_summary = session.running_summary or ""
+
+        hot_positions = []
+        for row in rows:
+            if row.rn_head is None:
+                continue  # Session with no messages yet
+            if row.rn_head <= summary_upto:
+                continue  # Already folded into the running summary
+            context.hot.append({
+                "agent": row.agent,
+                "content": row.content,
+                "timestamp": row.timestamp,
+                "is_user": bool(row.is_user_message)
+            })
+            hot_positions.append(row.rn_head)
+
+        self._mark_gaps(context.hot, hot_positions, start=summary_upto)
+        return context
+    
+    # ROLLING SUMMARY: Older messages of a long session, folded off the request path
+    def update_running_summary(self, session_id: str) -> bool:
+        """
+        Fold messages that aged out of the recent window into sessions.running_summary.
+        Meant for a background task after the response is sent; the session row is
+        locked so concurrent folds for the same session don't interleave.
+        Returns True if the summary moved forward.
+        """
+        session = self.db.execute(
+            select(SessionModel).where(SessionModel.id == session_id).with_for_update()
+        ).scalar_one_or_none()
+        if session is None:
+            return False
+        
+        upto = session.summary_upto or 0
+        total = self.db.execute(
+            select(func.count()).select_from(Message).where(Message.session_id == session_id)
+        ).scalar()
+        if total < ROLLING_SUMMARY_AFTER or total - ROLLING_KEEP_RECENT - upto < ROLLING_SUMMARY_STEP:
+            self.db.rollback()
+            return False
+        
+        target = total - ROLLING_KEEP_RECENT
+        numbered = self._windowed_messages(session_id, None, None)
+        rows = self.db.execute(
+            select(numbered)
+            .where(numbered.c.rn_head > upto)
+            .where(numbered.c.rn_head <= target)
+            .order_by(numbered.c.rn_head.asc())
+        ).all()
+        
+        session.running_summary = self.fold(session.running_summary or "", [
+            {
+                "agent": row.agent,
+                "content": row.content,
+                "timestamp": row.timestamp,
+                "is_user": bool(row.is_user_message)
+            }
+            for row in rows
+        ])
+        session.summary_upto = target
+        self.db.commit()
+        return True
+
     # COMBINED CONTEXT
     def get_full_context(self, user_id: str, session_id: str, 
                         max_cold_sessions: int = 4) -> List[Dict]:
@@ -135,30 +582,40 @@ class MemoryManager:
         
         return cold + hot
     
+    def format_lines(self, messages: List[Dict]) -> List[str]:
+        """One "Role: content" line per message, plus markers where the window skipped messages"""
+        lines = []
+        for msg in messages:
+            if msg.get('omitted_before'):
+                lines.append(f"(... {msg['omitted_before']} messages omitted ...)")
+            role = "User" if msg['is_user'] else msg['agent'].title()
+            lines.append(f"{role}: {msg['content']}")
+        return lines
+    
     def format_for_agent_context(self, messages: List[Dict], 
                                  max_tokens: int = 5000) -> str:
         """
         Format messages for injection into agent system prompt
-        Includes basic token limiting (rough estimate: ~4 chars = 1 token)
+        Token-limited with the local estimator; the oldest lines are dropped first
         """
         if not messages:
             return ""
         
-        formatted_lines = ["=== Previous Conversation Context ==="]
-        total_chars = 0
-        max_chars = max_tokens * 4  # Rough estimate
-        
-        for msg in messages:
-            role = "User" if msg['is_user'] else msg['agent'].title()
-            line = f"{role}: {msg['content']}"
-            
-            # Basic token limiting
-            if total_chars + len(line) > max_chars:
-                formatted_lines.append("(earlier messages truncated...)")
-                break
-            
-            formatted_lines.append(line)
-            total_chars += len(line)
-        
-        formatted_lines.append("=== End Context ===\n")
-        return "\n".join(formatted_lines)
\ No newline at end of file
+        packed = ContextPacker(budget_tokens=max_tokens).pack([
+            ContextSection(
+                name="messages",
+                order=0,
+                priority=1,
+                header="=== Previous Conversation Context ===",
+                lines=self.format_lines(messages)
+            )
+        ])
+        return f"{packed.text}\n=== End Context ===\n"
+
+
+def _remember_cold(user_id: str, version: int, content: str) -> None:
+    """Store a cold snapshot in the in-process LRU copy"""
+    _cold_cache[user_id] = (version, content)
+    _cold_cache.move_to_end(user_id)
+    while len(_cold_cache) > _COLD_CACHE_SIZE:
+        _cold_cache.popitem(last=False)
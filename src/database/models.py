@@ -1,11 +1,23 @@
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, JSON, ForeignKey
+from sqlalchemy import create_engine, inspect, text, Column, String, Integer, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
-from datetime import datetime
+from datetime import datetime, timezone
+import os
 import uuid
 
 Base = declarative_base()
 
+
+def utc_now() -> datetime:
+    """Naive UTC, the way every DateTime column here stores time (like the datetime.utcnow defaults)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def as_utc_naive(ts: datetime) -> datetime:
+    """Aware datetimes converted to naive UTC; naive ones are taken to be UTC already"""
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo is not None else ts
+
+
 class User(Base):
     __tablename__ = "users"
     
@@ -31,8 +43,18 @@ class Session(Base):
     pending_handoff = Column(String, nullable=True)
     current_agent = Column(String, default="bart")
     onboarding_context = Column(JSON, nullable=True) # Stores: {"motivation": "...", "experience_level": "...", "preferred_name": "..."}
+    last_activity_at = Column(DateTime, default=datetime.utcnow)  # reset on every user message
+    archived_at = Column(DateTime, nullable=True)  # set once moved to cold storage
+    digest = Column(String, nullable=True)  # short summary written at archive time
+    running_summary = Column(String, nullable=True)  # older messages of this visit, folded in the background
+    summary_upto = Column(Integer, default=0)  # messages (oldest first) covered by running_summary
     
     user = relationship("User", back_populates="sessions")
+    
+    __table_args__ = (
+        Index("ix_sessions_status_last_activity", "status", "last_activity_at"),  # idle scan
+        Index("ix_sessions_status_archived", "status", "archived_at"),  # archive scan
+    )
     messages = relationship("Message", back_populates="session")
 
 class Message(Base):
@@ -62,14 +84,76 @@ class MessageArchive(Base):
     position_index = Column(Integer, nullable=False)  # 1,2,3 for opening; 1-10 for closing
     archived_at = Column(DateTime, default=datetime.utcnow)
 
-# Database connection
-DATABASE_URL = "postgresql://localhost/lpbd_dev"
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(bind=engine)
+class ColdContext(Base):
+    """Formatted cold memory per user, rebuilt when a session is archived"""
+    __tablename__ = "cold_context"
+    
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    content = Column(String, nullable=False, default="")
+    version = Column(Integer, nullable=False, default=0)  # bumped on every rebuild
+    built_at = Column(DateTime, default=datetime.utcnow)
+
+# Database connection (created on first use, not at import)
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost/lpbd_dev")
+_engine = None
+_session_factory = sessionmaker()
+
+def get_engine():
+    """The process-wide engine, created the first time it's needed"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL)
+        _session_factory.configure(bind=_engine)
+    return _engine
+
+def SessionLocal():
+    """New database session (same call as the old sessionmaker)"""
+    get_engine()
+    return _session_factory()
+
+def __getattr__(name):
+    # `from src.database.models import engine` keeps working, lazily
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Columns added to sessions after the table first shipped: (name, SQL type, backfill expression)
+_SESSION_COLUMNS = [
+    ("last_activity_at", "TIMESTAMP",
+     "COALESCE((SELECT MAX(messages.timestamp) FROM messages WHERE messages.session_id = sessions.id), started_at)"),
+    # Sessions the old archive_session already copied keep their archive time, so the reaper skips them
+    ("archived_at", "TIMESTAMP",
+     "(SELECT MAX(message_archive.archived_at) FROM message_archive WHERE message_archive.session_id = sessions.id)"),
+    ("digest", "VARCHAR", None),
+    ("running_summary", "VARCHAR", None),
+    ("summary_upto", "INTEGER DEFAULT 0", None),
+]
+
+def migrate(engine=None):
+    """
+    Bring an existing database up to the models: add missing sessions
+    columns (backfilled where needed) and indexes. create_all only creates
+    missing tables, never alters one. Idempotent, so safe on every deploy.
+    """
+    engine = engine or get_engine()
+    existing = {column["name"] for column in inspect(engine).get_columns("sessions")}
+    if_not_exists = "IF NOT EXISTS " if engine.dialect.name == "postgresql" else ""  # SQLite has no ADD COLUMN IF NOT EXISTS
+    with engine.begin() as conn:
+        for name, sql_type, backfill in _SESSION_COLUMNS:
+            if name in existing:
+                continue
+            conn.execute(text(f"ALTER TABLE sessions ADD COLUMN {if_not_exists}{name} {sql_type}"))
+            if backfill:
+                conn.execute(text(f"UPDATE sessions SET {name} = {backfill} WHERE {name} IS NULL"))
+        for index in Session.__table__.indexes:
+            columns = ", ".join(column.name for column in index.columns)
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index.name} ON sessions ({columns})"))
 
 def init_db():
-    """Create all tables"""
+    """Create missing tables, then migrate existing ones"""
+    engine = get_engine()
     Base.metadata.create_all(engine)
+    migrate(engine)
 
 def get_db():
     """Dependency for FastAPI endpoints"""
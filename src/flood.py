@@ -0,0 +1,165 @@
+"""
+Flood, near-duplicate and loop detection for one session.
+
+Checked right after moderation, before routing. Works on the session's
+recent messages (TurnContext.hot, which already holds the new one), so it
+keeps no state of its own and agrees across workers:
+
+- repeat: the new message is a near-copy (64-bit SimHash, small Hamming
+  distance) of several of the patron's last few messages
+- burst: too many patron messages inside a short window
+- loop: the agents' last few replies are near-copies of each other, the
+  "stuck conversation" router_descriptions.yaml leaves to Blanca
+
+Any of these gets a canned Blanca intervention instead of a model call.
+Settings and lines live under `flood:` in src/config/moderation.yaml.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SIMHASH_BITS = 64
+
+_WORD = re.compile(r"\w+")
+_LANE_BITS = 16  # a message has far fewer than 2**16 features
+_LANE_MASK = (1 << _LANE_BITS) - 1
+_SPREAD = [sum(1 << (_LANE_BITS * i) for i in range(8) if v >> i & 1) for v in range(256)]
+_fingerprints: Dict[str, int] = {}  # text -> simhash; recent messages are checked every turn
+_MAX_FINGERPRINTS = 4096
+
+
+def _features(text: str) -> List[str]:
+    # Word bigrams carry order; character trigrams keep short messages and typos comparable
+    words = _WORD.findall(text.lower())
+    joined = " ".join(words)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])] + [joined[i:i + 3] for i in range(len(joined) - 2)]
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash; similar texts differ in few bits"""
+    cached = _fingerprints.get(text)
+    if cached is not None:
+        return cached
+
+    # Per-bit vote counts, summed 64 lanes at a time: each hash bit is spread into its own 16-bit lane
+    features = Counter(_features(text))
+    lanes = 0
+    for feature, count in features.items():
+        h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+        spread = 0
+        for byte in range(8):
+            spread |= _SPREAD[h >> (8 * byte) & 0xFF] << (_LANE_BITS * 8 * byte)
+        lanes += count * spread
+    total = sum(features.values())
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        if 2 * (lanes >> (_LANE_BITS * bit) & _LANE_MASK) > total:
+            value |= 1 << bit
+
+    if len(_fingerprints) >= _MAX_FINGERPRINTS:
+        _fingerprints.clear()
+    _fingerprints[text] = value
+    return value
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+@dataclass(frozen=True)
+class Intervention:
+    kind: str  # repeat | burst | loop
+    reply: str
+
+
+@dataclass(frozen=True)
+class RecentMessages:
+    """The session tail the detector looks at, oldest first; the new patron message is last in `patron`"""
+    patron: Sequence[Tuple[str, float]]  # (text, unix seconds)
+    replies: Sequence[str]
+
+
+def _seconds(ts) -> float:
+    if isinstance(ts, datetime):
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)  # the database (and TurnContext.append_hot) stores naive UTC
+        return ts.timestamp()
+    return float(ts or 0.0)
+
+
+def from_hot(hot: Sequence[Dict], window: int) -> RecentMessages:
+    """From TurnContext.hot, which already holds the new message"""
+    patron = [(m["content"], _seconds(m.get("timestamp"))) for m in hot if m["is_user"]]
+    replies = [m["content"] for m in hot if not m["is_user"]]
+    return RecentMessages(patron[-(window + 1):], replies[-window:])
+
+
+class FloodDetector:
+    """Thresholds + Blanca's lines, built once per config snapshot"""
+
+    def __init__(self, settings: Dict | None = None) -> None:
+        settings = dict(settings or {})
+        self.window = int(settings.get("window", 6))
+        self.min_chars = int(settings.get("min_chars", 8))
+        self.repeat_distance = int(settings.get("repeat_distance", 4))
+        self.repeat_count = int(settings.get("repeat_count", 2))
+        self.burst_messages = int(settings.get("burst_messages", 4))
+        self.burst_seconds = float(settings.get("burst_seconds", 10))
+        self.loop_replies = int(settings.get("loop_replies", 3))
+        self.loop_distance = int(settings.get("loop_distance", 6))
+        self.lines: Dict[str, str] = {
+            "repeat": "You said that already. Say something new or let it sit.",
+            "burst": "Slow down. One drink, one thought at a time.",
+            "loop": "This is going in circles. Change the subject or change seats.",
+            **(settings.get("interventions") or {})
+        }
+
+    @classmethod
+    def from_config(cls, moderation_data: dict) -> "FloodDetector":
+        """Build from the parsed moderation.yaml"""
+        return cls(moderation_data.get("flood"))
+
+    def _burst(self, patron: Sequence[Tuple[str, float]]) -> bool:
+        if len(patron) < self.burst_messages:
+            return False
+        first = patron[-self.burst_messages][1]
+        span = patron[-1][1] - first
+        # A negative span means mismatched clocks, not a flood
+        return 0 < first and 0 <= span <= self.burst_seconds
+
+    def _repeat(self, patron: Sequence[Tuple[str, float]]) -> bool:
+        text = patron[-1][0].strip()
+        if len(text) < self.min_chars:
+            return False
+        current = simhash(text)
+        copies = sum(
+            1 for earlier, _ in patron[:-1]
+            if len(earlier.strip()) >= self.min_chars and distance(simhash(earlier.strip()), current) <= self.repeat_distance
+        )
+        return copies >= self.repeat_count
+
+    def _loop(self, replies: Sequence[str]) -> bool:
+        tail = [r.strip() for r in replies[-self.loop_replies:]]
+        if len(tail) < self.loop_replies or any(len(r) < self.min_chars for r in tail):
+            return False
+        hashes = [simhash(r) for r in tail]
+        return all(distance(hashes[0], h) <= self.loop_distance for h in hashes[1:])
+
+    def check(self, recent: RecentMessages) -> Optional[Intervention]:
+        """Intervention for the newest patron message, or None to carry on"""
+        if not recent.patron:
+            return None
+        for kind, hit in (
+            ("burst", lambda: self._burst(recent.patron)),
+            ("repeat", lambda: self._repeat(recent.patron)),
+            ("loop", lambda: self._loop(recent.replies)),
+        ):
+            if hit():
+                return Intervention(kind, self.lines[kind])
+        return None
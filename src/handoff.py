@@ -0,0 +1,70 @@
+"""
+Local handoff detection on agent replies.
+
+Agents hand off in words ("Let me get JB.", "Bernie's territory.", "Have a
+word with Hermes."). The phrase list and agent names in
+src/config/handoff.yaml are compiled once per config snapshot into a
+single regex; every reply is checked against it, no model call. Shared by
+the API (which sets sessions.pending_handoff) and Router._should_handoff.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Sequence
+
+_NEGATION = re.compile(r"(?:don't|do not|never|no need to|wouldn't|won't)\s+$")
+
+
+def _phrase_pattern(phrase: str, names: str) -> str:
+    """One phrase as a regex: its {agent} slot captures a name, spaces match any whitespace"""
+    pieces = []
+    for token in re.split(r"(\{agent\})", re.sub(" +", " ", phrase.lower().strip())):
+        if token == "{agent}":
+            pieces.append(f"({names})")
+        else:
+            pieces.append(r"\s+".join(re.escape(word) for word in token.split(" ")))
+    return rf"(?<!\w){''.join(pieces)}(?!\w)"
+
+
+class HandoffDetector:
+    """Compiled phrase x agent-name matcher, immutable once built"""
+
+    def __init__(self, agents: Dict[str, Sequence[str]] | None = None,
+                 phrases: Sequence[str] = ()) -> None:
+        """
+        Args:
+            agents: Agent key -> names it goes by in replies
+            phrases: Handoff phrases, each with one {agent} slot
+        """
+        self.aliases: Dict[str, str] = {}
+        for agent, names in (agents or {}).items():
+            for name in names or (agent,):
+                self.aliases[str(name).lower()] = agent
+        names = "|".join(
+            r"\s+".join(re.escape(word) for word in name.split())
+            for name in sorted(self.aliases, key=len, reverse=True)
+        )
+        patterns: List[str] = [_phrase_pattern(p, names) for p in phrases if "{agent}" in p] if names else []
+        self._pattern = re.compile("|".join(patterns), re.IGNORECASE) if patterns else None
+        # Most replies name no agent at all; one cheap search rules them out
+        self._names = re.compile(rf"(?<!\w)(?:{names})(?!\w)", re.IGNORECASE) if names else None
+
+    @classmethod
+    def from_config(cls, handoff_data: dict) -> "HandoffDetector":
+        """Build from the parsed handoff.yaml"""
+        return cls(handoff_data.get("agents"), handoff_data.get("phrases") or ())
+
+    def detect(self, reply: str, current_agent: str = "") -> Optional[str]:
+        """Agent the reply hands off to (first one named), or None"""
+        if self._pattern is None or not reply or not self._names.search(reply):
+            return None
+        text = reply.replace("’", "'")
+        for match in self._pattern.finditer(text):
+            if _NEGATION.search(text[max(0, match.start() - 20):match.start()].lower()):
+                continue
+            name = next(group for group in match.groups() if group)
+            target = self.aliases.get(" ".join(name.lower().split()))
+            if target and target != current_agent:
+                return target
+        return None
@@ -1,68 +1,162 @@
+import atexit
+import copy
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
 import json
+import time
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Optional
+
+# Rotation: whichever comes first, size or age
+LOG_MAX_BYTES = int(os.getenv("LPBD_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("LPBD_LOG_BACKUPS", "5"))
+LOG_ROTATE_SECONDS = int(os.getenv("LPBD_LOG_ROTATE_SECONDS", str(24 * 3600)))
+
+# Verbose turn records: payload fields cut to N chars (0 = keep all), fraction kept (1.0 = all)
+LOG_TEXT_LIMIT = int(os.getenv("LPBD_LOG_TEXT_LIMIT", "500"))
+LOG_TURN_SAMPLE = float(os.getenv("LPBD_LOG_TURN_SAMPLE", "1.0"))
+TRUNCATED_FIELDS = ("user_text", "reply_text", "text")
+
+# Records waiting for the writer thread; beyond this they're dropped, never blocking a reply
+LOG_QUEUE_SIZE = 10000
+
+# Dump each agent's full assembled prompt to stdout (local debugging only)
+DEBUG_PROMPTS = os.getenv("LPBD_DEBUG_PROMPTS", "") not in ("", "0", "false")
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_STANDARD_ATTRS = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
 
 
 class JSONFormatter(logging.Formatter):
     """Format log records as JSON."""
-    
+
     def format(self, record: logging.LogRecord) -> str:
         log_data: Dict[str, Any] = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
         }
-        
-        # Add ALL extra fields from record.__dict__
-        # Skip the standard LogRecord attributes
-        standard_attrs = {
-            'name', 'msg', 'args', 'created', 'filename', 'funcName', 
-            'levelname', 'levelno', 'lineno', 'module', 'msecs', 
-            'message', 'pathname', 'process', 'processName', 'relativeCreated',
-            'thread', 'threadName', 'exc_info', 'exc_text', 'stack_info'
-        }
-        
-        for key, value in record.__dict__.items():
-            if key not in standard_attrs:
-                log_data[key] = value
-            
+
+        # Add the extra fields (set difference instead of checking every attribute)
+        for key in record.__dict__.keys() - _STANDARD_ATTRS:
+            log_data[key] = record.__dict__[key]
+
         # Add exception info if present
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
-            
-        return json.dumps(log_data)
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
+
+        return json.dumps(log_data, default=str)
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that also rolls over every `interval` seconds."""
+
+    def __init__(self, filename: str, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUPS,
+                 interval: int = LOG_ROTATE_SECONDS, clock: Callable[[], float] = time.time) -> None:
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.interval = interval
+        self.clock = clock
+        self.rollover_at = self.clock() + interval
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.interval and self.clock() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = self.clock() + self.interval
+
+
+class TurnRecordFilter(logging.Filter):
+    """
+    Applied before records are queued: samples the verbose "Turn completed"
+    records and truncates their payload fields. Warnings and errors always pass.
+    """
+
+    def __init__(self, sample_rate: float = LOG_TURN_SAMPLE, text_limit: int = LOG_TEXT_LIMIT,
+                 rng: Callable[[], float] = random.random) -> None:
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.text_limit = text_limit
+        self.rng = rng
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and str(record.msg).startswith("Turn completed"):
+            if self.sample_rate < 1.0 and self.rng() >= self.sample_rate:
+                return False
+        if self.text_limit:
+            for field in TRUNCATED_FIELDS:
+                value = record.__dict__.get(field)
+                if isinstance(value, str) and len(value) > self.text_limit:
+                    record.__dict__[field] = f"{value[:self.text_limit]}... (+{len(value) - self.text_limit} chars)"
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of raising."""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep `extra` fields and the traceback separate (the default folds both into msg)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listeners: Dict[str, logging.handlers.QueueListener] = {}
 
 
 def setup_logger(name: str = "lpbd", log_file: str = "logs/lpbd.log") -> logging.Logger:
     """
     Set up a logger that writes JSON to file and human-readable to console.
-    
+
+    Callers only put records on a queue; a background listener thread does
+    the formatting, file writes (rotated by size and age) and console output.
+
     Args:
         name: Logger name
         log_file: Path to log file
-        
+
     Returns:
         Configured logger instance
     """
-    log_path = Path(log_file)
-    log_path.parent.mkdir(parents=True, exist_ok=True)
-    
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
-    
+
     # Avoid adding handlers multiple times
     if logger.handlers:
         return logger
-    
+
+    log_path = Path(log_file)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+
     # File handler with JSON format
-    file_handler = logging.FileHandler(log_file)
+    file_handler = SizeAndTimeRotatingFileHandler(log_file)
     file_handler.setLevel(logging.INFO)
     file_handler.setFormatter(JSONFormatter())
-    
+
     # Console handler with human-readable format
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.WARNING)
@@ -71,8 +165,28 @@ def setup_logger(name: str = "lpbd", log_file: str = "logs/lpbd.log") -> logging
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     console_handler.setFormatter(console_formatter)
-    
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
\ No newline at end of file
+
+    queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(TurnRecordFilter())
+    listener = logging.handlers.QueueListener(
+        queue_handler.queue, file_handler, console_handler, respect_handler_level=True
+    )
+    listener.start()
+    _listeners[name] = listener
+
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+    return logger
+
+
+def stop_logging(name: Optional[str] = None) -> None:
+    """Flush queued records and stop the writer thread(s). Safe to call twice."""
+    names = [name] if name else list(_listeners)
+    for logger_name in names:
+        listener = _listeners.pop(logger_name, None)
+        if listener:
+            listener.stop()
+
+
+atexit.register(stop_logging)
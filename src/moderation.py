@@ -0,0 +1,234 @@
+"""
+Local moderation, run before routing so bad input never costs an LLM call.
+
+Built once per config snapshot from src/config/moderation.yaml: every term
+goes into one Aho-Corasick automaton over words, so a message is scanned
+in a single pass however long the list gets, and only whole words match.
+Text is normalized first (leetspeak, punctuation, held-down letters).
+Terms that are also ordinary words ("a chink in his armour") are listed as
+ambiguous: low on their own, their category's severity only when aimed at
+someone ("you chink"). A term followed by one of its category's
+`unless_before` phrases ("I'll kill you at chess") is banter and stays low.
+Shape heuristics (empty, shouting, key mashing, pasted words, symbol soup,
+length) run alongside. The worst finding wins; medium and high severity get
+Blanca's canned warning instead of an agent reply.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter, deque
+from dataclasses import dataclass, replace
+from enum import IntEnum
+from typing import Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+
+class Severity(IntEnum):
+    NONE = 0
+    LOW = 1  # logged, let through
+    MEDIUM = 2
+    HIGH = 3
+
+    @property
+    def blocks(self) -> bool:
+        return self >= Severity.MEDIUM
+
+
+_LEET = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s"})
+_LEET_CHARS = frozenset("013457@$")
+
+
+_NON_WORD = re.compile(r"[\W_]+")
+_REPEATS = re.compile(r"(.)\1+")
+
+
+def _fold_leet(token: str) -> str:
+    # Only in tokens that are mostly letters: "r3tard" folds, "7:30" and "101" stay numbers
+    leet = sum(ch in _LEET_CHARS for ch in token)
+    return token.translate(_LEET) if leet and sum(map(str.isalpha, token)) >= leet else token
+
+
+def normalize(text: str) -> List[str]:
+    """Words after lowercasing, folding leetspeak, splitting on punctuation, collapsing repeated characters"""
+    folded = _NON_WORD.sub(" ", " ".join(_fold_leet(token) for token in text.lower().split()))
+    return _REPEATS.sub(r"\1", folded).split()
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher; build once, then scan in O(len(text) + matches).
+    Symbols are whatever the sequences hold (characters of a string, words of a list).
+    """
+
+    def __init__(self, patterns: Sequence[Tuple[Sequence[Hashable], object]]) -> None:
+        """patterns: (pattern, payload) pairs; the payload comes back with each match"""
+        self._goto: List[Dict[Hashable, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]  # (pattern length, payload)
+
+        for pattern, payload in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((len(pattern), payload))
+
+        # Breadth-first failure links; each state inherits its fallback's outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def finditer(self, text: Sequence[Hashable]):
+        """Yield (start, end, payload) for every occurrence, overlapping included"""
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]:
+                yield i - length + 1, i + 1, payload
+
+
+@dataclass(frozen=True)
+class ModerationResult:
+    severity: Severity = Severity.NONE
+    category: str = ""
+    warning: str = ""
+    matched: str = ""  # normalized term, for the log
+
+    @property
+    def blocked(self) -> bool:
+        return self.severity.blocks
+
+
+CLEAN = ModerationResult()
+
+
+@dataclass(frozen=True)
+class _Rule:
+    category: str
+    severity: Severity
+    warning: str
+    aimed: Optional["_Rule"] = None  # applies instead when the previous word is in aimed_after
+    aimed_after: FrozenSet[str] = frozenset()
+    aimed_at_start: bool = False  # opening the message counts as aimed too ("go die")
+    banter: Optional["_Rule"] = None  # applies instead when one of unless_before follows
+    unless_before: Tuple[Tuple[str, ...], ...] = ()
+
+    def resolve(self, words: List[str], start: int, end: int) -> "_Rule":
+        """The rule that applies to this match, given the words around it"""
+        if self.banter is not None and any(tuple(words[end:end + len(p)]) == p for p in self.unless_before):
+            return self.banter
+        if self.aimed is not None and (words[start - 1] in self.aimed_after if start else self.aimed_at_start):
+            return self.aimed
+        return self
+
+
+def _rule(category: str, spec: dict) -> _Rule:
+    return _Rule(category, Severity[str(spec.get("severity", "medium")).upper()], spec.get("warning", ""))
+
+
+def _category_rules(category: str, spec: dict) -> Tuple[_Rule, _Rule]:
+    """(rule for the category's terms, rule for its ambiguous terms)"""
+    ambiguous = spec.get("ambiguous") or {}
+    low = _Rule(category, Severity[str(ambiguous.get("severity", "low")).upper()], ambiguous.get("warning", ""))
+    unless = tuple(filter(None, (tuple(normalize(str(phrase))) for phrase in spec.get("unless_before") or ())))
+    rule = replace(_rule(category, spec), banter=low, unless_before=unless)
+    after = frozenset(word for term in ambiguous.get("aimed_after") or () for word in normalize(str(term)))
+    return rule, replace(low, aimed=rule, aimed_after=after, aimed_at_start=bool(ambiguous.get("aimed_at_start")),
+                         banter=low, unless_before=unless)
+
+
+class Moderator:
+    """Term automaton + shape heuristics, immutable once built"""
+
+    def __init__(self, categories: Dict[str, dict] | None = None, heuristics: Dict[str, dict] | None = None) -> None:
+        patterns = []
+        for category, spec in (categories or {}).items():
+            rule, ambiguous_rule = _category_rules(category, spec)
+            ambiguous_terms = (spec.get("ambiguous") or {}).get("terms")
+            for terms, term_rule in ((spec.get("terms"), rule), (ambiguous_terms, ambiguous_rule)):
+                for term in terms or ():
+                    words = normalize(str(term))
+                    if words:
+                        patterns.append((tuple(words), term_rule))
+        self.terms = len(patterns)
+        self._matcher = AhoCorasick(patterns)
+        self.heuristics = {name: dict(spec) for name, spec in (heuristics or {}).items()}
+        self._rules = {name: _rule(name, spec) for name, spec in self.heuristics.items()}
+        run = int(self.heuristics.get("repeated_chars", {}).get("run", 12))
+        # Letters and digits only: a row of "!" is symbol soup, a row of emoji is just laughing
+        self._held_key = re.compile(r"([^\W_])\1{%d,}" % (run - 1))
+
+    @classmethod
+    def from_config(cls, moderation_data: dict) -> "Moderator":
+        """Build from the parsed moderation.yaml"""
+        return cls(moderation_data.get("categories"), moderation_data.get("heuristics"))
+
+    def _hit(self, name: str) -> ModerationResult:
+        rule = self._rules[name]
+        return ModerationResult(rule.severity, rule.category, rule.warning)
+
+    def _shape(self, text: str) -> Optional[ModerationResult]:
+        h = self.heuristics
+        stripped = text.strip()
+        if "empty" in h and not stripped:
+            return self._hit("empty")
+        if "too_long" in h and len(stripped) > h["too_long"].get("max_chars", 500):
+            return self._hit("too_long")
+
+        if "repeated_chars" in h and self._held_key.search(stripped):
+            return self._hit("repeated_chars")
+
+        letters = sum(map(str.isalpha, stripped))
+        caps = sum(map(str.isupper, stripped))
+        if "symbols" in h:
+            spec = h["symbols"]
+            if len(stripped) >= spec.get("min_length", 20) and letters < spec.get("letter_share", 0.3) * len(stripped):
+                return self._hit("symbols")
+        if "shouting" in h:
+            spec = h["shouting"]
+            if letters >= spec.get("min_letters", 3) and caps / letters > spec.get("ratio", 0.7):
+                return self._hit("shouting")
+        if "repeated_words" in h:
+            spec = h["repeated_words"]
+            words = stripped.lower().split()
+            if len(words) >= spec.get("count", 8):
+                top = Counter(words).most_common(1)[0][1]
+                if top >= spec.get("count", 8) and top >= spec.get("share", 0.6) * len(words):
+                    return self._hit("repeated_words")
+        return None
+
+    def check(self, text: str) -> ModerationResult:
+        """Worst finding for the message; CLEAN if none"""
+        worst = self._shape(text) or CLEAN
+        if worst.severity == Severity.HIGH:
+            return worst
+
+        words = normalize(text)
+        for start, end, rule in self._matcher.finditer(words):
+            rule = rule.resolve(words, start, end)
+            if rule.severity > worst.severity:
+                worst = ModerationResult(rule.severity, rule.category, rule.warning, " ".join(words[start:end]))
+                if worst.severity == Severity.HIGH:
+                    break
+        return worst
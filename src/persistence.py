@@ -1,5 +1,13 @@
 import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: one worker, no cross-process lock needed
+    fcntl = None
 from src.history import MessageHistory
 from src.agents.bukowski_ledger import BukowskiLedger, LedgerEntry
 
@@ -55,43 +63,267 @@ class HistoryPersistence:
         
         return history
     
+# Per journal file: (generation, bytes scanned, {user_id: offset just past their last record})
+_user_tails: dict[str, tuple[str, int, dict[str, int]]] = {}
+_user_tails_lock = threading.Lock()
+
+
 class LedgerPersistence:
-    """Save and load Bukowski's ledger to/from JSON."""
+    """
+    Bukowski's ledger as an append-only JSON-lines journal.
+    
+    Each note appends an "add" record and each deletion a "del" tombstone,
+    so nothing is rewritten on the request path. Replaying the journal
+    rebuilds the ledger; once dead records outnumber live entries the file
+    is compacted (rewritten with live entries only, swapped in atomically).
+    An old whole-file ledger.json is imported on first load.
+    
+    Several workers may share the file. Appends and compaction hold an
+    exclusive flock on ledger.jsonl.lock, and compaction rebuilds from the
+    journal on disk, not from this process's ledger, so entries another
+    worker appended survive it.
+    
+    The journal doubles as the sync change log. Every file starts with a
+    generation id (new on each compaction), and a record's byte offset is
+    its sequence number: the cursor "<generation>.<offset>" only ever moves
+    forward, whichever worker appended, until a compaction starts a new
+    generation and clients resync from scratch.
+    """
     
-    def __init__(self, filepath: str = "data/ledger.json"):
+    COMPACT_MIN_DEAD = 64
+    
+    def __init__(self, filepath: str = "data/ledger.jsonl", legacy_path: str = "data/ledger.json"):
         self.filepath = Path(filepath)
+        self.legacy_path = Path(legacy_path)
         self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        self.ledger: BukowskiLedger | None = None
+        self._records = 0  # entry records in the journal (add + del)
+    
+    @staticmethod
+    def _add_record(entry: LedgerEntry) -> dict:
+        return {
+            "op": "add",
+            "id": entry.entry_id,
+            "user_id": entry.user_id,
+            "agent": entry.agent,
+            "text": entry.text,
+            "ts": entry.ts
+        }
+    
+    @staticmethod
+    def _header() -> str:
+        return json.dumps({"op": "gen", "gen": uuid.uuid4().hex}) + "\n"
+    
+    @contextmanager
+    def _locked(self):
+        """Exclusive across processes sharing the journal"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.filepath.with_suffix(".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def _write(self, *records: dict) -> None:
+        with self._locked(), open(self.filepath, "a") as f:
+            if f.tell() == 0:
+                f.write(self._header())
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+        self._records += len(records)
+    
+    def append(self, entry: LedgerEntry) -> None:
+        """Journal a new entry"""
+        self._write(self._add_record(entry))
+    
+    def tombstone(self, *entries: LedgerEntry) -> None:
+        """Journal deletions in one write, then compact if dead records dominate"""
+        self._write(*({"op": "del", "id": e.entry_id, "user_id": e.user_id} for e in entries))
+        if self.ledger is not None:
+            self._maybe_compact(self.ledger)
+    
+    def _maybe_compact(self, ledger: BukowskiLedger) -> None:
+        dead = self._records - len(ledger)
+        if dead >= self.COMPACT_MIN_DEAD and dead > len(ledger):
+            self.compact()
+    
+    def _rewrite(self, records: list[dict]) -> None:
+        # Caller holds the lock
+        tmp = self.filepath.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            f.write(self._header())
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp, self.filepath)
+        self._records = len(records)
+    
+    def compact(self) -> None:
+        """Rewrite the journal with its live entries only, as a new generation"""
+        with self._locked():
+            with open(self.filepath, "rb") as f:
+                live = self._live_records(f.read())
+            self._rewrite(list(live.values()))
     
     def save(self, ledger: BukowskiLedger) -> None:
-        """Save ledger to JSON file."""
-        data = [
-            {
-                "user_id": entry.user_id,
-                "agent": entry.agent,
-                "text": entry.text,
-                "ts": entry.ts
-            }
-            for entry in ledger._entries
-        ]
-        
-        with open(self.filepath, "w") as f:
-            json.dump(data, f, indent=2)
+        """Replace the journal with exactly this ledger's entries (the legacy import)"""
+        entries = ledger.get_last(len(ledger)) if len(ledger) else []
+        with self._locked():
+            self._rewrite([self._add_record(entry) for entry in entries])
+        self.ledger = ledger
+        ledger.store = self
+    
+    @staticmethod
+    def _records_in(data: bytes):
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from a crash mid-append
+            if record.get("op") != "gen":
+                yield record
+    
+    @classmethod
+    def _live_records(cls, data: bytes) -> dict:
+        """id -> add record for every entry not tombstoned, in journal order"""
+        live = {}
+        for record in cls._records_in(data):
+            if record.get("op") == "del":
+                live.pop(record["id"], None)
+            else:
+                live[record["id"]] = record
+        return live
+    
+    def _replay(self, ledger: BukowskiLedger) -> None:
+        with open(self.filepath, "rb") as f:
+            data = f.read()
+        self._records = sum(1 for _ in self._records_in(data))
+        for record in self._live_records(data).values():
+            ledger.log(LedgerEntry(
+                user_id=record["user_id"],
+                agent=record["agent"],
+                text=record["text"],
+                ts=record["ts"],
+                entry_id=record["id"]
+            ))
     
     def load(self) -> BukowskiLedger:
-        """Load ledger from JSON file."""
-        if not self.filepath.exists():
-            return BukowskiLedger()
+        """Replay the journal into a ledger that journals its own changes from here on"""
+        ledger = BukowskiLedger()
+        self._records = 0
+        if self.filepath.exists():
+            self._replay(ledger)
+        elif self.legacy_path.exists():
+            with open(self.legacy_path, "r") as f:
+                for entry_dict in json.load(f):
+                    ledger.log(LedgerEntry(
+                        user_id=entry_dict["user_id"],
+                        agent=entry_dict["agent"],
+                        text=entry_dict["text"],
+                        ts=entry_dict["ts"]
+                    ))
+            self.save(ledger)
         
-        with open(self.filepath, "r") as f:
-            data = json.load(f)
+        self.ledger = ledger
+        ledger.store = self
+        self._maybe_compact(ledger)
+        return ledger
+    
+    def _position(self) -> tuple[str, int]:
+        """(generation, journal size): one stat and one short read, no replay"""
+        try:
+            size = self.filepath.stat().st_size
+            with open(self.filepath, "rb") as f:
+                head = json.loads(f.readline())
+        except (OSError, ValueError):
+            return "0", 0
+        generation = head.get("gen", "0") if head.get("op") == "gen" else "0"
+        return generation, size
+    
+    def cursor(self) -> str:
+        """Where the journal ends now; equal cursors mean nothing changed (the sync ETag)"""
+        generation, size = self._position()
+        return f"{generation}.{size}"
+    
+    def user_tag(self, user_id: str) -> str:
+        """
+        "<generation>.<offset>", the offset just past the user's last journal
+        record: it only moves when their ledger does (the per-user sync ETag).
+        Offsets are cached per process, so only bytes appended since the
+        previous call are read.
+        """
+        key = str(self.filepath)
+        with _user_tails_lock:
+            try:
+                f = open(self.filepath, "rb")
+            except OSError:
+                return "0.0"
+            with f:
+                try:
+                    head = json.loads(f.readline())
+                except ValueError:
+                    head = {}
+                generation = head.get("gen", "0") if head.get("op") == "gen" else "0"
+                size = os.fstat(f.fileno()).st_size
+                cached_generation, scanned, tails = _user_tails.get(key, (None, 0, {}))
+                if cached_generation != generation or scanned > size:
+                    scanned, tails = 0, {}
+                f.seek(scanned)
+                data = f.read(size - scanned)
+            
+            for line in data.splitlines(keepends=True):
+                if not line.endswith(b"\n"):
+                    break  # half-written; picked up next time
+                scanned += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "user_id" in record:
+                    tails[record["user_id"]] = scanned
+            _user_tails[key] = (generation, scanned, tails)
+            return f"{generation}.{tails.get(user_id, 0)}"
+    
+    def changes(self, user_id: str, since: str | None = None) -> dict:
+        """
+        One user's sync delta since an earlier cursor.
         
-        ledger = BukowskiLedger()
-        for entry_dict in data:
-            ledger.log(LedgerEntry(
-                user_id=entry_dict["user_id"],
-                agent=entry_dict["agent"],
-                text=entry_dict["text"],
-                ts=entry_dict["ts"]
-            ))
+        Returns {"cursor", "reset", "entries": [[id, ts, agent, text], ...], "deleted": [id, ...]}.
+        With no cursor, or one from an older generation, reset is True and
+        entries is the user's whole ledger; otherwise only what was added or
+        deleted after the cursor. Hand the returned cursor back next time.
+        """
+        generation, size = self._position()
+        offset = 0
+        reset = True
+        if since:
+            since_generation, _, since_offset = since.partition(".")
+            if since_generation == generation and since_offset.isdigit() and int(since_offset) <= size:
+                offset, reset = int(since_offset), False
+        if size == 0:
+            return {"cursor": f"{generation}.0", "reset": reset, "entries": [], "deleted": []}
+        
+        with open(self.filepath, "rb") as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        data = data[:data.rfind(b"\n") + 1]  # complete lines only; a half-written one waits for next sync
         
-        return ledger
\ No newline at end of file
+        entries = {}
+        deleted = []
+        for record in self._records_in(data):
+            if record.get("user_id", user_id) != user_id:
+                continue
+            if record.get("op") == "del":
+                if entries.pop(record["id"], None) is None and not reset:
+                    deleted.append(record["id"])
+            else:
+                entries[record["id"]] = [record["id"], record["ts"], record["agent"], record["text"]]
+        return {
+            "cursor": f"{generation}.{offset + len(data)}",
+            "reset": reset,
+            "entries": list(entries.values()),
+            "deleted": deleted
+        }
@@ -0,0 +1,243 @@
+"""
+Content-addressed store for assembled prompts.
+
+A turn's system prompt is a handful of packed sections (bar lore, history,
+persona, ...), most of them identical to the previous turn's. Each section
+text is stored once under its hash, and each prompt as a small manifest of
+(section name, hash) pairs, filed under the hash of the full prompt text
+(so anything holding the prompt, e.g. the LLM client's usage records, can
+name it). Logs carry only that id and per-section hashes and lengths; the
+CLI puts the full text back together:
+
+    python -m src.prompt_registry show <prompt_id>
+    python -m src.prompt_registry segments <prompt_id>
+
+One registry per process (shared_registry). Recording a prompt only hashes
+it on the caller's thread; a writer thread does the file writes and, once an
+hour, prunes manifests past their retention along with the segments no
+manifest uses any more.
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.config.prompt_templates import content_hash
+
+REGISTRY_DIR = Path(os.getenv("LPBD_PROMPT_REGISTRY", "data/prompts"))
+
+# Manifests unused for this long, or beyond the newest MAX_MANIFESTS, are pruned
+RETENTION_DAYS = float(os.getenv("LPBD_PROMPT_RETENTION_DAYS", "14"))
+MAX_MANIFESTS = int(os.getenv("LPBD_PROMPT_MAX_MANIFESTS", "20000"))
+PRUNE_INTERVAL = 3600  # seconds between prunes
+
+# Prompts waiting for the writer thread; beyond this they're dropped, never blocking a turn
+WRITE_QUEUE_SIZE = 256
+
+logger = logging.getLogger("lpbd.prompts")
+
+
+def prompt_id(prompt: str) -> str:
+    """Id a full prompt is filed under"""
+    return content_hash(prompt)
+
+
+@dataclass
+class PromptFingerprint:
+    prompt_id: str
+    segments: List[Dict[str, object]] = field(default_factory=list)  # name, hash, chars
+
+    def as_log(self) -> Dict[str, object]:
+        return {"prompt_id": self.prompt_id, "prompt_segments": self.segments}
+
+
+class PromptRegistry:
+    """Segments and manifests on disk under `root`; each written at most once, by the writer thread"""
+
+    def __init__(self, root: Path | str = REGISTRY_DIR, retention_days: float = RETENTION_DAYS,
+                 max_manifests: int = MAX_MANIFESTS, clock: Callable[[], float] = time.time) -> None:
+        self.root = Path(root)
+        self.retention_days = retention_days
+        self.max_manifests = max_manifests
+        self.clock = clock
+        self.dropped = 0  # prompts not stored because the write queue was full
+        self._known: set = set()  # paths already on disk, so repeats skip the stat (writer thread only)
+        self._pruned_at = 0.0
+        self._queue: queue.Queue = queue.Queue(WRITE_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    def _segment_path(self, digest: str) -> Path:
+        return self.root / "segments" / f"{digest}.txt"
+
+    def _manifest_path(self, prompt_id: str) -> Path:
+        return self.root / "manifests" / f"{prompt_id}.json"
+
+    def _write_once(self, path: Path, text: str, touch: bool = False) -> None:
+        """`touch`: refresh the mtime of a file already there, so retention counts from its last use"""
+        if path in self._known:
+            if not touch:
+                return
+            try:
+                os.utime(path)
+                return
+            except FileNotFoundError:
+                pass  # pruned by another process: file it again
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, path)  # readers never see half a file
+        elif touch:
+            os.utime(path)
+        self._known.add(path)
+
+    def record(self, sections: Sequence[Tuple[str, str]], separator: str = "\n\n") -> PromptFingerprint:
+        """Queue (name, text) sections, in prompt order, for storage; returns the prompt's fingerprint"""
+        entries = []
+        segments = []
+        files = []
+        for name, text in sections:
+            digest = content_hash(text)
+            files.append((self._segment_path(digest), text))
+            entries.append([name, digest])
+            segments.append({"name": name, "hash": digest, "chars": len(text)})
+
+        manifest = json.dumps({"separator": separator, "segments": entries}, sort_keys=True)
+        full_id = prompt_id(separator.join(text for _, text in sections))
+        files.append((self._manifest_path(full_id), manifest))  # last: never filed before its segments
+        self._enqueue(files)
+        return PromptFingerprint(prompt_id=full_id, segments=segments)
+
+    def _enqueue(self, files: List[Tuple[Path, str]]) -> None:
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="prompt-registry", daemon=True)
+                    self._writer.start()
+        try:
+            self._queue.put_nowait(files)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        while True:
+            files = self._queue.get()
+            try:
+                if self.clock() - self._pruned_at >= PRUNE_INTERVAL:
+                    self.prune()
+                *segments, (manifest_path, manifest) = files
+                for path, text in segments:
+                    self._write_once(path, text)
+                self._write_once(manifest_path, manifest, touch=True)
+            except OSError as e:
+                logger.warning("Prompt registry write failed", extra={"error": str(e)})
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Wait until every queued prompt is on disk"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def prune(self) -> int:
+        """
+        Remove manifests past retention_days or beyond the newest max_manifests,
+        then the segments no remaining manifest uses. Returns the files removed.
+        Runs on the writer thread, so no queued prompt is filed halfway through.
+        """
+        self._pruned_at = self.clock()
+        cutoff = self._pruned_at - self.retention_days * 86400
+        manifests = []
+        for path in self.root.glob("manifests/*.json"):
+            try:
+                manifests.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue  # pruned by another process
+        manifests.sort(reverse=True)
+
+        removed = []
+        referenced = set()
+        for rank, (mtime, path) in enumerate(manifests):
+            if rank < self.max_manifests and mtime >= cutoff:
+                try:
+                    referenced.update(digest for _, digest in json.loads(path.read_text(encoding="utf-8"))["segments"])
+                    continue
+                except (OSError, ValueError, KeyError):
+                    pass  # unreadable: nothing can be rebuilt from it anyway
+            removed.append(path)
+        removed.extend(path for path in self.root.glob("segments/*.txt") if path.stem not in referenced)
+
+        for path in removed:
+            path.unlink(missing_ok=True)
+            self._known.discard(path)
+        if removed:
+            logger.info("Prompt registry pruned", extra={"removed": len(removed)})
+        return len(removed)
+
+    def manifest(self, prompt_id: str) -> dict:
+        """Raises FileNotFoundError for an unknown id"""
+        return json.loads(self._manifest_path(prompt_id).read_text(encoding="utf-8"))
+
+    def segment(self, digest: str) -> str:
+        return self._segment_path(digest).read_text(encoding="utf-8")
+
+    def reconstruct(self, prompt_id: str) -> str:
+        """The full prompt text, exactly as sent"""
+        manifest = self.manifest(prompt_id)
+        return manifest["separator"].join(self.segment(digest) for _, digest in manifest["segments"])
+
+
+# The one registry a process records into (Routers are built per request)
+shared_registry = PromptRegistry()
+atexit.register(shared_registry.flush)
+
+
+def record_safely(registry: Optional[PromptRegistry], sections: Sequence[Tuple[str, str]],
+                  separator: str = "\n\n") -> Dict[str, object]:
+    """
+    Fingerprint fields for a log record. The files are written on the
+    registry's writer thread, so a registry failure never breaks the turn.
+    """
+    if registry is None or not sections:
+        return {}
+    return registry.record(sections, separator).as_log()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.prompt_registry",
+                                     description="Rebuild logged prompts from their ids")
+    parser.add_argument("--root", default=str(REGISTRY_DIR), help="registry directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("show", help="print the full prompt").add_argument("prompt_id")
+    commands.add_parser("segments", help="list the prompt's sections").add_argument("prompt_id")
+    args = parser.parse_args(argv)
+
+    registry = PromptRegistry(args.root)
+    try:
+        manifest = registry.manifest(args.prompt_id)
+    except FileNotFoundError:
+        print(f"Unknown prompt id: {args.prompt_id}", file=sys.stderr)
+        return 1
+
+    if args.command == "show":
+        print(registry.reconstruct(args.prompt_id))
+    else:
+        for name, digest in manifest["segments"]:
+            print(f"{digest}  {len(registry.segment(digest)):>7}  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
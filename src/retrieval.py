@@ -0,0 +1,179 @@
+"""
+Local retrieval over a patron's archived messages.
+
+Past exchanges (a patron message plus the replies to it) are embedded with
+a hashed word/bigram vectorizer into one NumPy matrix per user. Each
+incoming message is scored against it with a single matrix-vector product,
+so only the few exchanges that matter go into the prompt. No model
+download, no API call.
+
+Indexes live in-process and are topped up incrementally: archiving appends
+to a cached index once its transaction commits, and other workers fetch
+only the sessions they haven't indexed yet when the user's cold snapshot
+version moves. The reaper thread adds while request threads search, so an
+index swaps its memories and matrix in as one snapshot.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+VECTOR_DIM = 2 ** 12
+RETRIEVAL_TOP_K = 3
+MIN_SCORE = 0.15  # below this an exchange is noise, not a memory
+
+_INDEX_CACHE_SIZE = 256
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+class HashingVectorizer:
+    """
+    Word unigrams + bigrams hashed into a fixed number of buckets (CRC32, stable
+    across processes), sublinear term frequency, L2-normalised rows.
+    """
+
+    def __init__(self, dim: int = VECTOR_DIM) -> None:
+        self.dim = dim
+
+    def _features(self, text: str) -> List[int]:
+        words = _WORD.findall(text.lower())
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return [zlib.crc32(gram.encode()) % self.dim for gram in grams]
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            buckets = self._features(text)
+            if buckets:
+                np.add.at(matrix[row], buckets, 1.0)
+        np.log1p(matrix, out=matrix)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+@dataclass
+class Memory:
+    session_id: str
+    text: str
+    timestamp: Optional[datetime]
+    score: float = 0.0
+
+
+def exchanges(messages: Iterable[Dict]) -> List[Memory]:
+    """
+    Group archived messages (one session, oldest first) into exchanges:
+    each patron message together with the agent replies that follow it.
+    """
+    grouped: List[Memory] = []
+    for msg in messages:
+        role = "Patron" if msg["is_user"] else msg["agent"].title()
+        line = f"{role}: {msg['content']}"
+        if msg["is_user"] or not grouped or grouped[-1].session_id != msg["session_id"]:
+            grouped.append(Memory(session_id=msg["session_id"], text=line, timestamp=msg.get("timestamp")))
+        else:
+            grouped[-1].text += f"\n{line}"
+    return grouped
+
+
+class _Snapshot(NamedTuple):
+    memories: Tuple[Memory, ...]
+    matrix: np.ndarray  # row i is memories[i]
+    session_ids: FrozenSet[str]
+
+
+class MemoryIndex:
+    """
+    One user's exchanges and their vectors; appended to, never rebuilt.
+    Readers take one immutable snapshot, adders build the next one under a
+    lock and swap it in, so a search never sees memories and rows out of step.
+    """
+
+    def __init__(self, vectorizer: HashingVectorizer | None = None) -> None:
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self._snapshot = _Snapshot((), np.zeros((0, self.vectorizer.dim), dtype=np.float32), frozenset())
+        self._add_lock = threading.Lock()
+        self.version = 0  # cold snapshot version this index has caught up with
+
+    def __len__(self) -> int:
+        return len(self._snapshot.memories)
+
+    @property
+    def memories(self) -> Tuple[Memory, ...]:
+        return self._snapshot.memories
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._snapshot.matrix
+
+    @property
+    def session_ids(self) -> FrozenSet[str]:
+        return self._snapshot.session_ids
+
+    def add(self, memories: Sequence[Memory]) -> None:
+        with self._add_lock:
+            current = self._snapshot
+            fresh = [m for m in memories if m.session_id not in current.session_ids]
+            if not fresh:
+                return
+            self._snapshot = _Snapshot(
+                current.memories + tuple(fresh),
+                np.vstack([current.matrix, self.vectorizer.transform([m.text for m in fresh])]),
+                current.session_ids | {m.session_id for m in fresh}
+            )
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K, min_score: float = MIN_SCORE) -> List[Memory]:
+        """Top-k exchanges by cosine similarity, best first"""
+        memories, matrix, _ = self._snapshot
+        if not memories or not query.strip():
+            return []
+        scores = matrix @ self.vectorizer.transform([query])[0]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            Memory(memories[i].session_id, memories[i].text, memories[i].timestamp, float(scores[i]))
+            for i in top if scores[i] >= min_score
+        ]
+
+
+# In-process indexes: user_id -> MemoryIndex
+_indexes: "OrderedDict[str, MemoryIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def cached_index(user_id: str) -> Optional[MemoryIndex]:
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+        if index is not None:
+            _indexes.move_to_end(user_id)
+        return index
+
+
+def remember_index(user_id: str, index: MemoryIndex) -> MemoryIndex:
+    with _indexes_lock:
+        _indexes[user_id] = index
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > _INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def format_memories(memories: Sequence[Memory]) -> str:
+    """Retrieved exchanges, oldest visit first, for the prompt"""
+    if not memories:
+        return ""
+    lines = []
+    for memory in sorted(memories, key=lambda m: m.timestamp or datetime.min):
+        when = f" ({memory.timestamp:%A %d %B})" if memory.timestamp else ""
+        lines.append(f"--- From an earlier visit{when} ---")
+        lines.append(memory.text)
+    return "\n".join(lines)
@@ -1,4 +1,8 @@
+from __future__ import annotations
+
+from functools import partial
 from time import time
+from typing import TYPE_CHECKING, Iterator
 
 # agents:
 from src.agents.bart import Bart
@@ -11,16 +15,23 @@ from src.agents.hermes import Hermes
 from src.schemas.message import Message
 from src.history import MessageHistory
 from src.config.loader import Config
-from src.logging_setup import setup_logger
+from src.logging_setup import setup_logger, DEBUG_PROMPTS
 from src.persistence import HistoryPersistence, LedgerPersistence
-from src.database.memory_manager import MemoryManager
-from src.database.models import get_db
+from src.agents.bukowski_ledger import BukowskiLedger
+from src.context_packer import ContextPacker, ContextSection, LATEST_TURNS
+from src.prompt_registry import record_safely, shared_registry
+from src import bar_round, flood
+from src.crisis import CrisisAssessment
+from src.admission import AdmissionRejected, llm_gate
+
+if TYPE_CHECKING:
+    from src.database.memory_manager import TurnContext
 
 class Router:
     def __init__(self, history: MessageHistory | None = None, config: Config | None = None, weather_context: str = None) -> None:
         self.config = config or Config()
         self.weather_context = weather_context
-        self.bar_context = self.config.get_bar_context()
+        self.bar_knowledge = self.config.get_bar_knowledge()
         
         self.bart = Bart(prompt=self.config.get_prompt("bart"))
         self.blanca = Blanca(prompt=self.config.get_prompt("blanca"))
@@ -36,11 +47,22 @@ class Router:
             self.history = history
         
         self.ledger_persistence = LedgerPersistence()
-        self.ledger = self.ledger_persistence.load()
+        self._ledger = None  # loaded on first use: most requests never touch Bukowski
 
         self.logger = setup_logger()
         self.muted_agents = set()
         self.memory_mgr = None
+        self.context_packer = ContextPacker()
+        self.last_context = None
+        self.prompt_registry = shared_registry
+        self.last_prompt = {}  # prompt_id + segment hashes/lengths of the last assembled prompt
+
+    @property
+    def ledger(self) -> BukowskiLedger:
+        """Bukowski's ledger, replayed from its journal the first time it's needed"""
+        if self._ledger is None:
+            self._ledger = self.ledger_persistence.load()
+        return self._ledger
 
     def save_state(self) -> None:
         """Save conversation history to disk."""
@@ -62,51 +84,12 @@ class Router:
         
     def _should_handoff(self, user_message: str, agent_name: str, agent_response: str) -> str | None:
         """
-        Use LLM to determine if agent should hand off to another agent.
+        Check whether the agent's reply hands off to another agent (compiled
+        phrases from handoff.yaml, no LLM call).
         Returns: target agent name or None
         """
-        from anthropic import Anthropic
-        import os
-        
-        client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-        
-        prompt = f"""You are analyzing a conversation in a bar. Current agent is {agent_name.upper()}.
-
-        User said: "{user_message}"
-        {agent_name.upper()} responded: "{agent_response}"
-
-        Should {agent_name.upper()} hand off to another agent?
-
-        Agents:
-        - BERNIE: Emotional support, philosophy, existential questions
-        - JB: Practical advice, chess, sailing, technical matters  
-        - HERMES: Crisis intervention, suicide prevention
-        - BLANCA: Rule enforcement, bar management
-        - BART: General bartender, stories, light conversation (current)
-
-        Respond with ONLY the agent name (bernie/jb/hermes/blanca) if handoff needed, or "none" if current agent should continue.
-
-        If user explicitly asks for another agent OR if the agent's response suggests they're calling/summoning another agent, respond with that agent's name."""
-
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=10,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        
-        result = response.content[0].text.strip().lower()
-        
-        if result in ["bernie", "jb", "hermes", "blanca"]:
-            return result
-        return None
+        return self.config.get_handoff_detector().detect(agent_response, agent_name)
     
-    def _strip_stage_directions(self, text: str) -> str:
-        """Remove stage directions like **Bernie:** from responses"""
-        import re
-        # Only remove **CapitalizedName**: (stage directions, not emphasis)
-        cleaned = re.sub(r'\*\*([A-Z][a-z]+)\*\*:\s*', '', text)
-        return cleaned.strip()
-        
     def mute_agent(self, agent_name: str) -> str:
         """Mute an agent (only Bernie and JB can be muted)."""
         mutable_agents = ["bernie", "jb"]
@@ -124,73 +107,192 @@ class Router:
         self.muted_agents.discard(agent_name)
         return f"{agent_name.title()} unmuted."
     
+    def _detect_crisis(self, user_text: str) -> bool:
+        """High-confidence crisis language (local scorer, no LLM call)"""
+        return self.config.get_crisis_screen().assess(user_text).urgent
+    
+    def assess_crisis(self, message: Message) -> CrisisAssessment:
+        """Local crisis pre-screen, run before moderation; every decision is logged"""
+        assessment = self.config.get_crisis_screen().assess(message.text or "")
+        log = self.logger.warning if assessment.urgent else self.logger.info
+        log("Crisis screen", extra={
+            "user_id": message.user_id,
+            "crisis_level": assessment.level,
+            "crisis_score": assessment.score,
+            "crisis_matched": list(assessment.matched)
+        })
+        return assessment
+    
     def _pre_route_scan(self, user_text: str) -> tuple[bool, str]:
         """Scan for rule violations before routing."""
-        return self.blanca.scan_for_violations(user_text)
+        return self.blanca.scan_for_violations(user_text, self.config.get_moderator())
+    
+    def screen(self, message: Message, turn_context: TurnContext | None = None) -> str | None:
+        """
+        Local checks ahead of any LLM call: moderation, then flood / repeat / loop
+        detection over the session's recent messages. Returns Blanca's line if
+        the message is stopped, else None.
+        """
+        result = self.blanca.moderate(message.text or "", self.config.get_moderator())
+        if not result.severity:
+            return self._flood_check(message, turn_context)
+        details = {
+            "user_id": message.user_id,
+            "violation_type": result.category,
+            "severity": result.severity.name.lower(),
+            "matched": result.matched
+        }
+        if not result.blocked:
+            self.logger.info("Moderation flag", extra=details)
+            return self._flood_check(message, turn_context)
+        self.logger.warning("Rule violation", extra={**details, "warning": result.warning})
+        return result.warning
+    
+    def _flood_check(self, message: Message, turn_context: TurnContext | None) -> str | None:
+        # Sessions only: the CLI has no session, and a human typing there isn't a flood
+        if turn_context is None:
+            return None
+        detector = self.config.get_flood_detector()
+        intervention = detector.check(flood.from_hot(turn_context.hot, detector.window))
+        if intervention is None:
+            return None
+        self.logger.warning("Flood intervention", extra={
+            "user_id": message.user_id,
+            "violation_type": intervention.kind
+        })
+        return intervention.reply
     
-    def _inject_history_context(self, agent_prompt: str, user_id: str, session_id: str, db_session) -> str:
+    def _with_bar_lore(self, agent_prompt: str, query: str) -> str:
+        """
+        No-session path (CLI): the prompt plus core bar lore and the sections
+        `query` touches, the same lore _inject_history_context packs for sessions.
+        """
+        if not self.bar_knowledge:
+            return agent_prompt
+        lore = "\n\n".join(part for part in (
+            self.bar_knowledge.core_text(), self.bar_knowledge.matched_text(query)
+        ) if part)
+        return f"{agent_prompt}\n\n=== BAR KNOWLEDGE ===\n{lore}" if lore else agent_prompt
+    
+    def _sessionless(self, agent):
+        """The agent, its prompt recorded as the turn's (so the prompt_id in its usage log resolves)"""
+        self.last_prompt = record_safely(self.prompt_registry, [("persona", agent.prompt)])
+        return agent
+    
+    def _inject_history_context(self, agent_prompt: str, user_id: str, session_id: str, db_session,
+                                turn_context: TurnContext | None = None, query: str = "") -> str:
         """
         Inject: bar context (static) + onboarding info + conversation history + weather
+        
+        Uses turn_context if the caller already loaded it; otherwise loads it
+        here in one round trip. `query` (the incoming message) picks which
+        archived exchanges to recall. Packed to self.context_packer's token budget:
+        persona, conditions, core bar lore and the newest turns are always kept,
+        the rest fills in priority order (onboarding, older turns, recalled
+        exchanges, past visits, bar lore matching the message).
         """
-        context_parts = []
+        if turn_context is None and self.memory_mgr:
+            turn_context = self.memory_mgr.load_turn_context(session_id)
         
-        # 1. BAR CONTEXT (static knowledge, loaded once)
-        if self.bar_context:
-            context_parts.append(f"=== BAR KNOWLEDGE ===\n{self.bar_context}")
+        sections = []
+        
+        # 1. BAR CONTEXT (always-on core + the sections this message touches)
+        if self.bar_knowledge:
+            core = self.bar_knowledge.core_text()
+            if core:
+                sections.append(ContextSection(
+                    name="bar_core", order=1, priority=0,
+                    text=f"=== BAR KNOWLEDGE ===\n{core}"
+                ))
+            matched = self.bar_knowledge.matched_text(query)
+            if matched:
+                sections.append(ContextSection(
+                    name="bar_knowledge", order=2, priority=5,
+                    text=matched if core else f"=== BAR KNOWLEDGE ===\n{matched}"
+                ))
         
         # 2. ONBOARDING CONTEXT (from user)
-        if db_session:
-            from src.database.models import User
-            user = db_session.query(User).filter(User.id == user_id).first()
-            if user and user.onboarding_context:
-                onboarding_text = (
-                    f"=== ABOUT THIS PERSON ===\n"
-                    f"Age: {user.onboarding_context.get('age', 'unknown')}\n"
-                    f"Name: {user.onboarding_context.get('name', 'unknown')}\n"
-                    f"Pronouns: {user.onboarding_context.get('pronouns', 'not specified')}\n"
-                    f"Why they came: {user.onboarding_context.get('motivation', 'unknown')}\n"
-                    f"Prior experience: {user.onboarding_context.get('experience', 'unknown')}"
-                )
-                context_parts.append(onboarding_text)
+        if turn_context and turn_context.onboarding:
+            onboarding = turn_context.onboarding
+            onboarding_text = (
+                f"=== ABOUT THIS PERSON ===\n"
+                f"Age: {onboarding.get('age', 'unknown')}\n"
+                f"Name: {onboarding.get('name', 'unknown')}\n"
+                f"Pronouns: {onboarding.get('pronouns', 'not specified')}\n"
+                f"Why they came: {onboarding.get('motivation', 'unknown')}\n"
+                f"Prior experience: {onboarding.get('experience', 'unknown')}"
+            )
+            sections.append(ContextSection(name="onboarding", order=3, priority=1, text=onboarding_text))
         
         # 3. CONVERSATION HISTORY (from database)
-        if self.memory_mgr:
-            messages = self.memory_mgr.get_full_context(user_id, session_id)
-            if messages:
-                history_text = self.memory_mgr.format_for_agent_context(messages)
-                context_parts.append(f"=== CONVERSATION HISTORY ===\n{history_text}")
+        #    Cold part is the snapshot built at archive time; only hot is formatted per turn
+        if self.memory_mgr and turn_context:
+            if turn_context.cold_text:
+                sections.append(ContextSection(
+                    name="previous_visits", order=4, priority=4,
+                    text=f"=== CONVERSATION HISTORY ===\n{turn_context.cold_text}"
+                ))
+            memories = self.memory_mgr.retrieve_memories(user_id, query, turn_context.cold_version)
+            if memories:
+                from src.retrieval import format_memories
+                sections.append(ContextSection(
+                    name="recalled", order=5, priority=3,
+                    text=f"=== THINGS THEY TOLD YOU BEFORE ===\n{format_memories(memories)}"
+                ))
+            if turn_context.hot:
+                header = "=== THIS VISIT ==="
+                if turn_context.running_summary:
+                    header += f"\nEarlier tonight: {turn_context.running_summary}"
+                sections.append(ContextSection(
+                    name="current_visit", order=6, priority=2,
+                    header=header,
+                    lines=self.memory_mgr.format_lines(turn_context.hot),
+                    reserve_last=LATEST_TURNS
+                ))
         
         # 4. CURRENT WEATHER (from session, cached at session start)
         if self.weather_context:
-            context_parts.append(f"=== CURRENT CONDITIONS ===\n{self.weather_context}")
+            sections.append(ContextSection(
+                name="conditions", order=7, priority=0,
+                text=f"=== CURRENT CONDITIONS ===\n{self.weather_context}"
+            ))
         
-        # Assemble full context
-        if context_parts:
-            full_context = "\n\n".join(context_parts)
-            final_prompt = f"{full_context}\n\n{'='*50}\n\n{agent_prompt}"
-            
-            return final_prompt
+        if not sections:
+            self.last_context = None
+            self.last_prompt = record_safely(self.prompt_registry, [("persona", agent_prompt)])
+            return agent_prompt
+        
+        # Persona (includes environment + tides from Config.get_prompt)
+        sections.append(ContextSection(
+            name="persona", order=8, priority=0,
+            text=f"{'='*50}\n\n{agent_prompt}"
+        ))
         
-        return agent_prompt
+        self.last_context = self.context_packer.pack(sections)
+        self.last_prompt = record_safely(
+            self.prompt_registry, list(zip(self.last_context.included, self.last_context.blocks))
+        )
+        return self.last_context.text
 
-    def handle(self, message: Message, db_session=None) -> tuple[str, str]:
+    def handle(self, message: Message, db_session=None, turn_context: TurnContext | None = None) -> tuple[str, str]:
         user_id = message.user_id
         if db_session:
+            from src.database.memory_manager import MemoryManager  # deferred: pulls in SQLAlchemy
             self.memory_mgr = MemoryManager(db_session)
         text = message.text or ""
+        self.last_prompt = {}
         clean = text.strip().lower()
 
         try:
+            crisis = None
             if not text.startswith("::"):
-                # Pre-router scan for violations
-                has_violation, warning = self._pre_route_scan(text)
-                if has_violation:
-                    self.logger.warning("Rule violation", extra={
-                        "user_id": user_id,
-                        "violation_type": "tone",
-                        "warning": warning
-                    })
-                    return "blanca", warning
+                # Crisis first: straight to Hermes, ahead of moderation and without a router call
+                crisis = self.assess_crisis(message)
+                if not crisis.urgent:
+                    # Pre-router scan for violations
+                    warning = self.screen(message, turn_context)
+                    if warning:
+                        return "blanca", warning
             
             # Mute/unmute commands
             if clean.startswith("mute "):
@@ -213,8 +315,17 @@ class Router:
                 })
                 return "system", reply
             
+            # Ask the whole bar ("bar: ..."): every regular answers, concurrently
+            if bar_round.is_round(text) and not (crisis is not None and crisis.urgent):
+                question = Message(user_id, bar_round.strip_prefix(text), getattr(message, "session_id", None))
+                return "bar", bar_round.format_round(self._bar_round(question, db_session, turn_context))
+            
+            # 0: Local crisis screen is sure
+            if crisis is not None and crisis.urgent:
+                agent_name = "hermes"
+            
             # 1: Explicit agent selection (user types "bernie:", "jb:", etc.)
-            if clean.startswith("jb"):
+            elif clean.startswith("jb"):
                 text = text[2:].strip(":, ") or text
                 agent_name = "jb" if "jb" not in self.muted_agents else "bart"
             
@@ -230,9 +341,10 @@ class Router:
                 text = text[6:].strip(":, ") or text
                 agent_name = "hermes"
             
-            # 2: Router LLM decides
+            # 2: Router LLM decides (borderline crisis: Hermes if the router is unavailable)
             else:
-                agent_name = self._simple_route(text, current_agent=self.last_agent)
+                fallback = "hermes" if crisis is not None and crisis.borderline else None
+                agent_name = self._simple_route(text, current_agent=self.last_agent, fallback=fallback)
                 # Check mute status
                 if agent_name in self.muted_agents and agent_name not in ["hermes", "blanca"]:
                     agent_name = "bart"
@@ -244,13 +356,17 @@ class Router:
                     agent_prompt, 
                     user_id, 
                     message.session_id,
-                    db_session
+                    db_session,
+                    turn_context,
+                    query=text
                 )
                 
-                if agent_name == "bart":
-                    print("\n=== BART'S PROMPT ===")
+                if DEBUG_PROMPTS:
+                    print(f"\n=== {agent_name.upper()}'S PROMPT ({self.last_prompt.get('prompt_id')}) ===")
                     print(enhanced_prompt)
                     print("=== END PROMPT ===\n")
+
+                if agent_name == "bart":
                     agent = Bart(prompt=enhanced_prompt)
                 elif agent_name == "bernie":
                     agent = Bernie(prompt=enhanced_prompt)
@@ -267,19 +383,19 @@ class Router:
             else:
                 # Fallback without history
                 if agent_name == "bart":
-                    reply = self.bart.respond(text)
+                    reply = self._sessionless(self.bart).respond(text)
                 elif agent_name == "bernie":
-                    reply = self.bernie.respond(text)
+                    reply = self._sessionless(self.bernie).respond(text)
                 elif agent_name == "jb":
-                    reply = self.jb.respond(text)
+                    reply = self._sessionless(self.jb).respond(text)
                 elif agent_name == "blanca":
-                    reply = self.blanca.respond(text)
+                    # She answers questions about the bar, so she gets its lore even without a session
+                    reply = self._sessionless(Blanca(prompt=self._with_bar_lore(self.config.get_prompt("blanca"), text))).respond(text)
                 elif agent_name == "hermes":
-                    reply = self.hermes.respond(text)
+                    reply = self._sessionless(self.hermes).respond(text)
                 else:
-                    reply = self.bart.respond(text)
-
-            reply = self._strip_stage_directions(reply)
+                    reply = self._sessionless(self.bart).respond(text)
+            # Replies come back sanitized by the agent (src/agents/sanitizer.py)
 
             self.history.add_turn(
                 user_id=message.user_id,
@@ -294,12 +410,17 @@ class Router:
                 "user_id": message.user_id,
                 "agent": agent_name,
                 "user_text": text,
-                "reply_text": reply
+                "reply_text": reply,
+                "context_tokens": self.last_context.tokens_used if self.last_context else None,
+                "prompt_hash": self.config.get_prompt_hash(agent_name),
+                **self.last_prompt
             })
             
             self.last_agent = agent_name
             return agent_name, reply
 
+        except AdmissionRejected:
+            raise
         except Exception:
             self.logger.exception("Exception in handle", extra={
                 "user_id": message.user_id,
@@ -307,15 +428,18 @@ class Router:
             })
             return self._fallback_to_blanca(message, "exception_in_handle")
         
-    def execute_agent(self, agent_name: str, message: Message, db_session=None) -> str:
+    def execute_agent(self, agent_name: str, message: Message, db_session=None,
+                      turn_context: TurnContext | None = None) -> str:
     
         """Execute a specific agent directly, bypassing routing logic."""
 
         # Set memory manager if DB provided
         if db_session:
+            from src.database.memory_manager import MemoryManager  # deferred: pulls in SQLAlchemy
             self.memory_mgr = MemoryManager(db_session)
 
         text = message.text or ""
+        self.last_prompt = {}
         user_id = message.user_id
         
         # Check if agent is muted (except Hermes and Blanca who can't be muted)
@@ -330,12 +454,14 @@ class Router:
                     bart_prompt, 
                     user_id, 
                     message.session_id,
-                    db_session
+                    db_session,
+                    turn_context,
+                    query=text
                 )
                 bart_with_history = Bart(prompt=enhanced_prompt)
                 reply = bart_with_history.respond(text)
             else:
-                reply = self.bart.respond(text)
+                reply = self._sessionless(self.bart).respond(text)
         elif agent_name == "bernie":
             if self.memory_mgr and hasattr(message, 'session_id'):
                 bernie_prompt = self.config.get_prompt("bernie")
@@ -343,12 +469,14 @@ class Router:
                     bernie_prompt, 
                     user_id, 
                     message.session_id,
-                    db_session
+                    db_session,
+                    turn_context,
+                    query=text
                 )
                 bernie_with_history = Bernie(prompt=enhanced_prompt)
                 reply = bernie_with_history.respond(text)
             else:
-                reply = self.bernie.respond(text)
+                reply = self._sessionless(self.bernie).respond(text)
         elif agent_name == "jb":
             if self.memory_mgr and hasattr(message, 'session_id'):
                 jb_prompt = self.config.get_prompt("jb")
@@ -356,12 +484,14 @@ class Router:
                     jb_prompt, 
                     user_id, 
                     message.session_id,
-                    db_session
+                    db_session,
+                    turn_context,
+                    query=text
                 )
                 jb_with_history = JB(prompt=enhanced_prompt)
                 reply = jb_with_history.respond(text)
             else:
-                reply = self.jb.respond(text)
+                reply = self._sessionless(self.jb).respond(text)
         elif agent_name == "blanca":
             if self.memory_mgr and hasattr(message, 'session_id'):
                 blanca_prompt = self.config.get_prompt("blanca")
@@ -369,12 +499,14 @@ class Router:
                     blanca_prompt, 
                     user_id, 
                     message.session_id,
-                    db_session
+                    db_session,
+                    turn_context,
+                    query=text
                 )
                 blanca_with_history = Blanca(prompt=enhanced_prompt)
                 reply = blanca_with_history.respond(text)
             else:
-                reply = self.blanca.respond(text)
+                reply = self._sessionless(Blanca(prompt=self._with_bar_lore(self.config.get_prompt("blanca"), text))).respond(text)
         elif agent_name == "hermes":
             if self.memory_mgr and hasattr(message, 'session_id'):
                 hermes_prompt = self.config.get_prompt("hermes")
@@ -382,16 +514,18 @@ class Router:
                     hermes_prompt, 
                     user_id, 
                     message.session_id,
-                    db_session
+                    db_session,
+                    turn_context,
+                    query=text
                 )
                 hermes_with_history = Hermes(prompt=enhanced_prompt)
                 reply = hermes_with_history.respond(text)
             else:
-                reply = self.hermes.respond(text)
+                reply = self._sessionless(self.hermes).respond(text)
         else:
             # Unknown agent, fallback to Bart
             agent_name = "bart"
-            reply = self.bart.respond(text)
+            reply = self._sessionless(self.bart).respond(text)
         
         # Log and persist turn
         self.history.add_turn(
@@ -408,16 +542,100 @@ class Router:
             "user_id": message.user_id,
             "agent": agent_name,
             "user_text": text,
-            "reply_text": reply
+            "reply_text": reply,
+            "context_tokens": self.last_context.tokens_used if self.last_context else None,
+            "prompt_hash": self.config.get_prompt_hash(agent_name),
+            **self.last_prompt
         })
         
         return reply
     
-    def _simple_route(self, user_message: str, current_agent: str = "bart") -> str:
-        """Fast routing with integrated crisis detection and handoff recognition"""
+    def ask_the_bar(self, message: Message, db_session=None,
+                    turn_context: TurnContext | None = None) -> bar_round.Round:
+        """
+        Put one message to every non-muted regular at once ("bar: ..." or the
+        API's ask_bar flag). Screened like any message first: a crisis goes to
+        Hermes alone, a moderation stop to Blanca alone, and the returned
+        round's `screened` says which. Prompts are built before this returns;
+        iterate for (agent, reply) as each one finishes.
+        """
+        if db_session:
+            from src.database.memory_manager import MemoryManager  # deferred: pulls in SQLAlchemy
+            self.memory_mgr = MemoryManager(db_session)
+        question = Message(message.user_id, bar_round.strip_prefix(message.text or ""),
+                           getattr(message, "session_id", None))
+        
+        if self.assess_crisis(question).urgent:
+            return bar_round.Round([("hermes", self.execute_agent("hermes", question, db_session, turn_context))],
+                                   screened="hermes")
+        warning = self.screen(question, turn_context)
+        if warning:
+            return bar_round.Round([("blanca", warning)], screened="blanca")
+        return bar_round.Round(self._bar_round(question, db_session, turn_context))
+    
+    def _bar_round(self, message: Message, db_session=None,
+                   turn_context: TurnContext | None = None) -> Iterator[tuple[str, str]]:
+        # Prompts here, on the caller's thread (database + packer); only the LLM calls fan out
+        text = message.text or ""
+        if turn_context is None and self.memory_mgr:
+            turn_context = self.memory_mgr.load_turn_context(message.session_id)
+        agent_classes = {"bart": Bart, "bernie": Bernie, "jb": JB, "hermes": Hermes, "blanca": Blanca}
+        
+        calls = {}
+        prompts = {}
+        for agent_name in bar_round.round_agents(self.muted_agents):
+            self.last_prompt = {}
+            if self.memory_mgr and hasattr(message, 'session_id'):
+                enhanced_prompt = self._inject_history_context(
+                    self.config.get_prompt(agent_name),
+                    message.user_id,
+                    message.session_id,
+                    db_session,
+                    turn_context,
+                    query=text
+                )
+                agent = agent_classes[agent_name](prompt=enhanced_prompt)
+            else:
+                agent = self._sessionless(getattr(self, agent_name))
+            prompts[agent_name] = self.last_prompt
+            calls[agent_name] = partial(agent.respond, text, max_tokens=bar_round.ROUND_MAX_TOKENS.get(agent_name))
+        
+        return self._record_round(message, bar_round.fan_out(calls), prompts)
+    
+    def _record_round(self, message: Message, replies: Iterator[tuple[str, str]],
+                      prompts: dict) -> Iterator[tuple[str, str]]:
+        try:
+            for agent_name, reply in replies:
+                self.history.add_turn(
+                    user_id=message.user_id,
+                    agent=agent_name,
+                    user_text=message.text or "",
+                    reply_text=reply,
+                    ts=time()
+                )
+                self.logger.info("Turn completed (bar round)", extra={
+                    "user_id": message.user_id,
+                    "agent": agent_name,
+                    "user_text": message.text,
+                    "reply_text": reply,
+                    "prompt_hash": self.config.get_prompt_hash(agent_name),
+                    **prompts.get(agent_name, {})
+                })
+                yield agent_name, reply
+        finally:
+            self.save_state()
+    
+    def _simple_route(self, user_message: str, current_agent: str = "bart", fallback: str | None = None) -> str:
+        """
+        Fast routing with integrated crisis detection and handoff recognition.
+        If the router call fails the turn still goes ahead, with `fallback`
+        (or the current agent).
+        """
         from anthropic import Anthropic
         import os
         
+        agents = ["bart", "bernie", "jb", "hermes", "blanca"]
+        default = fallback or (current_agent if current_agent in agents else "bart")
         router_config = self.config.get_router_descriptions()  
         
         agent_guide = "\n".join([
@@ -425,12 +643,14 @@ class Router:
             for name, info in router_config.items()
         ])
             
-        client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-        
-        response = client.messages.create(
-            model="claude-haiku-4-5-20251001",
-            max_tokens=10,
-            system=f"""Bar router with crisis detection and handoff recognition.
+        try:
+            client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+
+            with llm_gate.slot():
+                response = client.messages.create(
+                    model="claude-haiku-4-5-20251001",
+                    max_tokens=10,
+                    system=f"""Bar router with crisis detection and handoff recognition.
 
         Current agent: {current_agent}
         Only switch if clearly needed.
@@ -443,29 +663,38 @@ class Router:
         route to that agent immediately.
 
         Otherwise respond with agent name: bart, bernie, jb, hermes, or blanca""",
-            messages=[{
-                "role": "user",
-                "content": f"""User: "{user_message}"
+                    messages=[{
+                        "role": "user",
+                        "content": f"""User: "{user_message}"
 
         {agent_guide}
 
         Current: {current_agent}
         If user mentions agent by name, switch to that agent.
         Stay with {current_agent} unless user clearly needs someone else."""
-                }]
-        )
+                        }]
+                )
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            self.logger.warning("Router call failed", extra={
+                "error": str(e),
+                "agent": default
+            })
+            return default
         
         result = response.content[0].text.strip().lower()
         
         # Handle crisis routing
         if "crisis" in result:
+            self.logger.warning("Crisis routed by LLM router", extra={"agent": "hermes"})
             return "hermes"
         
         # Normal routing
-        agent = result.split()[0].split('\n')[0]
-        if agent in ["bart", "bernie", "jb", "hermes", "blanca"]:
+        agent = result.split()[0].split('\n')[0] if result else ""
+        if agent in agents:
             return agent
-        return current_agent
+        return default
     
     def route_message(self, message: str, user_id: str, session_id: str) -> str:
         if message == "::USER_ENTERED_BAR::":
@@ -0,0 +1,245 @@
+"""
+Session digests for cold storage, and the rolling summary of a live session.
+
+Digests run once when a session is archived; the rolling summary is folded
+forward in the background as a long session grows. Both use a short Haiku
+call when an API key is configured, otherwise (or on any failure) a local
+extractive digest.
+
+Bukowski's notes are always local: TF-IDF over every sentence of the
+patron's history (one NumPy matrix), then MMR picks central sentences that
+don't repeat each other.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+DIGEST_MODEL = "claude-haiku-4-5-20251001"
+DIGEST_MAX_CHARS = 400
+DIGEST_SENTENCES = 3
+
+ROLLING_MAX_CHARS = 600
+
+NOTE_SENTENCES = 5
+NOTE_SENTENCE_CHARS = 160
+NOTE_MAX_CHARS = 600
+MMR_LAMBDA = 0.5  # relevance vs. novelty; lower favours covering more ground
+
+DIGEST_PROMPT = """You keep the bartender's memory at Le Pale Blue Dot.
+Summarise this visit in at most 3 short sentences, plain text, no lists:
+who the patron is, what they talked about, anything worth following up next time."""
+
+ROLLING_PROMPT = """You keep the bartender's memory of tonight's visit at Le Pale Blue Dot.
+You get the summary so far and the messages that came after it.
+Return the updated summary in at most 4 short sentences, plain text, no lists.
+Keep names, facts and anything the patron asked to come back to."""
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers herself him himself his how i if in into is it its itself
+just me more most my myself no nor not now of off on once only or other our ours ourselves out
+over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours yourself yourselves yeah ok okay oh well
+""".split())
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-z']+")
+
+
+def _sentences(messages: Sequence[Dict]) -> List[tuple]:
+    """(speaker, sentence, is_user) for every sentence in the transcript"""
+    out = []
+    for msg in messages:
+        speaker = "Patron" if msg["is_user"] else msg["agent"].title()
+        for sentence in _SENTENCE_SPLIT.split((msg["content"] or "").replace("\n", " ").strip()):
+            if sentence:
+                out.append((speaker, sentence, msg["is_user"]))
+    return out
+
+
+def extractive_digest(messages: Sequence[Dict], max_sentences: int = DIGEST_SENTENCES,
+                      max_chars: int = DIGEST_MAX_CHARS) -> str:
+    """
+    Pick the most content-heavy sentences (word frequency over the whole visit,
+    stopwords ignored), patron sentences weighted up, kept in original order.
+    """
+    sentences = _sentences(messages)
+    if not sentences:
+        return ""
+
+    words_per_sentence = [
+        [w for w in _WORD.findall(sentence.lower()) if w not in STOPWORDS]
+        for _, sentence, _ in sentences
+    ]
+    frequency = Counter(w for words in words_per_sentence for w in words)
+
+    scored = []
+    for idx, ((_, _, is_user), words) in enumerate(zip(sentences, words_per_sentence)):
+        if not words:
+            continue
+        score = sum(frequency[w] for w in set(words)) / (len(words) ** 0.5)
+        if is_user:
+            score *= 1.5
+        scored.append((score, idx))
+
+    picked = sorted(idx for _, idx in sorted(scored, reverse=True)[:max_sentences])
+
+    parts = []
+    total = 0
+    for idx in picked:
+        speaker, sentence, _ = sentences[idx]
+        part = f"{speaker}: {sentence}"
+        if parts and total + len(part) > max_chars:
+            break
+        parts.append(part)
+        total += len(part) + 1
+
+    digest = " ".join(parts)
+    if len(digest) > max_chars:
+        digest = digest[:max_chars - 3].rstrip() + "..."
+    return digest
+
+
+def _tfidf(words_per_sentence: Sequence[List[str]]) -> np.ndarray:
+    """Sentence x term TF-IDF (sublinear tf, smoothed idf), L2-normalised rows"""
+    vocabulary: Dict[str, int] = {}
+    rows, cols = [], []
+    for row, words in enumerate(words_per_sentence):
+        for w in words:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(w, len(vocabulary)))
+    matrix = np.zeros((len(words_per_sentence), max(len(vocabulary), 1)), dtype=np.float32)
+    if rows:
+        np.add.at(matrix, (np.array(rows), np.array(cols)), 1.0)
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1 + len(matrix)) / (1 + document_frequency)) + 1.0
+    matrix = np.log1p(matrix) * idf.astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def extractive_note(messages: Sequence[Dict], max_sentences: int = NOTE_SENTENCES,
+                    max_chars: int = NOTE_MAX_CHARS, sentence_chars: int = NOTE_SENTENCE_CHARS,
+                    diversity: float = MMR_LAMBDA) -> List[str]:
+    """
+    Note-sized summary of a whole history: "Speaker: sentence" parts in original order.
+    Relevance is cosine similarity to the history's TF-IDF centroid (patron
+    sentences weighted up); maximal marginal relevance then trades it off
+    against similarity to what's already picked. Parts are cut at
+    sentence_chars, the whole note stays within max_chars.
+    """
+    sentences = _sentences(messages)
+    words_per_sentence = [
+        [w for w in _WORD.findall(sentence.lower()) if w not in STOPWORDS]
+        for _, sentence, _ in sentences
+    ]
+    candidates = np.array([bool(words) for words in words_per_sentence])
+    if not candidates.any():
+        return []
+
+    vectors = _tfidf(words_per_sentence)
+    centroid = vectors[candidates].mean(axis=0)
+    centroid /= np.linalg.norm(centroid) or 1.0
+    relevance = vectors @ centroid
+    relevance *= np.where([is_user for _, _, is_user in sentences], 1.5, 1.0)
+    relevance /= relevance[candidates].max() or 1.0  # same 0..1 scale as the redundancy penalty
+    relevance[~candidates] = -np.inf
+
+    picked: List[int] = []
+    redundancy = np.zeros(len(sentences), dtype=np.float32)  # max similarity to anything picked
+    budget = max_chars
+    while len(picked) < max_sentences:
+        scores = diversity * relevance - (1 - diversity) * redundancy
+        scores[picked] = -np.inf
+        best = int(np.argmax(scores))
+        if scores[best] == -np.inf:
+            break
+        speaker, sentence, _ = sentences[best]
+        part_len = min(len(speaker) + 2 + len(sentence), sentence_chars) + 3
+        if picked and part_len > budget:
+            break
+        picked.append(best)
+        budget -= part_len
+        np.maximum(redundancy, vectors @ vectors[best], out=redundancy)
+
+    parts = []
+    for idx in sorted(picked):
+        speaker, sentence, _ = sentences[idx]
+        part = f"{speaker}: {sentence}"
+        if len(part) > sentence_chars:
+            part = part[:sentence_chars - 3].rstrip() + "..."
+        parts.append(part)
+    return parts
+
+
+def _transcript(messages: Sequence[Dict]) -> str:
+    return "\n".join(
+        f"{'Patron' if m['is_user'] else m['agent'].title()}: {m['content']}"
+        for m in messages
+    )
+
+
+def _call_llm(system_prompt: str, user_text: str, max_tokens: int) -> str:
+    """Short Haiku call; empty string if there's no API key or the call fails"""
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        return ""
+    try:
+        from src.agents.llm_client import LLMClient
+        return LLMClient(model=DIGEST_MODEL).call(
+            system_prompt=system_prompt,
+            user_text=user_text,
+            max_tokens=max_tokens,
+            use_cache=False
+        ).strip()
+    except Exception:
+        return ""
+
+
+def summarize_session(messages: Sequence[Dict]) -> str:
+    """
+    Digest for one archived session. LLM when ANTHROPIC_API_KEY is set,
+    extractive fallback otherwise or when the call fails.
+    """
+    if not messages:
+        return ""
+
+    digest = _call_llm(DIGEST_PROMPT, _transcript(messages), max_tokens=120)
+    if digest:
+        return digest[:DIGEST_MAX_CHARS]
+
+    return extractive_digest(messages)
+
+
+def fold_summary(summary: str, messages: Sequence[Dict], max_chars: int = ROLLING_MAX_CHARS) -> str:
+    """
+    Fold newly aged-out messages into a running summary.
+    Extractive fallback appends the new messages' digest and trims the
+    oldest sentences once the summary outgrows max_chars.
+    """
+    if not messages:
+        return summary or ""
+
+    if summary:
+        user_text = f"Summary so far:\n{summary}\n\nNew messages:\n{_transcript(messages)}"
+    else:
+        user_text = _transcript(messages)
+    folded = _call_llm(ROLLING_PROMPT, user_text, max_tokens=160)
+    if folded:
+        return folded[:max_chars]
+
+    folded = " ".join(part for part in (summary, extractive_digest(messages, max_sentences=2)) if part)
+    while len(folded) > max_chars:
+        sentences = _SENTENCE_SPLIT.split(folded, maxsplit=1)
+        if len(sentences) < 2:
+            return folded[len(folded) - max_chars:]
+        folded = sentences[1]
+    return folded
@@ -0,0 +1,187 @@
+import threading
+import time
+
+import pytest
+
+from src.admission import AdmissionRejected, LLMGate, UserRateLimiter
+from src.agents.bart import Bart
+from src import bar_round
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_a_burst_then_refills():
+    clock = FakeClock()
+    limiter = UserRateLimiter(per_minute=6, burst=3, clock=clock)
+
+    for _ in range(3):
+        limiter.admit("u1")
+    with pytest.raises(AdmissionRejected) as rejected:
+        limiter.admit("u1")
+    assert rejected.value.reason == "user_rate"
+    assert rejected.value.retry_after == pytest.approx(10.0)
+    assert rejected.value.retry_after_header == "10"
+
+    clock.now += 10.0
+    limiter.admit("u1")
+
+
+def test_buckets_are_per_user_and_bounded():
+    clock = FakeClock()
+    limiter = UserRateLimiter(per_minute=1, burst=1, max_users=2, clock=clock)
+
+    limiter.admit("u1")
+    limiter.admit("u2")  # u1's flood doesn't touch u2
+    with pytest.raises(AdmissionRejected):
+        limiter.admit("u1")
+
+    limiter.admit("u3")  # evicts u2, the least recently seen
+    assert len(limiter._buckets) == 2
+    limiter.admit("u2")
+
+
+def _hold(gate, started, release):
+    with gate.slot():
+        started.release()
+        release.wait(5)
+
+
+def test_gate_bounds_concurrency_and_rejects_fast_when_queue_full():
+    gate = LLMGate(concurrency=2, queue=1, wait_seconds=5)
+    started, release = threading.Semaphore(0), threading.Event()
+    holders = [threading.Thread(target=_hold, args=(gate, started, release)) for _ in range(2)]
+    for t in holders:
+        t.start()
+    started.acquire()
+    started.acquire()
+
+    waiter = threading.Thread(target=_hold, args=(gate, started, release))
+    waiter.start()
+    while gate.waiting < 1:
+        time.sleep(0.01)
+
+    start = time.monotonic()
+    with pytest.raises(AdmissionRejected) as rejected:
+        with gate.slot():
+            pass
+    assert time.monotonic() - start < 0.1
+    assert rejected.value.reason == "llm_queue_full"
+    assert rejected.value.retry_after > 0
+    with pytest.raises(AdmissionRejected):
+        gate.check()
+
+    release.set()
+    for t in holders + [waiter]:
+        t.join(5)
+    assert gate.in_flight == 0 and gate.waiting == 0
+    gate.check()
+
+
+def test_gate_wait_times_out():
+    gate = LLMGate(concurrency=1, queue=4, wait_seconds=0.05)
+    started, release = threading.Semaphore(0), threading.Event()
+    holder = threading.Thread(target=_hold, args=(gate, started, release))
+    holder.start()
+    started.acquire()
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        with gate.slot():
+            pass
+    assert rejected.value.reason == "llm_wait_timeout"
+
+    release.set()
+    holder.join(5)
+
+
+def test_agents_pass_rejections_through():
+    bart = Bart(prompt="test")
+
+    def full(**kwargs):
+        raise AdmissionRejected("llm_queue_full", 3.0)
+    bart.llm.call = full
+
+    with pytest.raises(AdmissionRejected):
+        bart.respond("Evening.")
+
+
+def test_bar_round_raises_only_if_everyone_was_turned_away():
+    def full():
+        raise AdmissionRejected("llm_queue_full", 3.0)
+
+    assert list(bar_round.fan_out({"bart": full, "jb": lambda: "Tighter."})) == [("jb", "Tighter.")]
+    with pytest.raises(AdmissionRejected):
+        list(bar_round.fan_out({"bart": full, "jb": full}))
+
+
+def test_full_gate_does_not_block_the_event_loop(tmp_path, monkeypatch):
+    import asyncio
+
+    import httpx
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from src import api
+    from src.database.models import Base, Session, User, get_db
+    from src.router import Router
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'bar.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        user = User(anonymous_id="regular")
+        db.add(user)
+        db.flush()
+        session = Session(user_id=user.id)
+        db.add(session)
+        db.commit()
+        session_id = session.id
+
+    def get_test_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    gate = LLMGate(concurrency=2, queue=2, wait_seconds=5)
+    release = threading.Event()
+
+    def handle(self, msg, db_session=None, turn_context=None):
+        with gate.slot():
+            release.wait(5)
+        return "bart", "Another?"
+
+    monkeypatch.setattr(api, "llm_gate", gate)
+    monkeypatch.setattr(api, "user_limiter", UserRateLimiter(per_minute=600, burst=100))
+    monkeypatch.setattr(Router, "handle", handle)
+    monkeypatch.setitem(api.app.dependency_overrides, get_db, get_test_db)
+    monkeypatch.setitem(api.app.dependency_overrides, api.verify_credentials, lambda: "regular")
+
+    async def rush():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bar") as client:
+            sends = [asyncio.create_task(client.post("/message", json={"session_id": session_id, "content": "Pint?"}))
+                     for _ in range(5)]
+            deadline = time.monotonic() + 5
+            while (gate.in_flight < 2 or gate.waiting < 2) and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+
+            start = time.monotonic()
+            status = await client.get(f"/session/{session_id}/status")
+            elapsed = time.monotonic() - start
+            turned_away, _ = await asyncio.wait(sends, timeout=5, return_when=asyncio.FIRST_COMPLETED)
+            release.set()
+            return status, elapsed, turned_away, await asyncio.gather(*sends)
+
+    status, elapsed, turned_away, sends = asyncio.run(rush())
+
+    assert status.status_code == 200
+    assert elapsed < 1.0  # answered while four requests sat on the gate
+    assert [task.result().status_code for task in turned_away] == [429]
+    assert sorted(r.status_code for r in sends) == [200, 200, 200, 200, 429]
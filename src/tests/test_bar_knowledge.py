@@ -0,0 +1,36 @@
+from src.config.bar_knowledge import BarKnowledge, parse_sections
+
+LORE = """
+FOOD:
+  - Croque monsieur
+  - Popcorn with Tabasco
+
+THE TIDES:
+  Low tide brings seagulls closer.
+
+OPENING HOURS:
+  Open 24/7, closed on leap day.
+"""
+
+
+def test_parse_sections_splits_on_title_lines():
+    sections = parse_sections(LORE)
+
+    assert [s.title for s in sections] == ["FOOD", "THE TIDES", "OPENING HOURS"]
+    assert sections[1].text == "THE TIDES:\n  Low tide brings seagulls closer."
+
+
+def test_core_sections_are_never_scored():
+    knowledge = BarKnowledge(parse_sections(LORE), core_titles=["opening hours"])
+
+    assert knowledge.core_text().startswith("OPENING HOURS:")
+    assert all(s.title != "OPENING HOURS" for s in knowledge.match("leap day hours"))
+
+
+def test_keywords_find_sections_without_shared_words():
+    knowledge = BarKnowledge(parse_sections(LORE), core_titles=[],
+                             keywords={"food": "hungry eat"})
+
+    assert [s.title for s in knowledge.match("I'm starving", min_score=0.1)] == []
+    assert [s.title for s in knowledge.match("I'm hungry", min_score=0.1)] == ["FOOD"]
+    assert [s.title for s in knowledge.match("when are the tides?", min_score=0.1)] == ["THE TIDES"]
@@ -0,0 +1,172 @@
+import time
+
+import pytest
+
+from src import bar_round
+from src.history import MessageHistory
+from src.router import Router
+from src.schemas.message import Message
+
+
+def _slow(reply, seconds):
+    def call():
+        time.sleep(seconds)
+        return reply
+    return call
+
+
+def test_fan_out_waits_for_the_slowest_not_the_sum():
+    start = time.monotonic()
+    replies = list(bar_round.fan_out({
+        "bart": _slow("slow", 0.3),
+        "bernie": _slow("quick", 0.05),
+        "jb": _slow("middling", 0.15),
+    }))
+    elapsed = time.monotonic() - start
+    assert [agent for agent, _ in replies] == ["bernie", "jb", "bart"]  # as they finish
+    assert elapsed < 0.45
+
+
+def test_failed_agent_is_left_out():
+    def broken():
+        raise RuntimeError("API down")
+    assert list(bar_round.fan_out({"bart": broken, "jb": lambda: "Tighter."})) == [("jb", "Tighter.")]
+
+
+def test_format_round_uses_bar_order():
+    text = bar_round.format_round([("hermes", "Why?"), ("jb", "Clumsy."), ("bart", "Another?")])
+    assert text == "Bart: Another?\n\nJB: Clumsy.\n\nHermes: Why?"
+
+
+@pytest.mark.parametrize("text, is_round, question", [
+    ("bar: should I quit?", True, "should I quit?"),
+    ("  BAR:what now", True, "what now"),
+    ("bart: hi", False, "bart: hi"),
+    ("barely awake", False, "barely awake"),
+])
+def test_prefix(text, is_round, question):
+    assert bar_round.is_round(text) is is_round
+    assert bar_round.strip_prefix(text) == question
+
+
+class TestRouterRound:
+    def setup_method(self):
+        self.router = Router(history=MessageHistory())
+        self.router.save_state = lambda: None
+        self.caps = {}
+        for name in bar_round.ROUND_AGENTS:
+            agent = getattr(self.router, name)
+            agent.respond = self._fake(name)
+
+    def _fake(self, name):
+        def respond(text, max_tokens=None):
+            self.caps[name] = max_tokens
+            return f"{name} on {text}"
+        return respond
+
+    def test_every_regular_answers_with_its_round_cap(self):
+        replies = dict(self.router.ask_the_bar(Message("u1", "bar: should I move to Calais?")))
+        assert set(replies) == set(bar_round.ROUND_AGENTS)
+        assert replies["jb"] == "jb on should I move to Calais?"
+        assert self.caps == bar_round.ROUND_MAX_TOKENS
+
+    def test_muted_agents_sit_it_out(self):
+        self.router.mute_agent("jb")
+        replies = dict(self.router.ask_the_bar(Message("u1", "bar: thoughts?")))
+        assert "jb" not in replies and "bart" in replies
+
+    def test_crisis_goes_to_hermes_alone(self):
+        replies = list(self.router.ask_the_bar(Message("u1", "bar: I want to kill myself")))
+        assert [agent for agent, _ in replies] == ["hermes"]
+
+    def test_handle_joins_the_round(self):
+        agent, reply = self.router.handle(Message("u1", "bar: which stout?"))
+        assert agent == "bar"
+        assert reply.startswith("Bart: bart on which stout?")
+        assert "Hermes: hermes on which stout?" in reply
+
+    def test_round_says_whether_it_was_screened(self):
+        assert self.router.ask_the_bar(Message("u1", "bar: thoughts?")).screened is None
+        assert self.router.ask_the_bar(Message("u1", "bar: I want to kill myself")).screened == "hermes"
+
+
+def test_empty_round_still_says_something():
+    assert bar_round.format_round([]) == bar_round.NO_REPLIES
+
+
+@pytest.fixture
+def bar_api(tmp_path, monkeypatch):
+    """(client, session id, db factory, set_round) against a temp database; set_round fixes what the bar answers"""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from src import api
+    from src.database.models import Base, Session, User, get_db
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'bar.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        user = User(anonymous_id="regular")
+        db.add(user)
+        db.flush()
+        session = Session(user_id=user.id, current_agent="jb")
+        db.add(session)
+        db.commit()
+        session_id = session.id
+
+    def get_test_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    answer = {}
+    monkeypatch.setattr(Router, "ask_the_bar", lambda self, msg, db_session=None, turn_context=None: answer["round"]())
+    monkeypatch.setattr(api, "SessionLocal", factory)
+    monkeypatch.setitem(api.app.dependency_overrides, get_db, get_test_db)
+    monkeypatch.setitem(api.app.dependency_overrides, api.verify_credentials, lambda: "regular")
+    return TestClient(api.app), session_id, factory, lambda make: answer.update(round=make)
+
+
+def test_partial_round_keeps_its_label_and_the_current_agent(bar_api):
+    from src.database.models import Session
+
+    client, session_id, factory, set_round = bar_api
+    set_round(lambda: bar_round.Round([("bart", "Another?")]))  # the other three failed
+
+    body = client.post("/message", json={"session_id": session_id, "content": "bar: which stout?"}).json()
+
+    assert (body["agent"], body["message"]) == ("bar", "Bart: Another?")
+    with factory() as db:
+        assert db.get(Session, session_id).current_agent == "jb"
+
+
+def test_round_with_no_replies_falls_back(bar_api):
+    client, session_id, _, set_round = bar_api
+    set_round(lambda: bar_round.Round([]))
+
+    body = client.post("/message", json={"session_id": session_id, "content": "bar: anyone?"}).json()
+
+    assert (body["agent"], body["message"]) == ("bar", bar_round.NO_REPLIES)
+
+
+def test_streamed_round_turned_away_unstores_the_message(bar_api):
+    from src.admission import AdmissionRejected
+    from src.database.models import Message as DBMessage, Session
+
+    client, session_id, factory, set_round = bar_api
+
+    def full():
+        raise AdmissionRejected("llm_queue_full", 3.0)
+        yield
+    set_round(lambda: bar_round.Round(full()))
+
+    response = client.post("/message", json={"session_id": session_id, "content": "bar: anyone?", "stream": True})
+
+    assert "The bar's full" in response.text
+    with factory() as db:
+        assert db.query(DBMessage).filter(DBMessage.session_id == session_id).count() == 0
+        assert db.get(Session, session_id).message_count == 0
@@ -10,7 +10,7 @@ import time
 
 from src.agents import bukowski
 from src.history import MessageHistory
-from src.agents.bukowski_ledger import BukowskiLedger
+from src.agents.bukowski_ledger import BukowskiLedger, LedgerEntry
 
 def _make_history(user_id: str, texts: list[str]) -> MessageHistory:
     h = MessageHistory()
@@ -64,7 +64,8 @@ def test_bukowski_delete_last():
     user_id = "u1"
     history = MessageHistory()
     ledger = BukowskiLedger()
-    ledger.log("test entry")
+    ledger.log(LedgerEntry(user_id, "bukowski", "test entry", 1.0))
+    ledger.log(LedgerEntry("u2", "bukowski", "someone else's", 2.0))
 
     reply = bukowski.handle_bukowski(
         user_id=user_id,
@@ -74,7 +75,22 @@ def test_bukowski_delete_last():
         now=time.time())
 
     assert reply == "Last entry removed."
-    assert ledger.get_last() == []
+    assert ledger.get_last(1, user_id=user_id) == []
+    assert [e.text for e in ledger.get_last()] == ["someone else's"]
+
+def test_bukowski_only_shows_your_own_entries():
+    ledger = BukowskiLedger()
+    ledger.log(LedgerEntry("u1", "bukowski", "mine", 1.0))
+    ledger.log(LedgerEntry("u2", "bukowski", "theirs", 2.0))
+
+    reply = bukowski.handle_bukowski(
+        user_id="u1",
+        raw_text="bukowski: show last",
+        history=MessageHistory(),
+        ledger=ledger,
+        now=3.0)
+
+    assert reply == "Last entry:\nmine"
 
 def test_bukowski_help():
     user_id = "u1"
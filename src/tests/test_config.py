@@ -6,3 +6,23 @@ def test_config_loads_prompts():
     bart_prompt = cfg.get_prompt("bart")
     assert isinstance(bart_prompt, str)
     assert len(bart_prompt) > 0
+
+def test_blanca_prompt_has_no_bar_context_duplicate():
+    cfg = Config()
+    assert "BUILDING HISTORY:" not in cfg.get_prompt("blanca")
+
+def test_bar_knowledge_core_always_and_sections_on_demand():
+    knowledge = Config().get_bar_knowledge()
+
+    assert "IN THE BAR RIGHT NOW:" in knowledge.core_text()
+    assert knowledge.matched_text("hi") == ""
+    assert [s.title for s in knowledge.match("what's the beer of the week?")] == ["DRINKS"]
+    assert "Cottard" in knowledge.matched_text("seen Cottard lately?")
+    assert len(knowledge.core_text()) < len(knowledge.full_text()) / 3
+
+def test_config_is_a_shared_snapshot():
+    first, second = Config(), Config()
+
+    assert first.snapshot is second.snapshot
+    assert "bart" in second.get_router_descriptions()
+    assert "NEW USER" in first.get_onboarding_context(is_new_user=True)
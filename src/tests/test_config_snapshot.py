@@ -0,0 +1,70 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from src.config.snapshot import ConfigStore
+
+CONFIG_DIR = Path("src/config")
+
+
+@pytest.fixture
+def config_copy(tmp_path):
+    shutil.copytree(CONFIG_DIR / "prompts", tmp_path / "prompts")
+    shutil.copy(CONFIG_DIR / "bar_context.yaml", tmp_path / "bar_context.yaml")
+    shutil.copy(CONFIG_DIR / "onboarding_context.yaml", tmp_path / "onboarding_context.yaml")
+    return tmp_path
+
+
+def _store(root):
+    return ConfigStore(root / "prompts", root / "bar_context.yaml", root / "onboarding_context.yaml",
+                       poll_interval=0)
+
+
+def _touch_later(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_unchanged_files_keep_the_same_snapshot(config_copy):
+    store = _store(config_copy)
+    snapshot = store.current()
+
+    assert store.reload_if_changed() is False
+    assert store.current() is snapshot
+
+
+def test_edited_prompt_is_swapped_in(config_copy):
+    store = _store(config_copy)
+    old = store.current()
+    hermes = config_copy / "prompts" / "hermes.yaml"
+    hermes.write_text("hermes:\n  system_prompt: You are a new Hermes.\n", encoding="utf-8")
+    _touch_later(hermes)
+
+    new = store.current()
+
+    assert new is not old
+    assert new.prompts["hermes"]["system_prompt"] == "You are a new Hermes."
+    assert old.prompts["hermes"]["system_prompt"] != "You are a new Hermes."
+
+
+def test_invalid_edit_keeps_previous_snapshot(config_copy):
+    store = _store(config_copy)
+    old = store.current()
+    bart = config_copy / "prompts" / "bart.yaml"
+    bart.write_text("bart:\n  other: 1\n", encoding="utf-8")
+    _touch_later(bart)
+
+    assert store.reload_if_changed() is False
+    assert store.current() is old
+    assert store.current().prompts["bart"]["system_prompt"]
+
+
+def test_snapshot_is_read_only(config_copy):
+    snapshot = _store(config_copy).current()
+
+    with pytest.raises(TypeError):
+        snapshot.prompts["bart"] = {}
+    with pytest.raises(AttributeError):
+        snapshot.bar_context = ""
@@ -0,0 +1,102 @@
+from src.context_packer import ContextPacker, ContextSection, TokenEstimator, TRUNCATION_MARKER
+
+
+def test_estimator_counts_words_numbers_and_punctuation():
+    est = TokenEstimator()
+
+    assert est.estimate("") == 0
+    assert est.estimate("hello there") == 2
+    assert est.estimate("extraordinarily") == 3  # 15 chars / 6 per token
+    assert est.estimate("1913, Calais.") == 2 + 1 + 1 + 1
+
+
+def test_estimator_calibrates_to_real_usage():
+    est = TokenEstimator()
+    text = "the tide is out and the gulls are loud"
+
+    est.calibrate([(text, 2 * est.raw_count(text))])
+
+    assert est.scale == 2.0
+    assert est.estimate(text) == 2 * est.raw_count(text)
+
+
+def test_estimator_observe_moves_toward_measurement():
+    est = TokenEstimator()
+    text = "coffee again"
+
+    est.observe(text, actual_tokens=4, weight=0.5)
+
+    assert 1.0 < est.scale < 2.0
+
+
+def _turns(n):
+    return [f"User: message number {i}" for i in range(n)]
+
+
+def test_packer_keeps_newest_turns_when_over_budget():
+    packer = ContextPacker(budget_tokens=40)
+    sections = [
+        ContextSection(name="persona", order=2, priority=0, text="You are Bart."),
+        ContextSection(name="turns", order=1, priority=1, header="=== THIS VISIT ===",
+                       lines=_turns(20), reserve_last=2),
+    ]
+
+    packed = packer.pack(sections)
+
+    assert "message number 19" in packed.text
+    assert "message number 0\n" not in packed.text
+    assert TRUNCATION_MARKER in packed.text
+    assert packed.lines_dropped > 0
+    assert packed.text.endswith("You are Bart.")
+    assert packed.tokens_used <= packed.budget
+
+
+def test_reserved_sections_survive_tiny_budget():
+    packer = ContextPacker(budget_tokens=1)
+    sections = [
+        ContextSection(name="persona", order=3, priority=0, text="You are Bart."),
+        ContextSection(name="conditions", order=2, priority=0, text="Rain."),
+        ContextSection(name="turns", order=1, priority=2, lines=_turns(5), reserve_last=1),
+        ContextSection(name="lore", order=0, priority=3, text="Opened 1913."),
+    ]
+
+    packed = packer.pack(sections)
+
+    assert packed.included == ["turns", "conditions", "persona"]
+    assert "message number 4" in packed.text
+    assert "lore" in packed.dropped
+    assert packed.tokens_used > packed.budget  # reserved content is reported honestly
+
+
+def test_lower_priority_blocks_fill_leftover_budget():
+    packer = ContextPacker(budget_tokens=30)
+    sections = [
+        ContextSection(name="persona", order=9, priority=0, text="You are Bart."),
+        ContextSection(name="about", order=1, priority=1, text="Name: Ada"),
+        ContextSection(name="lore", order=0, priority=5, text="word " * 100),
+    ]
+
+    packed = packer.pack(sections)
+
+    assert packed.included == ["about", "persona"]
+    assert packed.dropped == ["lore"]
+
+
+def test_llm_calls_calibrate_the_shared_estimator(monkeypatch):
+    from types import SimpleNamespace
+
+    from src import context_packer
+    from src.agents.llm_client import LLMClient
+
+    monkeypatch.setattr(context_packer, "shared_estimator", TokenEstimator())
+    prompt, text = "You are Bart, behind the bar since 1987.", "Pint?"
+    raw = context_packer.shared_estimator.raw_count(f"{prompt}\n{text}")
+    usage = SimpleNamespace(input_tokens=raw, output_tokens=3, cache_read_input_tokens=raw, cache_creation_input_tokens=0)
+    client = LLMClient.__new__(LLMClient)
+    client.model = "test"
+    client.client = SimpleNamespace(messages=SimpleNamespace(
+        create=lambda **kwargs: SimpleNamespace(usage=usage, content=[SimpleNamespace(text="Another?")])))
+
+    assert client.call(prompt, text) == "Another?"
+    assert context_packer.shared_estimator.scale > 1.0  # twice the raw count, cached half included
+    assert ContextPacker().estimator is context_packer.shared_estimator
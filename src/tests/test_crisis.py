@@ -0,0 +1,69 @@
+import pytest
+
+from src.config.loader import Config
+from src.crisis import BORDERLINE, NONE, URGENT, CrisisScreen
+
+
+@pytest.fixture(scope="module")
+def screen():
+    return Config().get_crisis_screen()
+
+
+@pytest.mark.parametrize("text", [
+    "I want to kill myself",
+    "thinking about suicide",
+    "I've been self-harming again",
+    "I want to commit suicide",
+    "i feel suicidal tonight",
+    "I just want to end it all",
+    "going to hurt someone",
+    "I'm going to kill my landlord",
+    "honestly I’d be better off dead",
+])
+def test_urgent(screen, text):
+    assert screen.assess(text).level == URGENT
+
+
+@pytest.mark.parametrize("text", [
+    "I killed it at work today",
+    "this suicide mission of a project",
+    "hurt feelings",
+    "I could kill for a pint",
+    "dying to try the new stout",
+    "bored to death in here",
+    "Camus says the only serious question is whether life is worth living",
+])
+def test_idioms_and_chat_stay_clear(screen, text):
+    assert screen.assess(text).level == NONE
+
+
+@pytest.mark.parametrize("text", [
+    "I can't take it anymore",
+    "I cant take this anymore",
+])
+def test_borderline_goes_to_the_router(screen, text):
+    assert screen.assess(text).level == BORDERLINE
+
+
+@pytest.mark.parametrize("text", [
+    "There is but one truly serious philosophical problem, and that is suicide.",
+    "The Myth of Sisyphus is about suicide",
+    "I read about self-harm statistics for my thesis",
+])
+def test_talking_about_it_is_not_urgent(screen, text):
+    assert not screen.assess(text).urgent
+
+
+def test_negation_halves_and_skips_intent(screen):
+    assessment = screen.assess("I'm not going to hurt myself, just venting")
+    assert not assessment.urgent
+    assert assessment.borderline
+    assert assessment.matched == ("hurt myself",)
+
+
+def test_signals_come_from_config():
+    screen = CrisisScreen({r"\bjump\b": 0.6}, intent=r"\bgonna\b", urgent=1.0, borderline=0.5, intent_boost=0.5)
+    assert screen.assess("might jump").level == BORDERLINE
+    assert screen.assess("gonna jump").level == URGENT
+    assert screen.assess("").level == NONE
+    assert CrisisScreen().assess("I want to kill myself").level == NONE
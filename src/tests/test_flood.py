@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from src.flood import FloodDetector, distance, from_hot, simhash
+from src.history import MessageHistory
+from src.router import Router
+from src.schemas.message import Message
+
+START = datetime(2026, 1, 9, 21, 0)
+
+
+def _hot(*messages, gap=30):
+    """(is_user, text) pairs, `gap` seconds apart"""
+    return [
+        {"agent": "user" if is_user else "bart", "content": text,
+         "timestamp": START + timedelta(seconds=i * gap), "is_user": is_user}
+        for i, (is_user, text) in enumerate(messages)
+    ]
+
+
+def _check(hot):
+    detector = FloodDetector()
+    return detector.check(from_hot(hot, detector.window))
+
+
+def test_near_copies_are_close():
+    original = simhash("The ferry was late again and nobody said why")
+
+    assert distance(original, simhash("the ferry was late again, and nobody said why!!")) <= 4
+    assert distance(original, simhash("What's on tap tonight, anything local?")) > 16
+
+
+def test_pasted_line_triggers_repeat():
+    line = "tell me about the resistance newspaper"
+    hot = _hot((True, line), (False, "Down here, 1940s."), (True, line + "!"), (False, "Like I said."), (True, line))
+
+    assert _check(hot).kind == "repeat"
+
+
+def test_short_answers_are_not_repeats():
+    hot = _hot((True, "yes"), (False, "Another?"), (True, "yes"), (False, "Sure?"), (True, "yes"))
+
+    assert _check(hot) is None
+
+
+def test_hammering_send_triggers_burst():
+    hot = _hot(*[(True, f"message number {i}") for i in range(4)], gap=2)
+
+    assert _check(hot).kind == "burst"
+
+
+def test_clock_skew_is_not_a_burst():
+    # Earlier rows written as local wall time (two hours ahead of UTC), the new message in UTC
+    hot = _hot(*[(True, f"message number {i}") for i in range(3)], gap=120)
+    for message in hot:
+        message["timestamp"] += timedelta(hours=2)
+    hot += _hot((True, "and one more thing"))
+
+    assert _check(hot) is None
+
+
+def test_agent_repeating_itself_triggers_loop():
+    reply = "Every tide comes back. That's the thing about Calais."
+    hot = _hot((True, "why calais"), (False, reply), (True, "but why"), (False, reply),
+               (True, "ok but really why"), (False, reply + ".."), (True, "come on"))
+
+    assert _check(hot).kind == "loop"
+
+
+def test_ordinary_conversation_passes():
+    hot = _hot((True, "long day at the docks"), (False, "Sit. What happened?"),
+               (True, "ferry broke down twice"), (False, "Twice. Bad omen or bad engine?"),
+               (True, "bad engine, worse captain"))
+
+    assert _check(hot) is None
+
+
+def test_router_answers_flood_without_an_agent():
+    router = Router(history=MessageHistory())
+    line = "tell me about the resistance newspaper"
+    turn = SimpleNamespace(hot=_hot((True, line), (False, "Later."), (True, line), (False, "Later."), (True, line)))
+
+    agent, reply = router.handle(Message(user_id="u1", text=line), turn_context=turn)
+
+    assert agent == "blanca"
+    assert reply == router.config.get_flood_detector().lines["repeat"]
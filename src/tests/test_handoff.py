@@ -0,0 +1,43 @@
+import pytest
+
+from src.config.loader import Config
+from src.handoff import HandoffDetector
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return Config().get_handoff_detector()
+
+
+@pytest.mark.parametrize("reply, target", [
+    ("Let me get JB.", "jb"),
+    ("That's Bernie's territory, not mine.", "bernie"),
+    ("Have a word with Hermes, mate.", "hermes"),
+    ("Talk to J.B. about that.", "jb"),
+    ("Bernie’s area. Curly quote and all.", "bernie"),
+    ("Hermes should hear this.", "hermes"),
+])
+def test_handoff_phrases(detector, reply, target):
+    assert detector.detect(reply, "bart") == target
+
+
+@pytest.mark.parametrize("reply", [
+    "I pour drinks, mate. Don't know maritime law.",
+    "Don't ask Bernie about his ex.",
+    "Bernie was in earlier, left before the rain.",
+    "Talk to jbx",
+])
+def test_no_handoff(detector, reply):
+    assert detector.detect(reply, "bart") is None
+
+
+def test_never_hands_off_to_itself(detector):
+    assert detector.detect("Let me get Bart.", "bart") is None
+    assert detector.detect("Let me get Bart.", "bernie") == "bart"
+
+
+def test_phrases_and_names_come_from_config():
+    detector = HandoffDetector({"jb": ["jb", "the critic"]}, ["fetch {agent} now"])
+
+    assert detector.detect("Fetch the   critic now!", "bart") == "jb"
+    assert detector.detect("Let me get JB.", "bart") is None
@@ -0,0 +1,42 @@
+"""
+Startup budget: `import src.router` (what send.py, uvicorn workers and most
+tests pay first) must stay fast and must not drag in the heavy SDKs.
+Measured in a fresh interpreter with -X importtime.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+IMPORT_BUDGET_MS = float(os.getenv("LPBD_IMPORT_BUDGET_MS", "1000"))
+DEFERRED = ("anthropic", "sqlalchemy", "requests", "numpy")
+
+
+def _import_times(module):
+    """{module: cumulative microseconds} for everything importing `module` loads"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_router_import_within_budget():
+    times = _import_times("src.router")
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:10]
+
+    assert times["src.router"] / 1000 < IMPORT_BUDGET_MS, f"slowest imports (us): {slowest}"
+
+
+def test_heavy_dependencies_are_deferred():
+    times = _import_times("src.router")
+
+    assert not [name for name in times if name.split(".")[0] in DEFERRED]
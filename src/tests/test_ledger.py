@@ -1,6 +1,9 @@
 
 
+import json
+
 from src.agents.bukowski_ledger import BukowskiLedger, LedgerEntry
+from src.persistence import LedgerPersistence
 
 def test_bukowski_logs_and_returns_last_entries():
     ledger = BukowskiLedger()
@@ -21,3 +24,181 @@ def test_bukowski_handles_small_n():
 
     assert [e.text for e in ledger.get_last()] == ["only"]
     assert ledger.get_last() == []
+
+
+def test_ledger_is_keyed_by_user():
+    ledger = BukowskiLedger()
+    ledger.log(LedgerEntry("a", "bukowski", "a1", 1.0))
+    ledger.log(LedgerEntry("b", "bukowski", "b1", 2.0))
+    ledger.log(LedgerEntry("a", "bukowski", "a2", 3.0))
+
+    assert [e.text for e in ledger.get_last(1, user_id="b")] == ["b1"]
+    assert ledger.delete_last("b")
+    assert not ledger.delete_last("b")
+    assert [e.text for e in ledger.get_last(5, user_id="a")] == ["a1", "a2"]
+    assert [e.text for e in ledger.get_last(5)] == ["a1", "a2"]  # everyone, in log order
+
+
+def test_journal_replays_adds_and_tombstones(tmp_path):
+    store = LedgerPersistence(tmp_path / "ledger.jsonl", legacy_path=tmp_path / "ledger.json")
+    ledger = store.load()
+    ledger.log(LedgerEntry("a", "bukowski", "keep", 1.0))
+    ledger.log(LedgerEntry("a", "bukowski", "drop", 2.0))
+    ledger.delete_last("a")
+
+    lines = (tmp_path / "ledger.jsonl").read_text().splitlines()
+    assert [json.loads(line)["op"] for line in lines] == ["gen", "add", "add", "del"]
+
+    reloaded = LedgerPersistence(tmp_path / "ledger.jsonl", legacy_path=tmp_path / "ledger.json").load()
+    assert [e.text for e in reloaded.get_last(5, user_id="a")] == ["keep"]
+
+
+def test_journal_compacts_when_mostly_dead(tmp_path):
+    store = LedgerPersistence(tmp_path / "ledger.jsonl", legacy_path=tmp_path / "ledger.json")
+    store.COMPACT_MIN_DEAD = 4
+    ledger = store.load()
+    ledger.log(LedgerEntry("a", "bukowski", "survivor", 0.0))
+    for i in range(5):
+        ledger.log(LedgerEntry("a", "bukowski", f"note {i}", float(i)))
+        ledger.delete_last("a")
+
+    lines = (tmp_path / "ledger.jsonl").read_text().splitlines()
+    assert len(lines) < 11
+    reloaded = LedgerPersistence(tmp_path / "ledger.jsonl", legacy_path=tmp_path / "ledger.json").load()
+    assert [e.text for e in reloaded.get_last(5)] == ["survivor"]
+
+
+def test_draining_past_the_compaction_threshold(tmp_path):
+    store = LedgerPersistence(tmp_path / "ledger.jsonl", legacy_path=tmp_path / "ledger.json")
+    ledger = store.load()
+    for i in range(2 * store.COMPACT_MIN_DEAD):
+        ledger.log(LedgerEntry(f"u{i % 3}", "bukowski", f"note {i}", float(i)))
+
+    drained = ledger.get_last()
+
+    assert len(drained) == 2 * store.COMPACT_MIN_DEAD and len(ledger) == 0
+    assert len((tmp_path / "ledger.jsonl").read_text().splitlines()) == 1  # compacted to the header
+    assert len(LedgerPersistence(tmp_path / "ledger.jsonl", legacy_path=tmp_path / "ledger.json").load()) == 0
+
+
+def test_compaction_keeps_other_workers_appends(tmp_path):
+    paths = dict(filepath=tmp_path / "ledger.jsonl", legacy_path=tmp_path / "ledger.json")
+    store_a, store_b = LedgerPersistence(**paths), LedgerPersistence(**paths)
+    ledger_a, ledger_b = store_a.load(), store_b.load()
+    store_b.COMPACT_MIN_DEAD = 4
+
+    ledger_a.log(LedgerEntry("a", "bukowski", "from worker a", 1.0))
+    for i in range(5):
+        ledger_b.log(LedgerEntry("b", "bukowski", f"scratch {i}", float(i)))
+    ledger_b.get_last(user_id="b")  # worker b compacts; it never saw a's entry
+
+    reloaded = LedgerPersistence(**paths).load()
+    assert [e.text for e in reloaded.get_last()] == ["from worker a"]
+
+
+def test_legacy_json_is_imported(tmp_path):
+    legacy = tmp_path / "ledger.json"
+    legacy.write_text(json.dumps([{"user_id": "a", "agent": "bukowski", "text": "old", "ts": 1.0}]))
+
+    ledger = LedgerPersistence(tmp_path / "ledger.jsonl", legacy_path=legacy).load()
+
+    assert [e.text for e in ledger.get_last(1, user_id="a")] == ["old"]
+    assert (tmp_path / "ledger.jsonl").exists()
+
+
+def test_sync_returns_only_changes_since_the_cursor(tmp_path):
+    store = LedgerPersistence(tmp_path / "ledger.jsonl", legacy_path=tmp_path / "ledger.json")
+    ledger = store.load()
+    assert store.changes("a") == {"cursor": "0.0", "reset": True, "entries": [], "deleted": []}
+
+    ledger.log(LedgerEntry("a", "bukowski", "first", 1.0, entry_id="e1"))
+    ledger.log(LedgerEntry("b", "bukowski", "not yours", 2.0, entry_id="e2"))
+    full = store.changes("a")
+    assert full["reset"] and full["entries"] == [["e1", 1.0, "bukowski", "first"]]
+    assert full["cursor"] == store.cursor()
+
+    assert store.changes("a", full["cursor"])["entries"] == []  # nothing new
+
+    ledger.log(LedgerEntry("a", "bukowski", "second", 3.0, entry_id="e3"))
+    ledger.delete_last("a")
+    ledger.delete_last("a")
+    delta = store.changes("a", full["cursor"])
+    assert not delta["reset"]
+    assert delta["entries"] == [] and delta["deleted"] == ["e1"]  # e3 came and went in between
+    assert int(delta["cursor"].split(".")[1]) > int(full["cursor"].split(".")[1])
+
+
+def test_sync_resets_after_compaction(tmp_path):
+    store = LedgerPersistence(tmp_path / "ledger.jsonl", legacy_path=tmp_path / "ledger.json")
+    ledger = store.load()
+    ledger.log(LedgerEntry("a", "bukowski", "kept", 1.0, entry_id="e1"))
+    cursor = store.changes("a")["cursor"]
+
+    store.compact()  # new generation
+
+    after = store.changes("a", cursor)
+    assert after["reset"] and after["entries"] == [["e1", 1.0, "bukowski", "kept"]]
+
+
+def test_user_tag_moves_only_with_that_users_entries(tmp_path):
+    store = LedgerPersistence(tmp_path / "ledger.jsonl", legacy_path=tmp_path / "ledger.json")
+    ledger = store.load()
+    assert store.user_tag("a") == "0.0"
+
+    ledger.log(LedgerEntry("a", "bukowski", "mine", 1.0))
+    tag = store.user_tag("a")
+    ledger.log(LedgerEntry("b", "bukowski", "someone else's", 2.0))
+    assert store.user_tag("a") == tag
+
+    ledger.delete_last("a")
+    assert store.user_tag("a") != tag
+
+    tag = store.user_tag("b")
+    store.compact()
+    assert store.user_tag("b").split(".")[0] != tag.split(".")[0]  # new generation
+
+
+def test_sync_endpoint_checks_the_user_before_the_etag(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from src import api
+    from src.database.models import Base, User, get_db
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'bar.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add_all([User(id="a", anonymous_id="anon-a"), User(id="b", anonymous_id="anon-b")])
+        db.commit()
+
+    def get_test_db():
+        with factory() as db:
+            yield db
+
+    paths = dict(filepath=tmp_path / "ledger.jsonl", legacy_path=tmp_path / "ledger.json")
+    monkeypatch.setattr(api, "LedgerPersistence", lambda: LedgerPersistence(**paths))
+    monkeypatch.setitem(api.app.dependency_overrides, get_db, get_test_db)
+    monkeypatch.setitem(api.app.dependency_overrides, api.verify_credentials, lambda: "regular")
+    ledger = LedgerPersistence(**paths).load()
+    ledger.log(LedgerEntry("a", "bukowski", "first", 1.0, entry_id="e1"))
+    client = TestClient(api.app)
+
+    first = client.get("/bukowski/sync", params={"anonymous_id": "anon-a"})
+    etag = first.headers["ETag"]
+    assert first.json()["entries"] == [["e1", 1.0, "bukowski", "first"]]
+
+    ledger.log(LedgerEntry("b", "bukowski", "not a's", 2.0))
+    again = client.get("/bukowski/sync", params={"anonymous_id": "anon-a", "since": first.json()["cursor"]},
+                       headers={"If-None-Match": etag})
+    assert again.status_code == 304  # b's write doesn't touch a's tag
+
+    stranger = client.get("/bukowski/sync", params={"anonymous_id": "nobody"}, headers={"If-None-Match": etag})
+    assert stranger.status_code == 404
+
+    ledger.log(LedgerEntry("a", "bukowski", "second", 3.0, entry_id="e3"))
+    changed = client.get("/bukowski/sync", params={"anonymous_id": "anon-a", "since": first.json()["cursor"]},
+                         headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.json()["entries"] == [["e3", 3.0, "bukowski", "second"]]
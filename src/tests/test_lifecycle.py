@@ -0,0 +1,202 @@
+import pytest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base, User, Session as SessionModel, Message, MessageArchive, ColdContext, migrate
+from src.database import memory_manager
+from src.database.lifecycle import SessionReaper
+from src.summarizer import extractive_digest
+
+
+class VirtualClock:
+    """Deterministic clock for driving the reaper through time."""
+
+    def __init__(self, start: datetime) -> None:
+        self.now = start
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, **kwargs) -> None:
+        self.now += timedelta(**kwargs)
+
+
+START = datetime(2025, 1, 10, 22, 0)
+
+
+@pytest.fixture
+def factory(monkeypatch):
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)  # extractive digests only
+    memory_manager._cold_cache.clear()
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock(START)
+
+
+def _open_session(factory, session_id, user_id="u1", messages=3, last_activity=START):
+    db = factory()
+    if not db.get(User, user_id):
+        db.add(User(id=user_id, anonymous_id=f"anon-{user_id}"))
+    db.add(SessionModel(id=session_id, user_id=user_id, status="active",
+                        started_at=last_activity, last_activity_at=last_activity))
+    for i in range(messages):
+        db.add(Message(session_id=session_id, agent="user", content=f"{session_id} #{i}",
+                       is_user_message=1, timestamp=last_activity + timedelta(seconds=i)))
+    db.commit()
+    db.close()
+
+
+def _status(factory, session_id):
+    db = factory()
+    try:
+        return db.get(SessionModel, session_id).status
+    finally:
+        db.close()
+
+
+def test_idle_session_gets_warning_then_kicked(factory, clock):
+    _open_session(factory, "s1")
+    reaper = SessionReaper(factory, clock=clock)
+
+    clock.advance(minutes=10)
+    assert reaper.run_once() == {"kicked": 0, "warned": 0, "archived": 0}
+    assert _status(factory, "s1") == "active"
+
+    clock.advance(minutes=6)
+    assert reaper.run_once()["warned"] == 1
+    assert _status(factory, "s1") == "warning_15min"
+
+    clock.advance(minutes=5)
+    result = reaper.run_once()
+    assert result["kicked"] == 1
+    assert result["archived"] == 1
+    assert _status(factory, "s1") == "kicked"
+
+
+def test_kicked_session_lands_in_cold_storage(factory, clock):
+    _open_session(factory, "s1", messages=15)
+    reaper = SessionReaper(factory, clock=clock, summarize=extractive_digest)
+
+    clock.advance(minutes=21)
+    reaper.run_once()
+
+    db = factory()
+    session = db.get(SessionModel, "s1")
+    assert session.ended_at == clock.now
+    assert session.archived_at is not None
+    assert session.digest
+    assert db.query(MessageArchive).filter_by(session_id="s1").count() == 13
+    assert session.digest in db.get(ColdContext, "u1").content
+    db.close()
+
+
+def test_recent_activity_keeps_session_active(factory, clock):
+    _open_session(factory, "s1", last_activity=START + timedelta(minutes=18))
+    reaper = SessionReaper(factory, clock=clock)
+
+    clock.advance(minutes=20)
+    reaper.run_once()
+
+    assert _status(factory, "s1") == "active"
+
+
+def test_archiving_runs_in_batches_and_only_once(factory, clock):
+    for i in range(5):
+        _open_session(factory, f"s{i}", user_id=f"u{i % 2}")
+    reaper = SessionReaper(factory, clock=clock, batch_size=2)
+
+    clock.advance(minutes=30)
+    first = reaper.run_once()
+    second = reaper.run_once()
+
+    assert first == {"kicked": 5, "warned": 0, "archived": 5}
+    assert second["archived"] == 0
+    db = factory()
+    assert db.query(MessageArchive).count() == 5 * 3 * 2  # 3 messages as opening + closing
+    db.close()
+
+
+def test_ended_sessions_are_archived(factory, clock):
+    _open_session(factory, "s1")
+    db = factory()
+    session = db.get(SessionModel, "s1")
+    session.status = "ended"
+    session.ended_at = START
+    db.commit()
+    db.close()
+
+    assert SessionReaper(factory, clock=clock).run_once()["archived"] == 1
+
+
+# Tables as first deployed (baseline models), before the reaper, digests and summaries
+_BASELINE_SCHEMA = [
+    "CREATE TABLE users (id VARCHAR PRIMARY KEY, anonymous_id VARCHAR NOT NULL UNIQUE, created_at TIMESTAMP, "
+    "invite_code VARCHAR, onboarding_context JSON)",
+    "CREATE TABLE sessions (id VARCHAR PRIMARY KEY, user_id VARCHAR NOT NULL REFERENCES users (id), "
+    "started_at TIMESTAMP, ended_at TIMESTAMP, status VARCHAR, crisis_flag_date VARCHAR, weather VARCHAR, "
+    "message_count INTEGER, pending_handoff VARCHAR, current_agent VARCHAR, onboarding_context JSON)",
+    "CREATE TABLE messages (id VARCHAR PRIMARY KEY, session_id VARCHAR NOT NULL REFERENCES sessions (id), "
+    "agent VARCHAR NOT NULL, content VARCHAR NOT NULL, timestamp TIMESTAMP, is_user_message INTEGER)",
+    "CREATE TABLE message_archive (id VARCHAR PRIMARY KEY, session_id VARCHAR NOT NULL REFERENCES sessions (id), "
+    "user_id VARCHAR NOT NULL REFERENCES users (id), agent VARCHAR NOT NULL, content VARCHAR NOT NULL, "
+    "timestamp TIMESTAMP NOT NULL, is_user_message INTEGER, message_position VARCHAR NOT NULL, "
+    "position_index INTEGER NOT NULL, archived_at TIMESTAMP)",
+]
+
+
+def test_migrate_brings_a_baseline_database_up_to_date(clock):
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        for ddl in _BASELINE_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO users (id, anonymous_id) VALUES ('u1', 'anon-u1')"))
+        conn.execute(text(
+            "INSERT INTO sessions (id, user_id, started_at, ended_at, status, message_count) VALUES "
+            "('s1', 'u1', '2025-01-10 22:00:00', NULL, 'active', 1), "
+            "('s2', 'u1', '2025-01-10 20:00:00', NULL, 'active', 0), "
+            "('s3', 'u1', '2025-01-08 20:00:00', '2025-01-08 21:00:00', 'ended', 1), "
+            "('s4', 'u1', '2025-01-09 20:00:00', '2025-01-09 21:00:00', 'ended', 1)"))
+        conn.execute(text(
+            "INSERT INTO messages (id, session_id, agent, content, timestamp, is_user_message) VALUES "
+            "('m1', 's1', 'user', 'Pint.', '2025-01-10 22:30:00', 1), "
+            "('m3', 's3', 'user', 'Old news.', '2025-01-08 20:10:00', 1), "
+            "('m4', 's4', 'user', 'Never archived.', '2025-01-09 20:10:00', 1)"))
+        # s3 was archived by the old code; s4 ended but never was
+        conn.execute(text(
+            "INSERT INTO message_archive VALUES ('a3', 's3', 'u1', 'user', 'Old news.', '2025-01-08 20:10:00', "
+            "1, 'opening', 1, '2025-01-08 21:05:00')"))
+
+    Base.metadata.create_all(engine)  # what init_db does first: only the missing tables
+    migrate(engine)
+    migrate(engine)  # idempotent
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("sessions")}
+    assert {"last_activity_at", "archived_at", "digest", "running_summary", "summary_upto"} <= columns
+    assert {"ix_sessions_status_last_activity", "ix_sessions_status_archived"} <= {
+        index["name"] for index in inspector.get_indexes("sessions")}
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT id, last_activity_at, archived_at, summary_upto FROM sessions ORDER BY id")).all()
+    assert [tuple(row) for row in rows] == [
+        ("s1", "2025-01-10 22:30:00", None, 0),  # latest message
+        ("s2", "2025-01-10 20:00:00", None, 0),  # no messages: started_at
+        ("s3", "2025-01-08 20:10:00", "2025-01-08 21:05:00", 0),  # already archived
+        ("s4", "2025-01-09 20:10:00", None, 0),
+    ]
+
+    # The reaper's scans run on the migrated table and only archive what the old code hadn't
+    factory = sessionmaker(bind=engine)
+    swept = SessionReaper(factory, clock=clock, summarize=extractive_digest).run_once()
+    assert swept == {"kicked": 1, "warned": 0, "archived": 2}  # s2 idle, kicked; s2 and s4 archived
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM message_archive WHERE session_id = 's3'")).scalar() == 1
@@ -0,0 +1,73 @@
+import json
+import logging
+import queue
+
+from src.logging_setup import (
+    DroppingQueueHandler,
+    JSONFormatter,
+    SizeAndTimeRotatingFileHandler,
+    TurnRecordFilter,
+)
+
+
+def _record(msg="Turn completed", level=logging.INFO, **extra):
+    record = logging.LogRecord("lpbd", level, __file__, 1, msg, (), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_turn_payload_is_truncated():
+    record = _record(user_text="x" * 50, reply_text="short")
+
+    assert TurnRecordFilter(sample_rate=1.0, text_limit=10).filter(record)
+    assert record.user_text == "xxxxxxxxxx... (+40 chars)"
+    assert record.reply_text == "short"
+
+
+def test_turn_records_are_sampled():
+    turn_filter = TurnRecordFilter(sample_rate=0.25, text_limit=0, rng=lambda: 0.5)
+
+    assert turn_filter.filter(_record()) is False
+    assert turn_filter.filter(_record("Session started")) is True
+
+
+def test_warnings_are_never_sampled():
+    turn_filter = TurnRecordFilter(sample_rate=0.0, text_limit=0, rng=lambda: 0.99)
+
+    assert turn_filter.filter(_record("Turn completed with fallback", level=logging.WARNING))
+
+
+def test_json_includes_extra_fields():
+    data = json.loads(JSONFormatter().format(_record(agent="bart", latency_ms=12)))
+
+    assert data["message"] == "Turn completed"
+    assert data["agent"] == "bart"
+    assert data["latency_ms"] == 12
+    assert "levelno" not in data
+
+
+def test_file_rolls_over_after_interval(tmp_path):
+    now = [1000.0]
+    log_file = tmp_path / "lpbd.log"
+    handler = SizeAndTimeRotatingFileHandler(str(log_file), max_bytes=0, backup_count=2,
+                                             interval=60, clock=lambda: now[0])
+    handler.setFormatter(JSONFormatter())
+
+    handler.emit(_record("first"))
+    now[0] += 61
+    handler.emit(_record("second"))
+    handler.close()
+
+    assert "first" in (tmp_path / "lpbd.log.1").read_text()
+    assert "second" in log_file.read_text()
+    assert "first" not in log_file.read_text()
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(1))
+
+    handler.emit(_record("one"))
+    handler.emit(_record("two"))
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
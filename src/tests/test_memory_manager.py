@@ -0,0 +1,309 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Base, User, Session as SessionModel, Message, MessageArchive
+from src.database import memory_manager
+from src.database.memory_manager import MemoryManager
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """In-memory SQLite database with the LPBD schema."""
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)  # extractive digests only
+    memory_manager._cold_cache.clear()
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _count_statements(db):
+    statements = []
+
+    def before_execute(conn, cursor, statement, params, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", before_execute)
+    return statements
+
+
+def _seed(db):
+    start = datetime(2025, 1, 1, 20, 0)
+    user = User(id="u1", anonymous_id="anon-1", onboarding_context={"name": "Ada"})
+    db.add(user)
+
+    old = SessionModel(id="s-old", user_id="u1", status="ended",
+                       started_at=start, ended_at=start + timedelta(hours=1))
+    current = SessionModel(id="s-now", user_id="u1", status="active",
+                           started_at=start + timedelta(days=1))
+    db.add_all([old, current])
+
+    db.add_all([
+        MessageArchive(session_id="s-old", user_id="u1", agent="bart", content="closing line",
+                       timestamp=start + timedelta(minutes=50), message_position="closing",
+                       position_index=1),
+        MessageArchive(session_id="s-old", user_id="u1", agent="user", content="opening line",
+                       timestamp=start, is_user_message=1, message_position="opening",
+                       position_index=1),
+    ])
+
+    for i in range(3):
+        db.add(Message(session_id="s-now", agent="user" if i % 2 == 0 else "bart",
+                       content=f"hot {i}", is_user_message=1 if i % 2 == 0 else 0,
+                       timestamp=start + timedelta(days=1, minutes=i)))
+    db.commit()
+
+
+def test_turn_context_loads_everything(db):
+    _seed(db)
+    mgr = MemoryManager(db)
+    mgr.refresh_cold_context("u1")
+    db.commit()
+
+    turn = mgr.load_turn_context("s-now")
+
+    assert turn.session.id == "s-now"
+    assert turn.user.id == "u1"
+    assert turn.onboarding == {"name": "Ada"}
+    assert turn.cold_version == 1
+    assert turn.cold_text.index("Patron: opening line") < turn.cold_text.index("Bart: closing line")
+    assert [m["content"] for m in turn.hot] == ["hot 0", "hot 1", "hot 2"]
+
+
+def test_turn_context_is_one_round_trip(db):
+    _seed(db)
+    MemoryManager(db).refresh_cold_context("u1")
+    db.commit()
+    MemoryManager(db).get_cold_context("u1")  # warm the in-process copy, as archive_sessions does after commit
+    db.expire_all()
+    statements = _count_statements(db)
+
+    turn = MemoryManager(db).load_turn_context("s-now")
+
+    assert len(statements) == 1
+    assert "opening line" in turn.cold_text
+
+
+def test_cold_snapshot_reread_when_version_moves(db):
+    _seed(db)
+    mgr = MemoryManager(db)
+    mgr.refresh_cold_context("u1")
+    db.commit()
+    memory_manager._cold_cache["u1"] = (1, "stale copy")
+    assert mgr.load_turn_context("s-now").cold_text == "stale copy"
+
+    memory_manager._cold_cache.clear()
+    statements = _count_statements(db)
+    turn = mgr.load_turn_context("s-now")
+
+    assert len(statements) == 2
+    assert "opening line" in turn.cold_text
+
+
+def test_archive_session_rebuilds_cold_snapshot(db):
+    _seed(db)
+    mgr = MemoryManager(db)
+    mgr.refresh_cold_context("u1")
+    db.commit()
+
+    db.get(SessionModel, "s-now").status = "ended"
+    db.get(SessionModel, "s-now").ended_at = datetime(2025, 1, 3)
+    mgr.archive_session("s-now")
+
+    turn = mgr.load_turn_context("s-now")
+    assert turn.cold_version == 2
+    assert turn.cold_text.index("opening line") < turn.cold_text.index("hot")
+
+
+def test_turn_context_without_history(db):
+    db.add(User(id="u2", anonymous_id="anon-2"))
+    db.add(SessionModel(id="s-empty", user_id="u2", status="active"))
+    db.commit()
+
+    turn = MemoryManager(db).load_turn_context("s-empty")
+
+    assert turn.session.id == "s-empty"
+    assert turn.onboarding is None
+    assert turn.cold_text == ""
+    assert turn.hot == []
+
+
+def test_turn_context_missing_session(db):
+    assert MemoryManager(db).load_turn_context("nope") is None
+
+
+def test_append_hot_extends_history(db):
+    _seed(db)
+    turn = MemoryManager(db).load_turn_context("s-now")
+
+    turn.append_hot("user", "fresh", datetime(2025, 1, 2), is_user=True)
+
+    assert turn.hot[-1]["content"] == "fresh"
+    assert turn.hot[-1]["is_user"] is True
+
+    turn.append_hot("user", "aware", datetime(2025, 1, 2, 12, tzinfo=timezone(timedelta(hours=2))), is_user=True)
+    assert turn.hot[-1]["timestamp"] == datetime(2025, 1, 2, 10)  # naive UTC, like the loaded rows
+
+
+def _long_session(db, n):
+    start = datetime(2025, 1, 1, 20, 0)
+    db.add(User(id="u3", anonymous_id="anon-3"))
+    db.add(SessionModel(id="s-long", user_id="u3", status="active"))
+    for i in range(n):
+        db.add(Message(session_id="s-long", agent="user", content=f"m{i}", is_user_message=1,
+                       timestamp=start + timedelta(minutes=i)))
+    db.commit()
+
+
+def test_hot_storage_is_windowed_in_sql(db):
+    _long_session(db, 40)
+
+    hot = MemoryManager(db).get_hot_storage("s-long", head=3, tail=10)
+
+    assert [m["content"] for m in hot] == ["m0", "m1", "m2"] + [f"m{i}" for i in range(30, 40)]
+    assert hot[3]["omitted_before"] == 27
+
+
+def test_hot_storage_short_session_has_no_gap(db):
+    _long_session(db, 5)
+
+    hot = MemoryManager(db).get_hot_storage("s-long", head=3, tail=10)
+
+    assert [m["content"] for m in hot] == [f"m{i}" for i in range(5)]
+    assert not any("omitted_before" in m for m in hot)
+
+
+def test_hot_storage_unwindowed(db):
+    _long_session(db, 20)
+
+    assert len(MemoryManager(db).get_hot_storage("s-long", head=None, tail=None)) == 20
+    assert len(MemoryManager(db).get_hot_storage("s-long", limit=4)) == 4
+
+
+def test_turn_context_hot_window(db):
+    _long_session(db, 25)
+    mgr = MemoryManager(db)
+
+    turn = mgr.load_turn_context("s-long", hot_head=2, hot_tail=3)
+
+    assert [m["content"] for m in turn.hot] == ["m0", "m1", "m22", "m23", "m24"]
+    assert "(... 20 messages omitted ...)" in mgr.format_for_agent_context(turn.hot)
+
+
+def test_archive_keeps_first_three_and_last_ten(db):
+    _long_session(db, 40)
+    db.get(SessionModel, "s-long").status = "ended"
+    db.commit()
+
+    MemoryManager(db).archive_session("s-long")
+
+    rows = db.query(MessageArchive).filter_by(session_id="s-long")\
+        .order_by(MessageArchive.message_position.desc(), MessageArchive.position_index).all()
+    assert [(r.message_position, r.position_index, r.content) for r in rows[:3]] == \
+        [("opening", 1, "m0"), ("opening", 2, "m1"), ("opening", 3, "m2")]
+    assert [(r.position_index, r.content) for r in rows[3:]] == \
+        [(i + 1, f"m{30 + i}") for i in range(10)]
+    assert all(r.user_id == "u3" for r in rows)
+    assert db.get(SessionModel, "s-long").archived_at is not None
+
+
+def test_archive_many_sessions_in_one_insert(db):
+    _seed(db)
+    _long_session(db, 12)
+    statements = _count_statements(db)
+
+    MemoryManager(db).archive_sessions(["s-now", "s-long"])
+
+    inserts = [s for s in statements if "INSERT INTO message_archive" in s]
+    assert len(inserts) == 1
+    assert db.query(MessageArchive).filter_by(session_id="s-now").count() == 6
+    assert db.query(MessageArchive).filter_by(session_id="s-long").count() == 13
+
+
+def test_archive_stores_digest_and_cold_block_uses_it(db):
+    _seed(db)
+    db.get(SessionModel, "s-now").status = "ended"
+    db.get(SessionModel, "s-now").ended_at = datetime(2025, 1, 3)
+    db.commit()
+
+    MemoryManager(db, summarize=lambda messages: f"digest of {len(messages)}").archive_session("s-now")
+
+    assert db.get(SessionModel, "s-now").digest == "digest of 3"
+    cold_text = MemoryManager(db).load_turn_context("s-now").cold_text
+    assert "digest of 3" in cold_text
+    assert "hot 1" not in cold_text
+
+
+def test_archive_summarizes_after_commit(db):
+    _seed(db)
+    db.get(SessionModel, "s-now").status = "ended"
+    db.get(SessionModel, "s-now").ended_at = datetime(2025, 1, 3)
+    db.commit()
+    in_transaction = []
+
+    def summarize(messages):
+        in_transaction.append(db.in_transaction())
+        return "the LLM's digest"
+
+    MemoryManager(db, summarize=summarize).archive_session("s-now")
+
+    assert in_transaction == [False]  # session rows no longer locked
+    assert db.get(SessionModel, "s-now").digest == "the LLM's digest"
+    assert "the LLM's digest" in MemoryManager(db).load_turn_context("s-now").cold_text
+
+
+def test_legacy_archived_session_gets_backfilled_digest(db):
+    _seed(db)
+
+    MemoryManager(db).refresh_cold_context("u1")
+    db.commit()
+
+    assert "opening line" in db.get(SessionModel, "s-old").digest
+
+
+def _fold_counting(summary, messages):
+    return f"{summary}|{len(messages)}" if summary else str(len(messages))
+
+
+def test_running_summary_waits_for_threshold(db):
+    _long_session(db, memory_manager.ROLLING_SUMMARY_AFTER - 1)
+
+    assert MemoryManager(db, fold=_fold_counting).update_running_summary("s-long") is False
+    assert db.get(SessionModel, "s-long").summary_upto == 0
+
+
+def test_running_summary_folds_older_messages(db):
+    _long_session(db, 20)
+    mgr = MemoryManager(db, fold=_fold_counting)
+
+    assert mgr.update_running_summary("s-long") is True
+    assert mgr.update_running_summary("s-long") is False  # nothing new aged out
+
+    session = db.get(SessionModel, "s-long")
+    assert session.summary_upto == 20 - memory_manager.ROLLING_KEEP_RECENT
+    assert session.running_summary == "14"
+
+    turn = mgr.load_turn_context("s-long")
+    assert turn.running_summary == "14"
+    assert [m["content"] for m in turn.hot] == [f"m{i}" for i in range(14, 20)]
+    assert not any("omitted_before" in m for m in turn.hot)
+
+
+def test_running_summary_is_incremental(db):
+    _long_session(db, 20)
+    mgr = MemoryManager(db, fold=_fold_counting)
+    mgr.update_running_summary("s-long")
+
+    start = datetime(2025, 1, 1, 23, 0)
+    for i in range(4):
+        db.add(Message(session_id="s-long", agent="user", content=f"late {i}", is_user_message=1,
+                       timestamp=start + timedelta(minutes=i)))
+    db.commit()
+
+    assert mgr.update_running_summary("s-long") is True
+    assert db.get(SessionModel, "s-long").running_summary == "14|4"
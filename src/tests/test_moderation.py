@@ -0,0 +1,85 @@
+import pytest
+
+from src.config.loader import Config
+from src.moderation import AhoCorasick, Moderator, Severity, normalize
+
+
+@pytest.fixture(scope="module")
+def moderator():
+    return Config().get_moderator()
+
+
+def test_automaton_finds_overlapping_patterns():
+    matcher = AhoCorasick([("he", 1), ("she", 2), ("hers", 3), ("his", 4)])
+
+    found = sorted((start, end, payload) for start, end, payload in matcher.finditer("ushers"))
+
+    assert found == [(1, 4, 2), (2, 4, 1), (2, 6, 3)]
+
+
+def test_normalize_folds_leetspeak_and_held_letters():
+    assert normalize("Fuuuuck  Y0U!!") == ["fuck", "you"]
+    assert normalize("I'll  KILL you...") == ["i", "l", "kil", "you"]
+
+
+def test_normalize_leaves_numbers_alone():
+    assert normalize("Table 12 at 7:30, room 101") == ["table", "12", "at", "7", "30", "rom", "101"]
+
+
+@pytest.mark.parametrize("text, category, severity", [
+    ("you r3tard", "slur", Severity.HIGH),
+    ("shut it, you dirty chink", "slur", Severity.HIGH),
+    ("what a retard", "slur", Severity.LOW),  # ambiguous alone: logged, not blocked
+    ("I'LL kill you, old man", "threat", Severity.HIGH),
+    ("I'll kill you at the docks", "threat", Severity.HIGH),
+    ("go die", "threat", Severity.HIGH),
+    ("why don't you just go die", "threat", Severity.HIGH),
+    ("you should drop dead, bart", "threat", Severity.HIGH),
+    ("my phone is about to go die", "threat", Severity.LOW),  # idiom: logged, not blocked
+    ("fuuuck y0u bart", "abuse", Severity.MEDIUM),
+    ("   ", "empty", Severity.MEDIUM),
+    ("WHY IS EVERYTHING BROKEN", "shouting", Severity.MEDIUM),
+    ("nooooooooooooooooo", "repeated_chars", Severity.MEDIUM),
+    ("!!!!!!!!!!!!!!!!!!!!", "symbols", Severity.MEDIUM),
+    ("beer " * 10, "repeated_words", Severity.MEDIUM),
+    ("x" * 20 + " " + "word " * 100, "too_long", Severity.MEDIUM),
+    ("shit day at the docks", "profanity", Severity.LOW),
+])
+def test_flagged(moderator, text, category, severity):
+    result = moderator.check(text)
+
+    assert (result.category, result.severity) == (category, severity)
+    assert result.blocked == (severity >= Severity.MEDIUM)
+
+
+@pytest.mark.parametrize("text", [
+    "spicy food tonight?",
+    "I killed it at work today",
+    "fancy a fag outside?",
+    "OK",
+    "I want to kill myself",  # Hermes' job, not a warning
+    "every man has a chink in his armor",
+    "the chink of glasses at closing time",
+    "kept the place spic and span",
+    "add yeast to retard the fermentation",
+    "my tranny's slipping, the old Peugeot needs a garage",
+    "table 5 at 7:30, bill comes to 45",
+    "I'm going to go die on that hill",
+    "I'll kill you at chess, old man",
+    "she walked in drop dead gorgeous",
+    "lol " + "\U0001F602" * 14,
+])
+def test_passes(moderator, text):
+    assert not moderator.check(text).blocked
+
+
+def test_worst_finding_wins():
+    moderator = Moderator({
+        "mild": {"severity": "low", "terms": ["drat"]},
+        "bad": {"severity": "high", "warning": "Out.", "terms": ["blast it"]},
+    })
+
+    result = moderator.check("drat, blast it all")
+
+    assert result.warning == "Out."
+    assert result.matched == "blast it"
@@ -0,0 +1,134 @@
+import os
+import threading
+
+from src.context_packer import ContextPacker, ContextSection
+from src.prompt_registry import PromptRegistry, main, prompt_id, record_safely
+
+SECTIONS = [
+    ("bar_core", "=== BAR KNOWLEDGE ===\nCalais, by the ferry port."),
+    ("current_visit", "=== THIS VISIT ===\nPatron: evening"),
+    ("persona", "You are Bart, the bartender."),
+]
+
+
+def _files(root):
+    return sorted(p.relative_to(root) for p in root.rglob("*") if p.is_file())
+
+
+def test_prompt_round_trips(tmp_path):
+    registry = PromptRegistry(tmp_path)
+    fingerprint = registry.record(SECTIONS)
+    registry.flush()
+
+    full = "\n\n".join(text for _, text in SECTIONS)
+    assert fingerprint.prompt_id == prompt_id(full)
+    assert registry.reconstruct(fingerprint.prompt_id) == full
+    assert [s["chars"] for s in fingerprint.segments] == [len(text) for _, text in SECTIONS]
+
+
+def test_unchanged_segments_are_stored_once(tmp_path):
+    registry = PromptRegistry(tmp_path)
+    registry.record(SECTIONS)
+    registry.flush()
+    before = _files(tmp_path)
+
+    next_turn = SECTIONS[:1] + [("current_visit", "=== THIS VISIT ===\nPatron: evening\nBart: Evening.")] + SECTIONS[2:]
+    registry = PromptRegistry(tmp_path)  # fresh process, same directory
+    registry.record(next_turn)
+    registry.flush()
+    added = set(_files(tmp_path)) - set(before)
+
+    assert len(added) == 2  # the changed segment + the new manifest
+    assert len(list((tmp_path / "segments").iterdir())) == 4
+
+
+def test_packed_blocks_line_up_with_prompt(tmp_path):
+    packed = ContextPacker(budget_tokens=1000).pack([
+        ContextSection(name="persona", order=2, priority=0, text="You are Bart."),
+        ContextSection(name="visit", order=1, priority=1, header="=== THIS VISIT ===", lines=["Patron: hi"]),
+    ])
+    registry = PromptRegistry(tmp_path)
+    fields = record_safely(registry, list(zip(packed.included, packed.blocks)))
+    registry.flush()
+
+    assert fields["prompt_id"] == prompt_id(packed.text)
+    assert PromptRegistry(tmp_path).reconstruct(fields["prompt_id"]) == packed.text
+
+
+def test_registry_failure_is_swallowed(tmp_path):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+
+    registry = PromptRegistry(blocker)
+    fields = record_safely(registry, SECTIONS)
+    registry.flush()  # the write fails on the writer thread, logged, not raised
+
+    assert fields["prompt_id"] == prompt_id("\n\n".join(text for _, text in SECTIONS))
+    assert blocker.read_text() == ""
+
+
+def test_record_does_not_wait_for_the_disk(tmp_path):
+    registry = PromptRegistry(tmp_path)
+    writing, release = threading.Event(), threading.Event()
+    write_once = registry._write_once
+
+    def slow_disk(path, text, touch=False):
+        writing.set()
+        release.wait(5)
+        write_once(path, text, touch)
+    registry._write_once = slow_disk
+
+    fingerprint = registry.record(SECTIONS)  # returns while the writer is stuck
+    assert writing.wait(5) and not (tmp_path / "manifests").exists()
+    release.set()
+    registry.flush()
+
+    assert registry.reconstruct(fingerprint.prompt_id) == "\n\n".join(text for _, text in SECTIONS)
+
+
+def test_prune_keeps_recent_manifests_and_their_segments(tmp_path):
+    now = 1_000_000_000.0
+    registry = PromptRegistry(tmp_path, retention_days=1, max_manifests=2, clock=lambda: now)
+    registry._pruned_at = now  # no prune while recording
+    prompts = [SECTIONS[:2] + [("persona", f"You are Bart, night {i}.")] for i in range(4)]
+    ids = [registry.record(sections).prompt_id for sections in prompts]
+    registry.flush()
+    for i, prompt in enumerate(ids):
+        mtime = now - (3 - i) * 600 - (2 * 86400 if i == 0 else 0)
+        os.utime(tmp_path / "manifests" / f"{prompt}.json", (mtime, mtime))
+
+    assert registry.prune() == 4  # nights 0 (expired) and 1 (over the cap), and their personas
+
+    assert [registry.reconstruct(prompt).rsplit(", ", 1)[1] for prompt in ids[2:]] == ["night 2.", "night 3."]
+    assert sorted(p.stem for p in (tmp_path / "manifests").iterdir()) == sorted(ids[2:])
+    assert len(list((tmp_path / "segments").iterdir())) == 4  # two shared sections + two personas
+    registry.record(prompts[1])  # used again: filed again
+    registry.flush()
+    assert registry.reconstruct(ids[1]).endswith("night 1.")
+
+
+def test_cli_prints_prompt(tmp_path, capsys):
+    registry = PromptRegistry(tmp_path)
+    fingerprint = registry.record(SECTIONS)
+    registry.flush()
+
+    assert main(["--root", str(tmp_path), "show", fingerprint.prompt_id]) == 0
+    assert capsys.readouterr().out.rstrip("\n") == "\n\n".join(text for _, text in SECTIONS)
+    assert main(["--root", str(tmp_path), "show", "missing"]) == 1
+
+
+def test_sessionless_turns_record_their_prompt(tmp_path, monkeypatch):
+    from src.history import MessageHistory
+    from src.router import Router
+    from src.schemas.message import Message
+
+    router = Router(history=MessageHistory())
+    router.save_state = lambda: None
+    router.prompt_registry = PromptRegistry(tmp_path)
+    monkeypatch.setattr(router.bernie.llm, "call", lambda **kwargs: "Sit down.")
+
+    router.execute_agent("bernie", Message("u1", "Evening"))
+    router.prompt_registry.flush()
+
+    assert router.last_prompt["prompt_id"] == prompt_id(router.bernie.prompt)  # what LLMClient logs
+    assert router.prompt_registry.reconstruct(router.last_prompt["prompt_id"]) == router.bernie.prompt
@@ -0,0 +1,79 @@
+import pytest
+from datetime import datetime
+
+from src.config import prompt_templates
+from src.config.prompt_templates import PromptTemplate, compile_templates, render
+from src.calais_weather import CALAIS_TZ
+
+
+@pytest.fixture(autouse=True)
+def fake_slots(monkeypatch):
+    prompt_templates._environment_by_bucket.clear()
+    prompt_templates._tides_by_date.clear()
+    prompt_templates._renders.clear()
+    calls = {"environment": 0, "tides": 0}
+
+    def environment(bucket):
+        calls["environment"] += 1
+        return f"env {bucket}"
+
+    def tides():
+        calls["tides"] += 1
+        return "TIDES"
+
+    monkeypatch.setattr(prompt_templates, "get_environment_for_agent", environment)
+    monkeypatch.setattr(prompt_templates, "get_tide_context_for_agent", tides)
+    return calls
+
+
+def test_compile_marks_tide_agents():
+    templates = compile_templates({"bart": {"system_prompt": "You are Bart."},
+                                   "hermes": {"system_prompt": "You are Hermes."}})
+
+    assert templates["bart"].uses_tides
+    assert not templates["hermes"].uses_tides
+
+
+def test_render_is_memoized_per_bucket(fake_slots):
+    bart = PromptTemplate("bart", "You are Bart.", uses_tides=True)
+    at = datetime(2025, 1, 10, 22, 5, tzinfo=CALAIS_TZ)
+
+    first = render(bart, at)
+    second = render(bart, datetime(2025, 1, 10, 22, 29, tzinfo=CALAIS_TZ))
+    later = render(bart, datetime(2025, 1, 10, 22, 31, tzinfo=CALAIS_TZ))
+
+    assert first is second
+    assert first.startswith("TIDES\n\nCURRENT ENVIRONMENT: env 2025-01-10-22-00")
+    assert first.endswith("You are Bart.")
+    assert "env 2025-01-10-22-30" in later
+    assert fake_slots == {"environment": 2, "tides": 1}  # tides once per day
+
+
+def test_failed_tides_retried_next_bucket(fake_slots, monkeypatch):
+    monkeypatch.setattr(prompt_templates, "get_tide_context_for_agent", lambda: "Tide information unavailable")
+    bart = PromptTemplate("bart", "You are Bart.", uses_tides=True)
+
+    render(bart, datetime(2025, 1, 10, 22, 5, tzinfo=CALAIS_TZ))
+    monkeypatch.setattr(prompt_templates, "get_tide_context_for_agent", lambda: "TIDES")
+
+    assert "unavailable" in render(bart, datetime(2025, 1, 10, 22, 10, tzinfo=CALAIS_TZ))
+    assert render(bart, datetime(2025, 1, 10, 22, 40, tzinfo=CALAIS_TZ)).startswith("TIDES")
+
+
+def test_hash_changes_with_prompt_text():
+    assert PromptTemplate("jb", "a", True).hash != PromptTemplate("jb", "b", True).hash
+    assert PromptTemplate("jb", "a", True).hash == PromptTemplate("jb", "a", True).hash
+
+
+def test_hashes_are_computed_once(monkeypatch):
+    bart = compile_templates({"bart": {"system_prompt": "You are Bart."}})["bart"]
+    hashed = []
+    monkeypatch.setattr(prompt_templates, "content_hash", lambda text: hashed.append(text) or "h")
+    at = datetime(2025, 1, 10, 22, 5, tzinfo=CALAIS_TZ)
+
+    for _ in range(3):
+        render(bart, at)
+        prompt_templates.render_hash(bart, at)
+
+    assert hashed == [render(bart, at)]  # the rendered prompt, once per bucket; the template's at compile time
+    assert bart.hash and prompt_templates.render_hash(bart, at) == "h"
@@ -0,0 +1,180 @@
+import threading
+
+import pytest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src import retrieval
+from src.database import memory_manager
+from src.database.memory_manager import MemoryManager
+from src.database.models import Base, User, Session as SessionModel, Message
+from src.retrieval import HashingVectorizer, MemoryIndex, Memory, exchanges
+from src.summarizer import extractive_digest
+
+
+def test_vectorizer_rows_are_unit_length_and_stable():
+    matrix = HashingVectorizer().transform(["the ferry to Dover", "", "the ferry to Dover"])
+
+    assert matrix.shape == (3, retrieval.VECTOR_DIM)
+    assert abs(float((matrix[0] ** 2).sum()) - 1.0) < 1e-5
+    assert not matrix[1].any()
+    assert (matrix[0] == matrix[2]).all()
+
+
+def test_exchanges_group_replies_under_patron_message():
+    messages = [
+        {"session_id": "s1", "agent": "user", "content": "I miss the sea", "is_user": True},
+        {"session_id": "s1", "agent": "bart", "content": "It's right there.", "is_user": False},
+        {"session_id": "s1", "agent": "user", "content": "Another one", "is_user": True},
+    ]
+
+    grouped = exchanges(messages)
+
+    assert [m.text for m in grouped] == ["Patron: I miss the sea\nBart: It's right there.", "Patron: Another one"]
+
+
+def test_search_ranks_related_exchange_first():
+    index = MemoryIndex()
+    index.add([
+        Memory("s1", "Patron: my sister works on the ferry to Dover", None),
+        Memory("s2", "Patron: I hate the new espresso machine", None),
+        Memory("s3", "Patron: the gulls stole my chips again", None),
+    ])
+
+    results = index.search("how is your sister on the ferry", k=2)
+
+    assert results[0].session_id == "s1"
+    assert all(r.session_id != "s2" for r in results)
+    assert index.search("   ") == []
+
+
+class _MeetingVectorizer(HashingVectorizer):
+    """Holds each document batch until a second one arrives (or a short timeout)"""
+
+    def __init__(self):
+        super().__init__()
+        self.meeting = threading.Barrier(2, timeout=0.5)
+
+    def transform(self, texts):
+        if not texts[0].startswith("how"):  # documents, not the query
+            try:
+                self.meeting.wait()
+            except threading.BrokenBarrierError:
+                pass
+        return super().transform(texts)
+
+
+def test_concurrent_adds_keep_rows_and_memories_in_step():
+    index = MemoryIndex(_MeetingVectorizer())
+    adders = [
+        threading.Thread(target=index.add, args=([Memory("s1", "Patron: my sister works on the ferry", None)],)),
+        threading.Thread(target=index.add, args=([Memory("s2", "Patron: the gulls stole my chips", None)],)),
+    ]
+    for t in adders:
+        t.start()
+    for t in adders:
+        t.join(5)
+
+    assert len(index) == 2 and index.matrix.shape[0] == 2
+    assert index.search("how are the gulls and your chips", k=1)[0].session_id == "s2"
+    assert index.search("how is your sister on the ferry", k=1)[0].session_id == "s1"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    memory_manager._cold_cache.clear()
+    retrieval._indexes.clear()
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _archived_visit(mgr, session_id, lines, day):
+    start = datetime(2025, 1, day, 20, 0)
+    mgr.db.add(SessionModel(id=session_id, user_id="u1", status="ended",
+                            started_at=start, ended_at=start + timedelta(hours=1)))
+    for i, (agent, content) in enumerate(lines):
+        mgr.db.add(Message(session_id=session_id, agent=agent, content=content,
+                           is_user_message=1 if agent == "user" else 0,
+                           timestamp=start + timedelta(minutes=i)))
+    mgr.db.commit()
+    mgr.archive_session(session_id)
+
+
+def test_index_updates_incrementally_on_archive(db):
+    db.add(User(id="u1", anonymous_id="anon-1"))
+    mgr = MemoryManager(db, summarize=extractive_digest)
+    _archived_visit(mgr, "s1", [("user", "my dog Biscuit died last spring"), ("bart", "Sorry.")], day=1)
+
+    version = mgr.load_turn_context("s1").cold_version
+    index = mgr.get_memory_index("u1", version)
+    assert len(index) == 1
+
+    _archived_visit(mgr, "s2", [("user", "the lighthouse keeper retired"), ("bart", "About time.")], day=2)
+
+    assert retrieval.cached_index("u1") is index
+    assert len(index) == 2  # appended on archive, not rebuilt
+    recalled = mgr.retrieve_memories("u1", "I keep thinking about Biscuit", mgr.load_turn_context("s2").cold_version)
+    assert recalled[0].session_id == "s1"
+
+
+def test_stale_index_catches_up_with_new_sessions_only(db):
+    db.add(User(id="u1", anonymous_id="anon-1"))
+    mgr = MemoryManager(db, summarize=extractive_digest)
+    _archived_visit(mgr, "s1", [("user", "tide tables for Calais")], day=1)
+    index = mgr.get_memory_index("u1", 1)
+
+    # Another worker archives s2; this process's index never sees it
+    retrieval._indexes.clear()
+    _archived_visit(mgr, "s2", [("user", "learning the accordion")], day=2)
+    retrieval.remember_index("u1", index)
+    assert index.session_ids == {"s1"}
+
+    caught_up = mgr.get_memory_index("u1", 2)
+
+    assert caught_up is index
+    assert caught_up.session_ids == {"s1", "s2"}
+    assert caught_up.version == 2
+    assert mgr.retrieve_memories("u1", "accordion", 2)[0].session_id == "s2"
+
+
+def test_failed_archive_leaves_index_alone(db, monkeypatch):
+    db.add(User(id="u1", anonymous_id="anon-1"))
+    mgr = MemoryManager(db, summarize=extractive_digest)
+    _archived_visit(mgr, "s1", [("user", "tide tables for Calais")], day=1)
+    index = mgr.get_memory_index("u1", 1)
+
+    def broken(user_id, max_sessions=4):
+        raise RuntimeError("connection lost")
+    monkeypatch.setattr(mgr, "refresh_cold_context", broken)
+    with pytest.raises(RuntimeError):
+        _archived_visit(mgr, "s2", [("user", "learning the accordion")], day=2)
+    db.rollback()
+
+    assert index.session_ids == {"s1"}  # nothing indexed that was never committed
+
+
+def test_failed_commit_leaves_cold_cache_alone(db, monkeypatch):
+    db.add(User(id="u1", anonymous_id="anon-1"))
+    mgr = MemoryManager(db, summarize=extractive_digest)
+    _archived_visit(mgr, "s1", [("user", "tide tables for Calais")], day=1)
+    cached = memory_manager._cold_cache["u1"]
+
+    def broken():
+        raise RuntimeError("connection lost")
+    monkeypatch.setattr(mgr, "archive_session", lambda session_id: None)
+    _archived_visit(mgr, "s2", [("user", "learning the accordion")], day=2)
+    monkeypatch.setattr(db, "commit", broken)
+    with pytest.raises(RuntimeError):
+        MemoryManager.archive_session(mgr, "s2")
+    monkeypatch.undo()
+    db.rollback()
+
+    assert memory_manager._cold_cache["u1"] == cached  # no snapshot that was never committed
+    assert mgr.get_cold_context("u1", cached[0]) == cached[1]
@@ -1,6 +1,7 @@
 import pytest
 from src.router import Router
 from src.history import MessageHistory
+from src.schemas.message import Message
 
 
 class TestCrisisDetection:
@@ -68,4 +69,44 @@ class TestViolationScanning:
     
     def test_normal_message_passes(self):
         has_violation, warning = self.router._pre_route_scan("hello there")
-        assert not has_violation
\ No newline at end of file
+        assert not has_violation
+
+class TestBarLoreWithoutSession:
+    """CLI path: no database, Blanca still knows the bar."""
+
+    def setup_method(self):
+        self.router = Router(history=MessageHistory())
+        self.router.save_state = lambda: None
+        self.prompts = []
+
+    def _capture(self, monkeypatch):
+        prompts = self.prompts
+
+        class FakeBlanca:
+            def __init__(self, prompt):
+                self.prompt = prompt
+                prompts.append(prompt)
+
+            def respond(self, text, max_tokens=None):
+                return "Noted."
+
+        monkeypatch.setattr("src.router.Blanca", FakeBlanca)
+
+    def test_blanca_gets_core_and_matching_lore(self, monkeypatch):
+        self._capture(monkeypatch)
+
+        self.router.execute_agent("blanca", Message("u1", "what food do you serve?"))
+
+        prompt = self.prompts[-1]
+        assert "=== BAR KNOWLEDGE ===" in prompt
+        assert "CURRENT OPERATIONS:" in prompt  # core, always
+        assert "Croque monsieur" in prompt  # matched to the question
+        assert prompt.count("CURRENT OPERATIONS:") == 1
+
+    def test_routed_blanca_gets_lore_too(self, monkeypatch):
+        self._capture(monkeypatch)
+
+        agent, _ = self.router.handle(Message("u1", "blanca: when do you close?"))
+
+        assert agent == "blanca"
+        assert "CURRENT OPERATIONS:" in self.prompts[-1]
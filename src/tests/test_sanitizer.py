@@ -0,0 +1,55 @@
+import hypothesis.strategies as st
+import pytest
+from hypothesis import given, settings
+
+from src.agents.sanitizer import sanitize, sanitizer_for
+
+
+@pytest.mark.parametrize("raw, clean", [
+    ("*wipes glass* Rough night?", "Rough night?"),
+    ("That's *really* it.", "That's really it."),
+    ("**Bernie**: Hello there", "Hello there"),
+    ("Hey *sighs deeply* there  ", "Hey  there"),
+    ("5 * 3 = 15", "5 * 3 = 15"),
+    ("unclosed *thing", "unclosed *thing"),
+    ("*a-b* stays", "*a-b* stays"),
+])
+def test_default_rules(raw, clean):
+    assert sanitize(raw, "bart") == clean
+
+
+def test_jb_drops_every_asterisk():
+    assert sanitize(" *Whom*, not *who*. ", "jb") == "Whom, not who."
+
+
+# Small alphabet so asterisks, labels, colons and whitespace collide often
+replies = st.text(alphabet="ab B*:  \n.", max_size=60)
+
+
+def _stream(text, cuts, agent):
+    sanitizer = sanitizer_for(agent)
+    points = sorted({c % (len(text) + 1) for c in cuts})
+    pieces = [text[i:j] for i, j in zip([0] + points, points + [len(text)])]
+    return "".join(sanitizer.feed(piece) for piece in pieces) + sanitizer.finish()
+
+
+@given(text=replies, cuts=st.lists(st.integers(min_value=0, max_value=60), max_size=8),
+       agent=st.sampled_from(["bart", "jb", "blanca"]))
+@settings(max_examples=300)
+def test_streamed_matches_whole(text, cuts, agent):
+    assert _stream(text, cuts, agent) == sanitize(text, agent)
+
+
+@given(text=replies)
+def test_char_by_char_matches_whole(text):
+    sanitizer = sanitizer_for("bernie")
+    streamed = "".join(sanitizer.feed(ch) for ch in text) + sanitizer.finish()
+
+    assert streamed == sanitize(text, "bernie")
+
+
+@given(text=replies)
+def test_output_is_trimmed(text):
+    out = sanitize(text, "hermes")
+
+    assert out == out.strip()
@@ -0,0 +1,86 @@
+import time
+
+from src.summarizer import extractive_digest, extractive_note, fold_summary, summarize_session, ROLLING_MAX_CHARS
+
+
+def _msg(content, is_user=True, agent="user"):
+    return {"agent": agent, "content": content, "is_user": is_user}
+
+
+def test_extractive_digest_keeps_topic_sentences_in_order():
+    messages = [
+        _msg("Hi."),
+        _msg("Ok.", is_user=False, agent="bart"),
+        _msg("I keep thinking about my father's boat. The boat is still in Calais."),
+        _msg("Boats outlive people.", is_user=False, agent="bart"),
+        _msg("Yeah."),
+    ]
+
+    digest = extractive_digest(messages, max_sentences=2)
+
+    assert digest.index("father's boat") < digest.index("Calais")
+    assert "Hi." not in digest
+
+
+def test_extractive_digest_respects_max_chars():
+    messages = [_msg("word " * 200)]
+
+    assert len(extractive_digest(messages, max_chars=50)) <= 50
+
+
+def test_summarize_session_falls_back_without_api_key(monkeypatch):
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+
+    assert summarize_session([]) == ""
+    assert "harbour" in summarize_session([_msg("The harbour smelled of diesel tonight.")])
+
+
+def test_fold_summary_appends_and_stays_bounded(monkeypatch):
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    summary = ""
+
+    for i in range(20):
+        summary = fold_summary(summary, [_msg(f"Story number {i} is about the lighthouse keeper.")])
+
+    assert len(summary) <= ROLLING_MAX_CHARS
+    assert "Story number 19" in summary
+    assert "Story number 0 " not in summary
+    assert fold_summary("kept as is", []) == "kept as is"
+
+
+def test_extractive_note_skips_redundant_sentences():
+    messages = [
+        _msg("My sister sold the family boat in Calais."),
+        _msg("The family boat in Calais was sold by my sister."),
+        _msg("The boat is gone, my sister sold the family boat."),
+        _msg("I start the new job at the harbour office on Monday."),
+        _msg("Ok.", is_user=False, agent="bart"),
+    ]
+
+    parts = extractive_note(messages, max_sentences=2)
+
+    assert len(parts) == 2
+    assert any("harbour office" in part for part in parts)
+    assert all(part.startswith("Patron: ") for part in parts)
+
+
+def test_extractive_note_is_bounded_and_fast_on_long_histories():
+    topics = ["boat", "sister", "job", "harbour", "weather", "father", "rent", "novel", "ferry", "dog"]
+    messages = []
+    for i in range(400):
+        messages.append(_msg(f"Turn {i}: thinking about the {topics[i % 10]} and the {topics[(i * 3) % 10]} again."))
+        messages.append(_msg(f"Tell me more about the {topics[i % 10]}.", is_user=False, agent="bart"))
+
+    start = time.perf_counter()
+    parts = extractive_note(messages, max_sentences=5, max_chars=400, sentence_chars=100)
+    elapsed = time.perf_counter() - start
+
+    assert 1 <= len(parts) <= 5
+    assert sum(len(p) + 3 for p in parts) <= 400
+    assert all(len(p) <= 100 for p in parts)
+    assert elapsed < 0.5
+
+
+def test_extractive_note_empty():
+    assert extractive_note([]) == []
+    assert extractive_note([_msg("Ok."), _msg("Yeah.")]) == []